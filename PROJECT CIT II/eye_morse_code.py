@@ -1,17 +1,30 @@
+import argparse
 import cv2
 import mediapipe as mp
 import time
 import math
-import pyttsx3
 import numpy as np
 import pyautogui
+import os
+import sys
+
+# Shared helpers live next to the hand gesture controller.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'PROJECT CIT', 'src'))
+from display import DisplayGeometry
+from session import SessionRecorder
+from inference_pool import InferencePool, SyncInference
+from scheduler import FrameScheduler
+from tracing import tracer
 
 #############################################
 # Setup text-to-speech engine (pyttsx3)
 #############################################
-engine = pyttsx3.init()
-engine.setProperty('rate', 150)
-engine.setProperty('volume', 0.8)
+def make_speech_engine():
+    import pyttsx3
+    engine = pyttsx3.init()
+    engine.setProperty('rate', 150)
+    engine.setProperty('volume', 0.8)
+    return engine
 
 #############################################
 # Morse Code Dictionary (Morse -> Letter)
@@ -54,7 +67,9 @@ def decode_morse(morse_code):
 # Mediapipe Face Mesh Setup for Facial Landmarks
 #############################################
 mp_face_mesh = mp.solutions.face_mesh
-face_mesh = mp_face_mesh.FaceMesh(
+
+
+FACE_MESH_ARGS = dict(
     static_image_mode=False,
     max_num_faces=1,
     refine_landmarks=True,
@@ -62,6 +77,13 @@ face_mesh = mp_face_mesh.FaceMesh(
     min_tracking_confidence=0.5
 )
 
+
+def make_face_mesh():
+    return mp_face_mesh.FaceMesh(**FACE_MESH_ARGS)
+
+# Face mesh landmark count with refined iris landmarks.
+FACE_POINTS = 478
+
 # Landmark indices for eyes (using Mediapipe face mesh)
 left_eye_indices = [33, 160, 158, 133, 153, 144]
 right_eye_indices = [362, 385, 387, 263, 373, 380]
@@ -98,21 +120,6 @@ RIGHT_MODE_SWITCH_THRESHOLD = 3.0  # Right-eye hold 3.0+ sec switches mode.
 MIN_BOTH_BLINK_DURATION = 0.5  # Both-eye blink must be at least 0.5 sec.
 LONG_BOTH_BLINK_THRESHOLD = 1.0  # Both-eye: 0.5-1.0 sec adds letter space; >=1.0 sec adds word boundary.
 
-#############################################
-# Global Variables
-#############################################
-morse_buffer = ""  # Accumulates dots, dashes, and spacing.
-current_mode = "morse"  # Operating mode: "morse" (default) or "mouse".
-
-# Blink state tracking variables.
-left_blink_active = False
-right_blink_active = False
-both_blink_active = False
-left_closed_start = 0
-right_closed_start = 0
-both_closed_start = 0
-
-
 #############################################
 # Function: Create the Morse Code Chart GUI image
 #############################################
@@ -151,178 +158,270 @@ def get_chart_image(morse_buffer):
 
 
 #############################################
-# Main Loop
+# Eye-Morse State
 #############################################
-cap = cv2.VideoCapture(0)
-print("Starting the Eye-Morse system; press 'q' to exit.")
-print("Modes: 'morse' for Morse input; 'mouse' for cursor control.")
-print("Switch mode by holding the right eye for at least 3 seconds.")
-
-while True:
-    ret, frame = cap.read()
-    if not ret:
-        break
-
-    # Mirror frame and convert to RGB.
-    frame = cv2.flip(frame, 1)
-    h, w, _ = frame.shape
-    rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-    results = face_mesh.process(rgb_frame)
-    current_time = time.time()
-
-    # Defaults if no face is detected.
-    left_EAR = 1.0
-    right_EAR = 1.0
-    if results.multi_face_landmarks:
-        face_landmarks = results.multi_face_landmarks[0]
-        left_EAR = calculate_EAR(face_landmarks.landmark, left_eye_indices)
-        right_EAR = calculate_EAR(face_landmarks.landmark, right_eye_indices)
-        # Draw eye landmarks.
-        for idx in left_eye_indices:
-            x = int(face_landmarks.landmark[idx].x * w)
-            y = int(face_landmarks.landmark[idx].y * h)
-            cv2.circle(frame, (x, y), 2, (255, 0, 0), -1)
-        for idx in right_eye_indices:
-            x = int(face_landmarks.landmark[idx].x * w)
-            y = int(face_landmarks.landmark[idx].y * h)
-            cv2.circle(frame, (x, y), 2, (0, 0, 255), -1)
-
-    # Overlay EAR values.
-    cv2.putText(frame, f"Left EAR: {left_EAR:.2f}", (10, 60),
-                cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
-    cv2.putText(frame, f"Right EAR: {right_EAR:.2f}", (10, 90),
-                cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
-    cv2.putText(frame, f"Mode: {current_mode.upper()}", (10, 450),
-                cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 0, 255), 2)
-
-    # Determine eye closure statuses.
-    left_is_closed = (left_EAR < EAR_THRESHOLD)
-    right_is_closed = (right_EAR < EAR_THRESHOLD)
-    both_closed = left_is_closed and right_is_closed
-
-    if current_mode == "morse":
-        # Process both-eye blinks for spacing.
-        if both_closed:
-            if not both_blink_active:
-                both_blink_active = True
-                both_closed_start = current_time
-        else:
-            if both_blink_active:
-                duration = current_time - both_closed_start
-                if duration < MIN_BOTH_BLINK_DURATION:
-                    print(f"Both-eye blink too short ({duration:.2f}s), ignored.")
-                elif duration < LONG_BOTH_BLINK_THRESHOLD:
-                    morse_buffer += " "
-                    print("Letter space added. Buffer:", morse_buffer)
-                else:
-                    if not morse_buffer.endswith("/"):
-                        morse_buffer += "/"
-                    print("Word boundary (/) added. Buffer:", morse_buffer)
-                both_blink_active = False
-
-        # Process left-eye blinks for dot/dash.
-        if left_is_closed:
-            if not left_blink_active:
-                left_blink_active = True
-                left_closed_start = current_time
-        else:
-            if left_blink_active:
-                duration = current_time - left_closed_start
-                if duration >= MIN_BLINK_DURATION:
-                    if duration < DOT_DASH_THRESHOLD:
-                        morse_buffer += "."
-                        print("Dot added. Buffer:", morse_buffer)
+class EyeMorse:
+    """
+    Blink driven Morse input and mouse mode, 'step' is called once per frame
+    with the face landmarks (None if no face) and the frame time. Input and
+    speech go through 'input' and 'speaker', so a session can be replayed
+    against recording backends.
+    """
+
+    def __init__(self, input_backend=pyautogui, display=None, speaker=None, type_delay=1):
+        self.input = input_backend
+        self.display = display
+        self.speaker = speaker
+        self.type_delay = type_delay  # Delay before typing to allow target window focus.
+
+        self.morse_buffer = ""  # Accumulates dots, dashes, and spacing.
+        self.current_mode = "morse"  # Operating mode: "morse" (default) or "mouse".
+
+        # Blink state tracking variables.
+        self.left_blink_active = False
+        self.right_blink_active = False
+        self.both_blink_active = False
+        self.left_closed_start = 0
+        self.right_closed_start = 0
+        self.both_closed_start = 0
+
+    def speak_and_type(self, text_to_speak, delay=0):
+        self.speaker.say(text_to_speak)
+        self.speaker.runAndWait()
+        if delay:
+            time.sleep(delay)
+        self.input.write(text_to_speak + " ")
+
+    def step(self, landmarks, current_time, frame=None):
+        """Handles one frame of face 'landmarks', draws feedback on 'frame' if given."""
+        # Defaults if no face is detected.
+        left_EAR = 1.0
+        right_EAR = 1.0
+        if landmarks is not None:
+            left_EAR = calculate_EAR(landmarks, left_eye_indices)
+            right_EAR = calculate_EAR(landmarks, right_eye_indices)
+
+        if frame is not None:
+            h, w, _ = frame.shape
+            if landmarks is not None:
+                # Draw eye landmarks.
+                for idx in left_eye_indices:
+                    x = int(landmarks[idx].x * w)
+                    y = int(landmarks[idx].y * h)
+                    cv2.circle(frame, (x, y), 2, (255, 0, 0), -1)
+                for idx in right_eye_indices:
+                    x = int(landmarks[idx].x * w)
+                    y = int(landmarks[idx].y * h)
+                    cv2.circle(frame, (x, y), 2, (0, 0, 255), -1)
+
+            # Overlay EAR values.
+            cv2.putText(frame, f"Left EAR: {left_EAR:.2f}", (10, 60),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
+            cv2.putText(frame, f"Right EAR: {right_EAR:.2f}", (10, 90),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
+            cv2.putText(frame, f"Mode: {self.current_mode.upper()}", (10, 450),
+                        cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 0, 255), 2)
+
+        # Determine eye closure statuses.
+        left_is_closed = (left_EAR < EAR_THRESHOLD)
+        right_is_closed = (right_EAR < EAR_THRESHOLD)
+        both_closed = left_is_closed and right_is_closed
+
+        if self.current_mode == "morse":
+            # Process both-eye blinks for spacing.
+            if both_closed:
+                if not self.both_blink_active:
+                    self.both_blink_active = True
+                    self.both_closed_start = current_time
+            else:
+                if self.both_blink_active:
+                    duration = current_time - self.both_closed_start
+                    if duration < MIN_BOTH_BLINK_DURATION:
+                        print(f"Both-eye blink too short ({duration:.2f}s), ignored.")
+                    elif duration < LONG_BOTH_BLINK_THRESHOLD:
+                        self.morse_buffer += " "
+                        print("Letter space added. Buffer:", self.morse_buffer)
+                    else:
+                        if not self.morse_buffer.endswith("/"):
+                            self.morse_buffer += "/"
+                        print("Word boundary (/) added. Buffer:", self.morse_buffer)
+                    self.both_blink_active = False
+
+            # Process left-eye blinks for dot/dash.
+            if left_is_closed:
+                if not self.left_blink_active:
+                    self.left_blink_active = True
+                    self.left_closed_start = current_time
+            else:
+                if self.left_blink_active:
+                    duration = current_time - self.left_closed_start
+                    if duration >= MIN_BLINK_DURATION:
+                        if duration < DOT_DASH_THRESHOLD:
+                            self.morse_buffer += "."
+                            print("Dot added. Buffer:", self.morse_buffer)
+                        else:
+                            self.morse_buffer += "-"
+                            print("Dash added. Buffer:", self.morse_buffer)
+                    else:
+                        print(f"Left blink too short ({duration:.2f}s), ignored.")
+                    self.left_blink_active = False
+
+            # Process right-eye blinks ONLY if right eye is closed and left eye is open.
+            if right_is_closed and not left_is_closed:
+                if not self.right_blink_active:
+                    self.right_blink_active = True
+                    self.right_closed_start = current_time
+            else:
+                if self.right_blink_active:
+                    duration = current_time - self.right_closed_start
+                    if duration >= RIGHT_MODE_SWITCH_THRESHOLD:
+                        self.current_mode = "mouse"
+                        self.morse_buffer = ""  # clear buffer when switching modes
+                        print("Switched to MOUSE mode.")
+                    elif duration >= RIGHT_TTS_THRESHOLD:
+                        text_to_speak = decode_morse(self.morse_buffer)
+                        print("TTS output triggered:", text_to_speak)
+                        self.speak_and_type(text_to_speak, self.type_delay)
+                    elif duration >= MIN_RIGHT_BLINK_DURATION:
+                        if len(self.morse_buffer) > 0:
+                            self.morse_buffer = self.morse_buffer[:-1]
+                            print("Deleted last symbol. Buffer:", self.morse_buffer)
                     else:
-                        morse_buffer += "-"
-                        print("Dash added. Buffer:", morse_buffer)
-                else:
-                    print(f"Left blink too short ({duration:.2f}s), ignored.")
-                left_blink_active = False
-
-        # Process right-eye blinks ONLY if right eye is closed and left eye is open.
-        if right_is_closed and not left_is_closed:
-            if not right_blink_active:
-                right_blink_active = True
-                right_closed_start = current_time
-        else:
-            if right_blink_active:
-                duration = current_time - right_closed_start
-                if duration >= RIGHT_MODE_SWITCH_THRESHOLD:
-                    current_mode = "mouse"
-                    morse_buffer = ""  # clear buffer when switching modes
-                    print("Switched to MOUSE mode.")
-                elif duration >= RIGHT_TTS_THRESHOLD:
-                    text_to_speak = decode_morse(morse_buffer)
-                    print("TTS output triggered:", text_to_speak)
-                    engine.say(text_to_speak)
-                    engine.runAndWait()
-                    time.sleep(1)  # Optional delay to allow target window focus.
-                    pyautogui.write(text_to_speak + " ")
-                elif duration >= MIN_RIGHT_BLINK_DURATION:
-                    if len(morse_buffer) > 0:
-                        morse_buffer = morse_buffer[:-1]
-                        print("Deleted last symbol. Buffer:", morse_buffer)
-                else:
-                    print(f"Right blink too short ({duration:.2f}s), ignored.")
-                right_blink_active = False
-
-        live_translation = decode_morse(morse_buffer)
-        cv2.putText(frame, f"Morse: {morse_buffer}", (10, 30),
-                    cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-        cv2.putText(frame, f"Translation: {live_translation}", (10, 120),
-                    cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 0, 0), 2)
-
-    elif current_mode == "mouse":
-        # In mouse mode, move the cursor using the average of left-eye landmarks.
-        if results.multi_face_landmarks:
-            pts = [face_landmarks.landmark[idx] for idx in left_eye_indices]
-            avg_x = sum(pt.x for pt in pts) / len(pts)
-            avg_y = sum(pt.y for pt in pts) / len(pts)
-            screen_width, screen_height = pyautogui.size()
-            cursor_x = int(avg_x * screen_width)
-            cursor_y = int(avg_y * screen_height)
-            pyautogui.moveTo(cursor_x, cursor_y)
-        # In mouse mode, a left-eye blink simulates a left-click.
-        if left_is_closed:
-            if not left_blink_active:
-                left_blink_active = True
-                left_closed_start = current_time
-        else:
-            if left_blink_active:
-                duration = current_time - left_closed_start
-                if duration >= MIN_BLINK_DURATION:
-                    print("Mouse left-click triggered.")
-                    pyautogui.click()
-                left_blink_active = False
-        # In mouse mode, use right-eye blink (held ≥3 sec) to switch back to Morse mode.
-        if right_is_closed:
-            if not right_blink_active:
-                right_blink_active = True
-                right_closed_start = current_time
-        else:
-            if right_blink_active:
-                duration = current_time - right_closed_start
-                if duration >= RIGHT_MODE_SWITCH_THRESHOLD:
-                    current_mode = "morse"
-                    print("Switched to MORSE mode.")
-                right_blink_active = False
-        cv2.putText(frame, "Mouse mode: control cursor with your face; blink left to click.",
-                    (10, 400), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 0), 2)
-        live_translation = ""
-
-    cv2.imshow("Eye-Morse System", frame)
-    chart_img = get_chart_image(morse_buffer)
-    cv2.imshow("Morse Code Chart", chart_img)
-
-    key = cv2.waitKey(1) & 0xFF
-    if key == ord("q"):
-        break
-    elif key == ord("t") and current_mode == "morse":
-        text_to_speak = decode_morse(morse_buffer)
-        print("Keyboard TTS triggered:", text_to_speak)
-        engine.say(text_to_speak)
-        engine.runAndWait()
-        pyautogui.write(text_to_speak + " ")
-
-cap.release()
-cv2.destroyAllWindows()
+                        print(f"Right blink too short ({duration:.2f}s), ignored.")
+                    self.right_blink_active = False
+
+            if frame is not None:
+                live_translation = decode_morse(self.morse_buffer)
+                cv2.putText(frame, f"Morse: {self.morse_buffer}", (10, 30),
+                            cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+                cv2.putText(frame, f"Translation: {live_translation}", (10, 120),
+                            cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 0, 0), 2)
+
+        elif self.current_mode == "mouse":
+            # In mouse mode, move the cursor using the average of left-eye landmarks.
+            if landmarks is not None:
+                pts = [landmarks[idx] for idx in left_eye_indices]
+                avg_x = sum(pt.x for pt in pts) / len(pts)
+                avg_y = sum(pt.y for pt in pts) / len(pts)
+                screen_width, screen_height = self.display.size()
+                cursor_x = int(avg_x * screen_width)
+                cursor_y = int(avg_y * screen_height)
+                self.input.moveTo(cursor_x, cursor_y)
+                self.display.moved_to(cursor_x, cursor_y)
+            # In mouse mode, a left-eye blink simulates a left-click.
+            if left_is_closed:
+                if not self.left_blink_active:
+                    self.left_blink_active = True
+                    self.left_closed_start = current_time
+            else:
+                if self.left_blink_active:
+                    duration = current_time - self.left_closed_start
+                    if duration >= MIN_BLINK_DURATION:
+                        print("Mouse left-click triggered.")
+                        self.input.click()
+                    self.left_blink_active = False
+            # In mouse mode, use right-eye blink (held ≥3 sec) to switch back to Morse mode.
+            if right_is_closed:
+                if not self.right_blink_active:
+                    self.right_blink_active = True
+                    self.right_closed_start = current_time
+            else:
+                if self.right_blink_active:
+                    duration = current_time - self.right_closed_start
+                    if duration >= RIGHT_MODE_SWITCH_THRESHOLD:
+                        self.current_mode = "morse"
+                        print("Switched to MORSE mode.")
+                    self.right_blink_active = False
+            if frame is not None:
+                cv2.putText(frame, "Mouse mode: control cursor with your face; blink left to click.",
+                            (10, 400), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 0), 2)
+
+
+#############################################
+# Main Loop
+#############################################
+def main():
+    parser = argparse.ArgumentParser(description="Eye blink Morse code input.")
+    parser.add_argument('--record', metavar='DIR', help="record frames and landmarks to a session directory")
+    parser.add_argument('--workers', type=int, default=0, help="run FaceMesh in this many worker processes")
+    parser.add_argument('--fps', type=float, default=0, help="cap the frame rate, 0 runs at the camera rate")
+    args = parser.parse_args()
+
+    if args.workers:
+        inference = InferencePool('face', args.workers, **FACE_MESH_ARGS)
+    else:
+        inference = SyncInference(make_face_mesh())
+    cap = cv2.VideoCapture(0)
+    # Screen size is cached and refreshed off the frame loop.
+    display = DisplayGeometry().start()
+    morse = EyeMorse(pyautogui, display, make_speech_engine())
+    recorder = None
+    if args.record:
+        recorder = SessionRecorder(args.record, 'face', 'eye_morse_code', 1, FACE_POINTS).start()
+    print("Starting the Eye-Morse system; press 'q' to exit.")
+    print("Modes: 'morse' for Morse input; 'mouse' for cursor control.")
+    print("Switch mode by holding the right eye for at least 3 seconds.")
+
+    def dispatch(finished):
+        """handles the FaceMesh results in 'finished', returns False once 'q' was pressed."""
+        running = True
+        for (raw_frame, frame, current_time), results in finished:
+            landmarks = None
+            if results.multi_face_landmarks:
+                landmarks = results.multi_face_landmarks[0].landmark
+            with tracer.span('step'):
+                morse.step(landmarks, current_time, frame)
+            if recorder is not None:
+                recorder.write(raw_frame, current_time, results.multi_face_landmarks)
+
+            with tracer.span('cv2.imshow'):
+                cv2.imshow("Eye-Morse System", frame)
+                chart_img = get_chart_image(morse.morse_buffer)
+                cv2.imshow("Morse Code Chart", chart_img)
+                key = cv2.waitKey(1) & 0xFF
+            tracer.handle_key(key)
+            if key == ord("q"):
+                running = False
+            elif key == ord("t") and morse.current_mode == "morse":
+                text_to_speak = decode_morse(morse.morse_buffer)
+                print("Keyboard TTS triggered:", text_to_speak)
+                morse.speak_and_type(text_to_speak)
+        return running
+
+    scheduler = FrameScheduler(args.fps) if args.fps else None
+    running = True
+    while running:
+        if scheduler is not None:
+            scheduler.wait()
+        with tracer.span('frame'):
+            with tracer.span('cap.read'):
+                ret, raw_frame = cap.read()
+            if not ret:
+                break
+            current_time = time.time()
+
+            # Mirror frame and convert to RGB.
+            frame = cv2.flip(raw_frame, 1)
+            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            with tracer.span('face_mesh.process'):
+                finished = inference.push(rgb_frame, (raw_frame, frame, current_time))
+
+            running = dispatch(finished)
+
+    # frames still in the workers, so a recording keeps its tail
+    dispatch(inference.drain())
+
+    if recorder is not None:
+        recorder.close()
+    inference.close()
+    cap.release()
+    display.stop()
+    cv2.destroyAllWindows()
+    if scheduler is not None:
+        print(scheduler.report())
+    if tracer.events:
+        print("trace written to", tracer.dump())
+
+
+if __name__ == "__main__":
+    main()
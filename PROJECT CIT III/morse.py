@@ -5,6 +5,12 @@ import math
 import pyttsx3
 import numpy as np
 import pyautogui
+import os
+import sys
+
+# Shared helpers live next to the hand gesture controller.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'PROJECT CIT', 'src'))
+from display import DisplayGeometry
 
 #############################################
 # Setup text-to-speech engine (pyttsx3)
@@ -154,6 +160,8 @@ def get_chart_image(morse_buffer):
 # Main Loop
 #############################################
 cap = cv2.VideoCapture(0)
+# Screen size is cached and refreshed off the frame loop.
+display = DisplayGeometry().start()
 print("Starting the Eye-Morse system; press 'q' to exit.")
 print("Modes: 'morse' for Morse input; 'mouse' for cursor control.")
 print("Switch mode by holding the right eye for at least 3 seconds.")
@@ -278,10 +286,11 @@ while True:
             pts = [face_landmarks.landmark[idx] for idx in left_eye_indices]
             avg_x = sum(pt.x for pt in pts) / len(pts)
             avg_y = sum(pt.y for pt in pts) / len(pts)
-            screen_width, screen_height = pyautogui.size()
+            screen_width, screen_height = display.size()
             cursor_x = int(avg_x * screen_width)
             cursor_y = int(avg_y * screen_height)
             pyautogui.moveTo(cursor_x, cursor_y)
+            display.moved_to(cursor_x, cursor_y)
         # In mouse mode, a left-eye blink simulates a left-click.
         if left_is_closed:
             if not left_blink_active:
@@ -325,4 +334,5 @@ while True:
         pyautogui.write(text_to_speak + " ")
 
 cap.release()
+display.stop()
 cv2.destroyAllWindows()
@@ -0,0 +1,121 @@
+"""
+Time and memory allocated per frame by the gloved controller's glove
+segmentation, 'ROI.cropROI', before and after it reused its buffers.
+
+A marker moves and changes size over synthetic frames with glove coloured
+blobs, so the hand region and with it every crop changes size from frame
+to frame. Allocated is the peak of memory traced by 'tracemalloc' during
+the call above what was in use before it, i.e. what the call allocated
+and freed again. Timing runs without tracing.
+
+    python bench_crop_roi.py --frames 600
+"""
+
+# Imports
+
+import argparse
+import math
+import os
+import sys
+import time
+import tracemalloc
+from types import SimpleNamespace
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'src'))
+from Gesture_Controller_Gloved import ROI, find_HSV
+
+
+def legacy_crop_roi(roi, frame):
+    """'ROI.cropROI' as it was, allocating every image per call."""
+    pts = np.array(roi.roi_corners)
+    x, y, w, h = cv2.boundingRect(pts)
+    croped = frame[y:y+h, x:x+w].copy()
+    pts = pts - pts.min(axis=0)
+    mask = np.zeros(croped.shape[:2], np.uint8)
+    cv2.drawContours(mask, [pts], -1, (255, 255, 255), -1, cv2.LINE_AA)
+    dst = cv2.bitwise_and(croped, croped, mask=mask)
+    bg = np.ones_like(croped, np.uint8)*255
+    cv2.bitwise_not(bg, bg, mask=mask)
+    kernelOpen = np.ones((3, 3), np.uint8)
+    kernelClose = np.ones((5, 5), np.uint8)
+    hsv = cv2.cvtColor(dst, cv2.COLOR_BGR2HSV)
+    lower_range = np.array([roi.hsv_glove[0][0][0]//1-5, 50, 50])
+    upper_range = np.array([roi.hsv_glove[0][0][0]//1+5, 255, 255])
+    mask = cv2.inRange(hsv, lower_range, upper_range)
+    Opening = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernelOpen)
+    return cv2.morphologyEx(Opening, cv2.MORPH_CLOSE, kernelClose)
+
+
+def make_frames(count, width=640, height=480):
+    rng = np.random.default_rng(0)
+    frames = []
+    for _ in range(count):
+        frame = cv2.GaussianBlur(rng.integers(0, 255, (height, width, 3), dtype=np.uint8), (0, 0), 2)
+        for _ in range(3):
+            centre = (int(rng.integers(0, width)), int(rng.integers(0, height)))
+            cv2.circle(frame, centre, int(rng.integers(20, 90)), (40, 200, 60), -1)
+        frames.append(frame)
+    return frames
+
+
+def hand_regions(frames, roi):
+    """yields (frame, roi) with the hand region of a moving, growing marker."""
+    height, width = frames[0].shape[:2]
+    roi.hsv_glove = find_HSV([[60, 200, 40]])
+    i = 0
+    while True:
+        t = i / 30.0
+        size = 40 + 25*math.sin(0.8*t)
+        cx, cy = width/2 + 0.3*width*math.sin(0.5*t), height*0.75 + 0.15*height*math.sin(0.9*t)
+        corners = np.float32([[-1, -1], [1, -1], [1, 1], [-1, 1]]) * size/2 + (cx, cy)
+        roi.findROI(frames[i % len(frames)], SimpleNamespace(corners=(corners.reshape(1, 4, 2),)))
+        yield frames[i % len(frames)], roi
+        i += 1
+
+
+def run(crop, frames, count):
+    """returns (mean ms, p95 ms, mean KB allocated, max KB allocated) per frame."""
+    roi = ROI(2.5, 2.5, 6, 0.45, 0.6, 0.4)
+    regions = hand_regions(frames, roi)
+    costs = []
+    for _ in range(count):
+        frame, roi = next(regions)
+        start = time.perf_counter()
+        crop(roi, frame)
+        costs.append(time.perf_counter() - start)
+
+    roi = ROI(2.5, 2.5, 6, 0.45, 0.6, 0.4)
+    regions = hand_regions(frames, roi)
+    allocated = []
+    tracemalloc.start()
+    for _ in range(count):
+        frame, roi = next(regions)
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        crop(roi, frame)
+        allocated.append(tracemalloc.get_traced_memory()[1] - before)
+    tracemalloc.stop()
+
+    ms = np.array(costs) * 1000.0
+    kb = np.array(allocated) / 1024.0
+    return ms.mean(), np.percentile(ms, 95), kb.mean(), kb.max(), roi.buffers.allocations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--frames', type=int, default=600)
+    args = parser.parse_args()
+
+    frames = make_frames(8)
+    print("%d frames (%dx%d)" % (args.frames, frames[0].shape[1], frames[0].shape[0]))
+    print("cropROI      mean ms  p95 ms  allocated KB/frame (max)  buffers allocated")
+    for name, crop in (('before', legacy_crop_roi), ('pooled', ROI.cropROI)):
+        mean, p95, kb, kb_max, buffers = run(crop, frames, args.frames)
+        print("%-10s  %8.3f  %6.3f  %12.1f (%7.1f)  %17s" % (
+            name, mean, p95, kb, kb_max, buffers if crop is ROI.cropROI else '-'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+"""
+Replays a hand trace through each cursor filter and reports jitter against
+lag, the way 'Controller.get_position' drives the cursor.
+
+    jitter : RMS cursor movement (px/frame) while the hand is at rest,
+             not counting the first '--settle' seconds after it stopped
+    lag    : delay (ms) between hand velocity and cursor velocity, from the
+             peak of their cross-correlation
+
+Without '--trace' a synthetic trace is used: rest, slow sweep, fast flicks
+and rest, sampled at an uneven ~30 FPS with landmark noise added. A recorded
+trace is an .npz file with arrays 't' (seconds), 'x' and 'y' (normalized
+landmark 9 position); the raw trace is then its own reference and rest is
+where it moves less than '--rest-speed'.
+
+    python bench_cursor_filter.py
+    python bench_cursor_filter.py --set one_euro.beta=0.02 --set kalman.prediction=0.03
+"""
+
+# Imports
+
+import argparse
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'src'))
+from cursor_filter import CURSOR_FILTERS, make_cursor_filter
+
+SCREEN = (1920, 1080)
+
+
+def synthetic_trace(seed=0, fps=30.0, noise=0.002):
+    """returns t, noisy x, y and clean x, y of a synthetic hand trace."""
+    rng = np.random.default_rng(seed)
+    segments = []
+    def rest(seconds, pos):
+        n = int(seconds*fps)
+        segments.append(np.tile(pos, (n, 1)))
+        return pos
+    def sweep(seconds, start, end):
+        n = int(seconds*fps)
+        s = 0.5 - 0.5*np.cos(np.linspace(0, np.pi, n))
+        segments.append(start + (end - start)*s[:, None])
+        return end
+
+    pos = rest(2.0, np.array([0.5, 0.5]))
+    pos = sweep(2.0, pos, np.array([0.7, 0.4]))
+    pos = rest(1.0, pos)
+    for target in ([0.3, 0.6], [0.6, 0.3], [0.4, 0.5]):
+        pos = sweep(0.3, pos, np.array(target))
+        pos = rest(0.7, pos)
+    pos = rest(2.0, pos)
+
+    clean = np.concatenate(segments)
+    dt = 1.0/fps + rng.normal(0, 0.004, len(clean)).clip(-0.01, 0.01)
+    t = np.cumsum(dt)
+    noisy = clean + rng.normal(0, noise, clean.shape)
+    return t, noisy[:, 0], noisy[:, 1], clean[:, 0], clean[:, 1]
+
+
+def replay(cursor_filter, t, x, y):
+    """returns (N,2) cursor positions produced by 'cursor_filter'."""
+    cursor_filter.reset()
+    cursor = np.zeros((len(t), 2))
+    prev, cx, cy = None, 0.0, 0.0
+    for i in range(len(t)):
+        fx, fy = cursor_filter.update(int(x[i]*SCREEN[0]), int(y[i]*SCREEN[1]), t[i])
+        if prev is None:
+            prev = (fx, fy)
+        cx += (fx - prev[0])*cursor_filter.gain
+        cy += (fy - prev[1])*cursor_filter.gain
+        prev = (fx, fy)
+        cursor[i] = cx, cy
+    return cursor
+
+
+def lag_ms(reference, cursor, t, max_shift=15):
+    """returns delay of 'cursor' behind 'reference' velocity in ms."""
+    ref_v = np.diff(reference, axis=0)
+    cur_v = np.diff(cursor, axis=0)
+    best, best_shift = -np.inf, 0
+    scores = []
+    for shift in range(max_shift + 1):
+        a = ref_v[:len(ref_v) - shift].ravel()
+        b = cur_v[shift:].ravel()
+        score = np.dot(a, b) / (np.linalg.norm(a)*np.linalg.norm(b) + 1e-12)
+        scores.append(score)
+        if score > best:
+            best, best_shift = score, shift
+    # Sub-frame refinement around the peak.
+    frac = 0.0
+    if 0 < best_shift < max_shift:
+        l, c, r = scores[best_shift - 1], scores[best_shift], scores[best_shift + 1]
+        den = l - 2*c + r
+        if den:
+            frac = 0.5*(l - r)/den
+    return (best_shift + frac) * float(np.mean(np.diff(t))) * 1000.0
+
+
+def settled(moving, t, settle):
+    """returns mask of samples with no movement in the previous 'settle' seconds."""
+    mask = np.zeros(len(t), dtype=bool)
+    last_move = -np.inf
+    for i in range(len(t)):
+        if moving[i]:
+            last_move = t[i]
+        mask[i] = not moving[i] and t[i] - last_move >= settle
+    return mask
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--trace', help=".npz file with arrays t, x, y")
+    parser.add_argument('--rest-speed', type=float, default=0.02,
+                        help="normalized speed per second below which a recorded hand is at rest")
+    parser.add_argument('--settle', type=float, default=0.5,
+                        help="seconds after the hand stops before jitter is measured")
+    parser.add_argument('--set', action='append', default=[], metavar='FILTER.PARAM=VALUE',
+                        help="override a filter parameter, may be repeated")
+    args = parser.parse_args()
+
+    if args.trace:
+        data = np.load(args.trace)
+        t, x, y = data['t'], data['x'], data['y']
+        ref_x, ref_y = x, y
+        speed = np.hypot(np.gradient(x, t), np.gradient(y, t))
+        moving = speed >= args.rest_speed
+    else:
+        t, x, y, ref_x, ref_y = synthetic_trace()
+        moving = np.r_[True, (np.diff(ref_x) != 0) | (np.diff(ref_y) != 0)]
+    at_rest = settled(moving, t, args.settle)
+
+    params = {name: {} for name in CURSOR_FILTERS}
+    for item in args.set:
+        key, value = item.split('=', 1)
+        name, param = key.split('.', 1)
+        params[name][param] = float(value)
+
+    print("%-10s %12s %10s   %s" % ("filter", "jitter px", "lag ms", "params"))
+    for name in CURSOR_FILTERS:
+        cursor_filter = make_cursor_filter(name, **params[name])
+        cursor = replay(cursor_filter, t, x, y)
+        reference = np.stack([ref_x*SCREEN[0], ref_y*SCREEN[1]], axis=1) * cursor_filter.gain
+
+        steps = np.linalg.norm(np.diff(cursor, axis=0), axis=1)
+        rest_steps = steps[at_rest[1:]]
+        jitter = float(np.sqrt(np.mean(rest_steps**2))) if len(rest_steps) else float('nan')
+        print("%-10s %12.2f %10.1f   %s" % (name, jitter, lag_ms(reference, cursor, t), cursor_filter.get_params()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+CPU use and frame pacing of the gloved controller's old busy-wait FPS cap
+against 'FrameScheduler', with and without rate adaptation, for several
+per-frame stage costs.
+
+The stage cost is simulated CPU work. CPU is process time per second of
+wall time, so 1.0 means one core kept busy. A cost above the 1/'--fps'
+period cannot keep the target rate, the adaptive scheduler then lowers its
+target instead of missing every deadline.
+
+    python bench_frame_scheduler.py --seconds 3 --fps 30
+    python bench_frame_scheduler.py --cost-ms 10 40
+"""
+
+# Imports
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'src'))
+from scheduler import FrameScheduler
+
+
+def work(seconds):
+    """spins for 'seconds' of CPU, stands in for capture, tracking and drawing."""
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+class BusyWait:
+    """The FPS cap 'Gesture_Controller_Gloved.GestureController.start' used before."""
+
+    def __init__(self, fps):
+        self.fps = fps
+        self.f_now_time = time.time()
+
+    def wait(self):
+        f_start_time = time.time()
+        while (self.f_now_time-f_start_time <= 1.0/self.fps):
+            self.f_now_time = time.time()
+
+
+def run(pacer, cost, seconds):
+    """returns (FPS, CPU seconds per wall second) of a paced loop."""
+    frames = 0
+    cpu, start = time.process_time(), time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        pacer.wait()
+        work(cost)
+        frames += 1
+    wall = time.perf_counter() - start
+    return frames / wall, (time.process_time() - cpu) / wall
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seconds', type=float, default=3.0)
+    parser.add_argument('--fps', type=float, default=30.0)
+    parser.add_argument('--cost-ms', type=float, nargs='+', default=[5.0, 20.0, 45.0],
+                        help="simulated stage cost per frame")
+    args = parser.parse_args()
+
+    print("%.0f s per run, target %.0f FPS" % (args.seconds, args.fps))
+    print("cost ms  pacer        FPS    CPU   missed  target FPS")
+    for cost_ms in args.cost_ms:
+        cost = cost_ms / 1000.0
+        fps, cpu = run(BusyWait(args.fps), cost, args.seconds)
+        print("%7.1f  busy-wait  %5.1f  %5.2f" % (cost_ms, fps, cpu))
+        for name, adaptive in (('fixed', False), ('adaptive', True)):
+            scheduler = FrameScheduler(args.fps, adaptive=adaptive)
+            fps, cpu = run(scheduler, cost, args.seconds)
+            s = scheduler.stats()
+            print("%7.1f  %-9s  %5.1f  %5.2f  %5.1f%%  %10.1f" % (
+                cost_ms, name, fps, cpu, s['missed_pct'], s['target_fps']))
+
+
+if __name__ == '__main__':
+    main()
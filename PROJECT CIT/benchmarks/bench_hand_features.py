@@ -0,0 +1,151 @@
+"""
+Per-frame cost of the HandRecog finger state and gesture math for two hands,
+scalar protobuf reads (legacy) against the (21,3) landmark array path.
+
+Both paths are fed the same landmarks and must agree on every finger state
+and gesture, otherwise the benchmark exits with an error. Frames are timed at
+30 FPS, where the legacy 5 frame confirmation and the 150 ms dwell agree.
+
+    python bench_hand_features.py --frames 20000
+"""
+
+# Imports
+
+import argparse
+import math
+import os
+import sys
+import time
+import numpy as np
+from mediapipe.framework.formats import landmark_pb2
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'src'))
+from Gesture_Controller import Gest, HLabel, HandRecog, compute_features
+
+FPS = 30.0
+
+
+def hand_landmarks(pts):
+    """returns 'NormalizedLandmarkList' holding (21,3) array 'pts'."""
+    hand = landmark_pb2.NormalizedLandmarkList()
+    for x, y, z in pts.tolist():
+        hand.landmark.add(x=x, y=y, z=z)
+    return hand
+
+
+class LegacyHandRecog(HandRecog):
+    """HandRecog as it was, reading protobuf attributes one at a time."""
+
+    def __init__(self, hand_label):
+        super().__init__(hand_label)
+        self.frame_count = 0
+
+    def update_hand_result(self, hand_result):
+        self.hand_result = hand_result
+
+    def get_signed_dist(self, point):
+        sign = -1
+        if self.hand_result.landmark[point[0]].y < self.hand_result.landmark[point[1]].y:
+            sign = 1
+        dist = (self.hand_result.landmark[point[0]].x - self.hand_result.landmark[point[1]].x)**2
+        dist += (self.hand_result.landmark[point[0]].y - self.hand_result.landmark[point[1]].y)**2
+        dist = math.sqrt(dist)
+        return dist*sign
+
+    def get_dist(self, point):
+        dist = (self.hand_result.landmark[point[0]].x - self.hand_result.landmark[point[1]].x)**2
+        dist += (self.hand_result.landmark[point[0]].y - self.hand_result.landmark[point[1]].y)**2
+        return math.sqrt(dist)
+
+    def get_dz(self, point):
+        return abs(self.hand_result.landmark[point[0]].z - self.hand_result.landmark[point[1]].z)
+
+    def set_finger_state(self):
+        points = [[8,5,0],[12,9,0],[16,13,0],[20,17,0]]
+        self.finger = 0
+        for point in points:
+            dist = self.get_signed_dist(point[:2])
+            dist2 = self.get_signed_dist(point[1:])
+            try:
+                ratio = round(dist/dist2,1)
+            except ZeroDivisionError:
+                ratio = round(dist/0.01,1)
+            self.finger = self.finger << 1
+            if ratio > 0.5:
+                self.finger = self.finger | 1
+
+    def get_gesture(self, timestamp=None):
+        if self.finger in [Gest.LAST3,Gest.LAST4] and self.get_dist([8,4]) < 0.05:
+            current_gesture = Gest.PINCH_MINOR if self.hand_label == HLabel.MINOR else Gest.PINCH_MAJOR
+        elif Gest.FIRST2 == self.finger:
+            if self.get_dist([8,12])/self.get_dist([5,9]) > 1.7:
+                current_gesture = Gest.V_GEST
+            elif self.get_dz([8,12]) < 0.1:
+                current_gesture = Gest.TWO_FINGER_CLOSED
+            else:
+                current_gesture = Gest.MID
+        else:
+            current_gesture = self.finger
+
+        if current_gesture == self.prev_gesture:
+            self.frame_count += 1
+        else:
+            self.frame_count = 0
+        self.prev_gesture = current_gesture
+        if self.frame_count > 4:
+            self.ori_gesture = current_gesture
+        return self.ori_gesture
+
+
+def make_frames(n, seed):
+    """returns 'n' frames of two hands with float32 landmark values."""
+    rng = np.random.default_rng(seed)
+    base = rng.random((2, 21, 3), dtype=np.float32)
+    frames = []
+    for _ in range(n):
+        # Slow drift with occasional jumps so every gesture branch is hit.
+        if rng.random() < 0.05:
+            base = rng.random((2, 21, 3), dtype=np.float32)
+        base = base + rng.normal(0, 0.01, base.shape).astype(np.float32)
+        frames.append((hand_landmarks(base[0]), hand_landmarks(base[1])))
+    return frames
+
+
+def run(frames, major, minor, batched):
+    gestures = []
+    start = time.perf_counter()
+    for i, (hr_major, hr_minor) in enumerate(frames):
+        timestamp = i / FPS
+        major.update_hand_result(hr_major)
+        minor.update_hand_result(hr_minor)
+        if batched:
+            compute_features([major, minor])
+        major.set_finger_state()
+        minor.set_finger_state()
+        gestures.append((major.finger, minor.finger, minor.get_gesture(timestamp), major.get_gesture(timestamp)))
+    return time.perf_counter() - start, gestures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--frames', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    frames = make_frames(args.frames, args.seed)
+    legacy_t, legacy_g = run(frames, LegacyHandRecog(HLabel.MAJOR), LegacyHandRecog(HLabel.MINOR), False)
+    array_t, array_g = run(frames, HandRecog(HLabel.MAJOR), HandRecog(HLabel.MINOR), True)
+
+    mismatches = sum(1 for a, b in zip(legacy_g, array_g) if a != b)
+    per_frame = lambda t: t / args.frames * 1e6
+    print("frames          : %d" % args.frames)
+    print("legacy scalar   : %.1f us/frame" % per_frame(legacy_t))
+    print("landmark array  : %.1f us/frame" % per_frame(array_t))
+    print("speed-up        : %.2fx" % (legacy_t / array_t))
+    print("mismatches      : %d" % mismatches)
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
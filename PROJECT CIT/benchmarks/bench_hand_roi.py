@@ -0,0 +1,92 @@
+"""
+Sustained hand-tracking FPS on a recorded clip, with mediapipe run on the
+whole frame and on the crop around the previous frame's hands ('HandROI').
+
+Every mode replays the same frames through the loop of
+'GestureController.start' (flip, colour conversion, inference) as fast as
+it can. The crop mode also reports how many frames were cropped, how often
+the crop lost the hand, and how far its landmarks are from the full-frame
+ones on frames where both found a hand.
+
+    python bench_hand_roi.py --clip hands.mp4
+    python bench_hand_roi.py --camera 0 --frames 300
+"""
+
+# Imports
+
+import argparse
+import os
+import sys
+import time
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'src'))
+from hand_roi import HandROI
+
+
+def load_frames(args):
+    """returns list of BGR frames from the clip or camera."""
+    cap = cv2.VideoCapture(args.clip if args.clip else args.camera)
+    frames = []
+    while len(frames) < args.frames:
+        success, frame = cap.read()
+        if not success:
+            break
+        frames.append(frame)
+    cap.release()
+    if not frames:
+        sys.exit("no frames read from %s" % (args.clip or "camera %d" % args.camera))
+    return frames
+
+
+def run(frames, use_roi):
+    """returns FPS, landmark 9 per frame (or None) and the HandROI stats."""
+    palms = []
+    with HandROI(enabled=use_roi, max_num_hands=2, min_detection_confidence=0.5,
+                 min_tracking_confidence=0.5) as hands:
+        start = time.perf_counter()
+        for frame in frames:
+            image = cv2.cvtColor(cv2.flip(frame, 1), cv2.COLOR_BGR2RGB)
+            image.flags.writeable = False
+            results = hands.process(image)
+            if results.multi_hand_landmarks:
+                lm = results.multi_hand_landmarks[0].landmark[9]
+                palms.append((lm.x, lm.y))
+            else:
+                palms.append(None)
+        fps = len(frames) / (time.perf_counter() - start)
+        return fps, palms, hands.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clip', help="video file to replay")
+    parser.add_argument('--camera', type=int, default=0, help="camera index, used without --clip")
+    parser.add_argument('--frames', type=int, default=600, help="maximum no. of frames")
+    args = parser.parse_args()
+
+    frames = load_frames(args)
+    height, width = frames[0].shape[:2]
+    print("frames           : %d (%dx%d)" % (len(frames), width, height))
+
+    full_fps, full_palms, _ = run(frames, False)
+    roi_fps, roi_palms, stats = run(frames, True)
+
+    found = sum(p is not None for p in full_palms)
+    both = [(a, b) for a, b in zip(full_palms, roi_palms) if a is not None and b is not None]
+    if both:
+        diff = np.array([(a[0] - b[0], a[1] - b[1]) for a, b in both]) * (width, height)
+        offset = "%.1f px mean over %d frames" % (np.linalg.norm(diff, axis=1).mean(), len(both))
+    else:
+        offset = "n/a"
+
+    print("hands found      : %d full, %d cropped" % (found, sum(p is not None for p in roi_palms)))
+    print("full frame       : %.1f FPS" % full_fps)
+    print("hand crop        : %.1f FPS (x%.2f)" % (roi_fps, roi_fps / full_fps))
+    print("cropped frames   : %d of %d, %d fallbacks" % (stats['frames_roi'], len(frames), stats['fallbacks']))
+    print("palm offset      : %s" % offset)
+
+
+if __name__ == '__main__':
+    main()
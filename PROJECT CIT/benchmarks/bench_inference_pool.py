@@ -0,0 +1,93 @@
+"""
+Hand or face tracking throughput with mediapipe run in the frame loop and in
+'InferencePool' worker processes, for a growing no. of workers.
+
+Every mode pushes the same frames through the loop of
+'GestureController.start' (flip, colour conversion, inference) as fast as
+it can, with a fixed amount of simulated per-frame control work that
+overlaps inference in the pooled modes. Scaling needs as many free cores
+as workers.
+
+    python bench_inference_pool.py --clip hands.mp4 --workers 1 2 4
+    python bench_inference_pool.py --clip face.mp4 --kind face --work-ms 2
+"""
+
+# Imports
+
+import argparse
+import os
+import sys
+import time
+import cv2
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'src'))
+from inference_pool import InferencePool, SyncInference, make_model
+
+MODEL_ARGS = {
+    'hands': dict(max_num_hands=2, min_detection_confidence=0.5, min_tracking_confidence=0.5),
+    'face': dict(max_num_faces=1, refine_landmarks=True, min_detection_confidence=0.5,
+                 min_tracking_confidence=0.5),
+}
+
+
+def load_frames(args):
+    """returns list of BGR frames from the clip or camera."""
+    cap = cv2.VideoCapture(args.clip if args.clip else args.camera)
+    frames = []
+    while len(frames) < args.frames:
+        success, frame = cap.read()
+        if not success:
+            break
+        frames.append(frame)
+    cap.release()
+    if not frames:
+        sys.exit("no frames read from %s" % (args.clip or "camera %d" % args.camera))
+    return frames
+
+
+def run(frames, inference, work_s):
+    """returns FPS and no. of frames with a detection."""
+    found = 0
+    start = time.perf_counter()
+    with inference:
+        for i, frame in enumerate(frames):
+            image = cv2.cvtColor(cv2.flip(frame, 1), cv2.COLOR_BGR2RGB)
+            finished = inference.push(image, i)
+            for _, results in finished:
+                found += bool(getattr(results, 'multi_hand_landmarks', None) or
+                              getattr(results, 'multi_face_landmarks', None))
+                time.sleep(work_s)  # stands in for filtering and dispatch
+        for _, results in inference.drain():
+            found += bool(getattr(results, 'multi_hand_landmarks', None) or
+                          getattr(results, 'multi_face_landmarks', None))
+        fps = len(frames) / (time.perf_counter() - start)
+    return fps, found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clip', help="video file to replay")
+    parser.add_argument('--camera', type=int, default=0, help="camera index, used without --clip")
+    parser.add_argument('--frames', type=int, default=300, help="maximum no. of frames")
+    parser.add_argument('--kind', choices=sorted(MODEL_ARGS), default='hands')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4], help="worker counts to run")
+    parser.add_argument('--work-ms', type=float, default=2.0, help="simulated control work per frame")
+    args = parser.parse_args()
+
+    frames = load_frames(args)
+    height, width = frames[0].shape[:2]
+    model_args = MODEL_ARGS[args.kind]
+    work_s = args.work_ms / 1000.0
+    print("frames           : %d (%dx%d), %d cores" % (len(frames), width, height, os.cpu_count()))
+
+    base_fps, base_found = run(frames, SyncInference(make_model(args.kind, model_args)), work_s)
+    print("in-process       : %.1f FPS, %d frames with detections" % (base_fps, base_found))
+    for workers in args.workers:
+        pool = InferencePool(args.kind, workers, max_shape=frames[0].shape, **model_args)
+        fps, found = run(frames, pool, work_s)
+        print("%d worker%s        : %.1f FPS (x%.2f), %d frames with detections" % (
+            workers, ' ' if workers == 1 else 's', fps, fps / base_fps, found))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Frame loop rate while moving the cursor with the V gesture, with input
+events sent directly from the loop and through the InputDispatcher worker.
+
+The null backend sleeps for 'duration' in moveTo the way pyautogui does, so
+the direct mode shows the cost of blocking moves. The run also checks that
+clicks queued after a move are sent after the cursor reached that move.
+
+    python bench_input_dispatch.py --frames 300 --work-ms 10
+"""
+
+# Imports
+
+import argparse
+import math
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'src'))
+from Gesture_Controller import Controller, Gest
+from display import DisplayGeometry
+from input_dispatch import InputDispatcher, NullBackend
+
+
+def hand_at(t):
+    """returns a landmark list with landmark 9 moving along a circle."""
+    x = 0.5 + 0.2*math.cos(t)
+    y = 0.5 + 0.2*math.sin(t)
+    return SimpleNamespace(landmark=[SimpleNamespace(x=x, y=y, z=0.0)]*21)
+
+
+def run_loop(controller, frames, work_s):
+    """returns frames per second of a loop doing 'work_s' of vision work."""
+    start = time.perf_counter()
+    for i in range(frames):
+        time.sleep(work_s)  # stands in for capture and inference
+        controller.handle_controls(Gest.V_GEST, hand_at(i*0.05))
+    return frames / (time.perf_counter() - start)
+
+
+def check_ordering():
+    """returns True if every click follows a move to its intended target."""
+    backend = NullBackend()
+    dispatcher = InputDispatcher(backend).start()
+    targets = [(100*i, 50*i) for i in range(1, 20)]
+    for x, y in targets:
+        dispatcher.moveTo(x, y, duration=0.1)
+        dispatcher.moveTo(x + 1, y + 1, duration=0.1)
+        dispatcher.click()
+    dispatcher.stop()
+
+    last_move, clicked_at = None, []
+    for name, args, _ in backend.events:
+        if name == 'moveTo':
+            last_move = args
+        elif name == 'click':
+            clicked_at.append(last_move)
+    return clicked_at == [(x + 1, y + 1) for x, y in targets]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--work-ms', type=float, default=10.0)
+    args = parser.parse_args()
+    work_s = args.work_ms / 1000.0
+
+    display = DisplayGeometry(NullBackend(record=False))
+
+    direct = Controller(NullBackend(simulate_duration=True, record=False), display=display)
+    direct_fps = run_loop(direct, args.frames, work_s)
+
+    dispatcher = InputDispatcher(NullBackend(simulate_duration=True, record=False)).start()
+    worker_fps = run_loop(Controller(dispatcher, display=display), args.frames, work_s)
+    dispatcher.stop()
+
+    print("frames           : %d (%.1f ms work per frame)" % (args.frames, args.work_ms))
+    print("direct moveTo    : %.1f FPS" % direct_fps)
+    print("dispatch worker  : %.1f FPS" % worker_fps)
+    print("moves coalesced  : %d" % dispatcher.moves_coalesced)
+    ordered = check_ordering()
+    print("click ordering   : %s" % ("ok" if ordered else "BROKEN"))
+    if not ordered:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
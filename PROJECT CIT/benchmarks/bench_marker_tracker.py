@@ -0,0 +1,189 @@
+"""
+Frame cost and track loss of the gloved controller's marker tracking: the
+old loop (ArUco detection plus CSRT re-initialised and updated on every
+frame) against 'DetectTracker' with every registered tracker, for several
+detection intervals.
+
+Without '--clip' a synthetic clip is rendered: an ArUco marker moving,
+turning and scaling over a textured background, hidden for half a second
+every three seconds. Its true corners are known, corner error is measured
+against them. With '--clip' a detection on every frame is the reference.
+
+Loss % is tracker updates below the confidence threshold. Missed % is
+frames with a visible marker but no corners, ghost % frames with corners
+but a hidden marker, error is the mean corner distance in pixels on frames
+with both.
+
+    python bench_marker_tracker.py --seconds 10 --detect-every 1 5 10
+    python bench_marker_tracker.py --clip glove.mp4 --trackers flow kcf
+"""
+
+# Imports
+
+import argparse
+import math
+import os
+import sys
+import time
+import cv2
+import cv2.aruco as aruco
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'src'))
+from marker_tracker import MARKER_TRACKERS, DetectTracker, box_of
+
+FPS = 30.0
+
+
+def make_detector(dict_type=aruco.DICT_4X4_50):
+    """returns detect(frame) with the settings of 'Gesture_Controller_Gloved.Marker'."""
+    if hasattr(aruco, 'ArucoDetector'):
+        parameters = aruco.DetectorParameters()
+        parameters.adaptiveThreshConstant = 1
+        detector = aruco.ArucoDetector(aruco.getPredefinedDictionary(dict_type), parameters)
+        detect_markers = detector.detectMarkers
+    else:
+        dictionary = aruco.Dictionary_get(dict_type)
+        parameters = aruco.DetectorParameters_create()
+        parameters.adaptiveThreshConstant = 1
+        detect_markers = lambda gray: aruco.detectMarkers(gray, dictionary, parameters=parameters)
+
+    def detect(frame):
+        corners, ids, _ = detect_markers(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+        return corners if ids is not None else None
+    return detect
+
+
+def marker_image(size, dict_type=aruco.DICT_4X4_50):
+    dictionary = aruco.getPredefinedDictionary(dict_type)
+    if hasattr(aruco, 'generateImageMarker'):
+        return aruco.generateImageMarker(dictionary, 0, size)
+    return aruco.drawMarker(dictionary, 0, size)
+
+
+def synthetic_clip(seconds, width=640, height=480, size=90):
+    """returns list of (frame, true corners or None) of a moving marker."""
+    rng = np.random.default_rng(0)
+    background = cv2.GaussianBlur(rng.integers(0, 255, (height, width, 3), dtype=np.uint8), (0, 0), 3)
+    marker = cv2.cvtColor(marker_image(size), cv2.COLOR_GRAY2BGR)
+    quiet = cv2.copyMakeBorder(marker, 12, 12, 12, 12, cv2.BORDER_CONSTANT, value=(255, 255, 255))
+    half = size / 2 + 12
+    inner = np.float32([[12, 12], [12 + size, 12], [12 + size, 12 + size], [12, 12 + size]])
+
+    clip = []
+    for i in range(int(seconds * FPS)):
+        t = i / FPS
+        cx = width/2 + 0.3*width*math.sin(0.9*t)
+        cy = height/2 + 0.25*height*math.sin(1.3*t)
+        angle = 0.5*math.sin(0.7*t)
+        scale = 1.0 + 0.25*math.sin(0.5*t)
+        rot = cv2.getRotationMatrix2D((half, half), math.degrees(angle), scale)
+        rot[:, 2] += (cx - half, cy - half)
+        frame = cv2.warpAffine(quiet, rot, (width, height), dst=background.copy(),
+                               borderMode=cv2.BORDER_TRANSPARENT)
+        corners = cv2.transform(inner.reshape(-1, 1, 2), rot).reshape(4, 2)
+        if t % 3.0 >= 2.5:
+            # a hand passing in front of the marker
+            cv2.rectangle(frame, (int(cx) - 70, int(cy) - 70), (int(cx) + 70, int(cy) + 70), (60, 90, 170), -1)
+            corners = None
+        clip.append((frame, corners))
+    return clip
+
+
+def clip_from_file(path, frames, detect):
+    """returns list of (frame, detected corners or None) read from 'path'."""
+    cap = cv2.VideoCapture(path)
+    clip = []
+    while len(clip) < frames:
+        success, frame = cap.read()
+        if not success:
+            break
+        frame = cv2.flip(frame, 1)
+        corners = detect(frame)
+        clip.append((frame, None if corners is None else corners[0].reshape(4, 2)))
+    cap.release()
+    if not clip:
+        sys.exit("no frames read from %s" % path)
+    return clip
+
+
+class LegacyCSRT:
+    """The old per-frame detection, CSRT 'init' and 'update' of the gloved controller."""
+
+    def __init__(self):
+        self.tracker = None
+        self.box = None
+        self.last_detect = None
+
+    def update(self, frame, detect, now):
+        corners = detect(frame)
+        if corners:
+            self.tracker = MARKER_TRACKERS['csrt']().create()
+            self.box = box_of(np.asarray(corners[0]).reshape(4, 2))
+            self.tracker.init(frame, self.box)
+            self.last_detect = now
+        if self.tracker is None:
+            return corners
+        ok, box = self.tracker.update(frame)
+        if corners:
+            return corners
+        if not ok or now - self.last_detect >= 2.0:
+            return None
+        x, y, w, h = box
+        return [np.float32([[x, y], [x + w, y], [x + w, y + h], [x, y + h]]).reshape(1, 4, 2)]
+
+
+def run(clip, tracking, detect):
+    """returns (mean ms, p95 ms, missed %, ghost %, mean corner error px) of one pass."""
+    costs, errors, missed, visible, ghosts = [], [], 0, 0, 0
+    for i, (frame, truth) in enumerate(clip):
+        frame = frame.copy()
+        start = time.perf_counter()
+        corners = tracking.update(frame, detect, i / FPS)
+        costs.append(time.perf_counter() - start)
+        if truth is None:
+            ghosts += bool(corners)
+            continue
+        visible += 1
+        if not corners:
+            missed += 1
+            continue
+        found = np.asarray(corners[0], dtype=np.float32).reshape(4, 2)
+        errors.append(np.linalg.norm(found - truth, axis=1).mean())
+    ms = np.array(costs) * 1000.0
+    return (ms.mean(), np.percentile(ms, 95), 100.0 * missed / max(visible, 1),
+            100.0 * ghosts / max(len(clip) - visible, 1), float(np.mean(errors)) if errors else float('nan'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clip', help="video file with a marker instead of the synthetic clip")
+    parser.add_argument('--seconds', type=float, default=10.0, help="length of the synthetic clip")
+    parser.add_argument('--frames', type=int, default=600, help="maximum no. of frames read from --clip")
+    parser.add_argument('--trackers', nargs='+', default=list(MARKER_TRACKERS), choices=list(MARKER_TRACKERS))
+    parser.add_argument('--detect-every', type=int, nargs='+', default=[1, 5, 10])
+    args = parser.parse_args()
+
+    detect = make_detector()
+    clip = clip_from_file(args.clip, args.frames, detect) if args.clip else synthetic_clip(args.seconds)
+    print("%d frames (%dx%d), %d with a marker" % (len(clip), clip[0][0].shape[1], clip[0][0].shape[0],
+                                                   sum(truth is not None for _, truth in clip)))
+    print("tracker  detect every  mean ms  p95 ms  detections  loss %  missed %  ghost %  error px")
+    if MARKER_TRACKERS['csrt'] is not None:
+        mean, p95, missed, ghost, error = run(clip, LegacyCSRT(), detect)
+        print("old CSRT  %11d  %7.2f  %6.2f  %10d  %6s  %8.1f  %7.1f  %8.2f" % (
+            1, mean, p95, len(clip), '-', missed, ghost, error))
+    for name in args.trackers:
+        if MARKER_TRACKERS[name] is None:
+            print("%-8s not available in this OpenCV build" % name)
+            continue
+        for every in args.detect_every:
+            tracking = DetectTracker(name, every)
+            mean, p95, missed, ghost, error = run(clip, tracking, detect)
+            s = tracking.stats()
+            print("%-8s  %11d  %7.2f  %6.2f  %10d  %6.1f  %8.1f  %7.1f  %8.2f" % (
+                name, every, mean, p95, s['detections'], s['loss_pct'], missed, ghost, error))
+
+
+if __name__ == '__main__':
+    main()
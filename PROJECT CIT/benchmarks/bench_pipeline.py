@@ -0,0 +1,330 @@
+"""
+Per-stage timing of every controller pipeline over recorded sessions (see
+'session.py'), with overall FPS and peak RSS, written as JSON and compared
+against a baseline.
+
+Each session is replayed from its recorded video through the pipeline of
+the controller that recorded it:
+
+    Gesture_Controller         decode, color, inference (HandROI), classify,
+                               filter (cursor filter), dispatch
+    Gesture_Controller_Gloved  decode, color (flip), inference (ArUco
+                               detection and marker tracker), classify (ROI,
+                               mask, fingers), dispatch
+    eye_gesture_control,       decode, color, inference (FaceMesh),
+    eye_morse_code             classify (step logic), dispatch
+
+'dispatch' is the time the frame loop spends handing events to the input
+dispatcher and the volume/brightness workers, which run against null
+backends. 'total' covers one whole frame. Every session runs in its own
+process so peak RSS is per pipeline.
+
+    python bench_pipeline.py sessions/hands sessions/morse --out results.json
+    python bench_pipeline.py sessions/* --baseline baseline.json --tolerance 10
+"""
+
+# Imports
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import time
+import cv2
+import numpy as np
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'src')
+sys.path.insert(0, SRC)
+
+STAGES = ['decode', 'color', 'inference', 'classify', 'filter', 'dispatch', 'total']
+DISPATCH_CALLS = ['moveTo', 'mouseDown', 'mouseUp', 'click', 'doubleClick', 'scroll',
+                  'hscroll', 'keyDown', 'keyUp', 'press', 'write']
+
+
+class StageTimer:
+    """Collects per-frame seconds of each stage, nested calls are charged separately."""
+
+    def __init__(self):
+        self.samples = {stage: [] for stage in STAGES}
+        self.frame = {}
+
+    def begin(self):
+        self.frame = {}
+
+    def charge(self, stage, seconds):
+        self.frame[stage] = self.frame.get(stage, 0.0) + seconds
+
+    def end(self):
+        for stage, seconds in self.frame.items():
+            self.samples[stage].append(seconds)
+
+    def instrument(self, obj, names, stage):
+        """replaces methods 'names' of 'obj' by versions charged to 'stage'."""
+        for name in names:
+            method = getattr(obj, name)
+            def timed(*args, _method=method, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return _method(*args, **kwargs)
+                finally:
+                    self.charge(stage, time.perf_counter() - start)
+            setattr(obj, name, timed)
+
+    def summary(self):
+        out = {}
+        for stage, values in self.samples.items():
+            if not values:
+                continue
+            ms = np.array(values) * 1000.0
+            out[stage] = {
+                'p50_ms': float(np.percentile(ms, 50)),
+                'p95_ms': float(np.percentile(ms, 95)),
+                'p99_ms': float(np.percentile(ms, 99)),
+                'mean_ms': float(ms.mean()),
+            }
+        return out
+
+
+def timed_frames(session, timer):
+    """yields recorded frames, charging the decode time."""
+    frames = session.frames()
+    while True:
+        start = time.perf_counter()
+        frame = next(frames, None)
+        elapsed = time.perf_counter() - start
+        if frame is None:
+            return
+        timer.begin()
+        timer.charge('decode', elapsed)
+        yield frame
+
+
+def split_control(timer, seconds, nested=('filter', 'dispatch')):
+    """charges 'seconds' of control code to 'classify', less the nested stages."""
+    timer.charge('classify', seconds - sum(timer.frame.get(stage, 0.0) for stage in nested))
+
+# Pipelines
+def run_hands(session, timer):
+    import Gesture_Controller as gc
+    from display import DisplayGeometry
+    from hand_roi import HandROI
+    from input_dispatch import InputDispatcher, NullBackend
+    from system_controls import FakeVolume, LevelWorker
+
+    dispatcher = InputDispatcher(NullBackend(record=False)).start()
+    controller = gc.Controller(dispatcher,
+                               LevelWorker(FakeVolume, 'volume').start(),
+                               LevelWorker(FakeVolume, 'brightness').start(),
+                               DisplayGeometry(NullBackend(record=False)))
+    ctrl = gc.GestureController(camera=None, controller=controller)
+    timer.instrument(dispatcher, DISPATCH_CALLS, 'dispatch')
+    timer.instrument(controller.volume, ['change', 'refresh'], 'dispatch')
+    timer.instrument(controller.brightness, ['change', 'refresh'], 'dispatch')
+    timer.instrument(controller.cursor_filter, ['update', 'reset'], 'filter')
+    handmajor = gc.HandRecog(gc.HLabel.MAJOR)
+    handminor = gc.HandRecog(gc.HLabel.MINOR)
+
+    with HandROI(enabled=ctrl.use_roi, max_num_hands=2,
+                 min_detection_confidence=0.5, min_tracking_confidence=0.5) as hands:
+        for frame, timestamp in zip(timed_frames(session, timer), session.timestamps):
+            t0 = time.perf_counter()
+            image = cv2.cvtColor(cv2.flip(frame, 1), cv2.COLOR_BGR2RGB)
+            image.flags.writeable = False
+            t1 = time.perf_counter()
+            results = hands.process(image)
+            t2 = time.perf_counter()
+            ctrl.handle_results(handmajor, handminor, results, timestamp)
+            t3 = time.perf_counter()
+            timer.charge('color', t1 - t0)
+            timer.charge('inference', t2 - t1)
+            split_control(timer, t3 - t2)
+            timer.charge('total', t3 - t0 + timer.frame['decode'])
+            timer.end()
+    dispatcher.stop()
+    controller.volume.stop()
+    controller.brightness.stop()
+
+
+def run_gloved(session, timer):
+    import Gesture_Controller_Gloved as gcg
+    from display import DisplayGeometry
+    from input_dispatch import InputDispatcher, NullBackend
+
+    dispatcher = InputDispatcher(NullBackend(record=False)).start()
+    ctrl = gcg.GestureController(camera=None, display=DisplayGeometry(NullBackend(record=False)),
+                                 dispatcher=dispatcher)
+    timer.instrument(dispatcher, DISPATCH_CALLS, 'dispatch')
+    timer.instrument(ctrl, ['detect_marker'], 'inference')
+    timer.instrument(ctrl.marker_track.tracker, ['init', 'update'], 'inference')
+
+    for frame, timestamp in zip(timed_frames(session, timer), session.timestamps):
+        t0 = time.perf_counter()
+        frame = cv2.flip(frame, 1)
+        t1 = time.perf_counter()
+        ctrl.process_frame(frame, timestamp)
+        t2 = time.perf_counter()
+        # Detection and tracking are already charged to 'inference'.
+        split_control(timer, t2 - t1, ('inference', 'dispatch'))
+        timer.charge('color', t1 - t0)
+        timer.charge('total', t2 - t0 + timer.frame['decode'])
+        timer.end()
+    dispatcher.stop()
+
+
+def run_face(session, timer):
+    from display import DisplayGeometry
+    from input_dispatch import InputDispatcher, NullBackend
+    from replay import eye_module
+
+    source = session.meta['source']
+    module = eye_module(source)
+    dispatcher = InputDispatcher(NullBackend(record=False)).start()
+    display = DisplayGeometry(NullBackend(record=False))
+    if source == 'eye_morse_code':
+        control = module.EyeMorse(dispatcher, display, NullBackend(record=False), type_delay=0)
+    else:
+        control = module.EyeGestureControl(dispatcher, display)
+    timer.instrument(dispatcher, DISPATCH_CALLS, 'dispatch')
+
+    face_mesh = module.make_face_mesh()
+    for frame, timestamp in zip(timed_frames(session, timer), session.timestamps):
+        t0 = time.perf_counter()
+        image = cv2.cvtColor(cv2.flip(frame, 1), cv2.COLOR_BGR2RGB)
+        t1 = time.perf_counter()
+        results = face_mesh.process(image)
+        t2 = time.perf_counter()
+        faces = results.multi_face_landmarks
+        landmarks = faces[0].landmark if faces else None
+        if landmarks is not None or source == 'eye_morse_code':
+            control.step(landmarks, float(timestamp))
+        t3 = time.perf_counter()
+        timer.charge('color', t1 - t0)
+        timer.charge('inference', t2 - t1)
+        split_control(timer, t3 - t2)
+        timer.charge('total', t3 - t0 + timer.frame['decode'])
+        timer.end()
+    face_mesh.close()
+    dispatcher.stop()
+
+
+PIPELINES = {
+    'Gesture_Controller': run_hands,
+    'Gesture_Controller_Gloved': run_gloved,
+    'eye_gesture_control': run_face,
+    'eye_morse_code': run_face,
+}
+
+
+def peak_rss_mb():
+    """returns peak resident set size of this process in MB, None if unknown."""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # kilobytes on Linux, bytes on macOS
+        return peak / (1024.0*1024.0) if sys.platform == 'darwin' else peak / 1024.0
+    except ImportError:
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return getattr(info, 'peak_wset', info.rss) / (1024.0*1024.0)
+    except ImportError:
+        return None
+
+
+def bench_session(path):
+    """returns result dict of one session, run inside a worker process."""
+    from session import Session
+    session = Session(path)
+    pipeline = session.meta['source']
+    timer = StageTimer()
+    start = time.perf_counter()
+    PIPELINES[pipeline](session, timer)
+    elapsed = time.perf_counter() - start
+    frames = len(timer.samples['total'])
+    return {
+        'pipeline': pipeline,
+        'frames': frames,
+        'fps': frames / elapsed if elapsed else 0.0,
+        'peak_rss_mb': peak_rss_mb(),
+        'stages': timer.summary(),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """prints changes against 'baseline', returns list of regressions."""
+    regressions = []
+    print("\nagainst baseline (tolerance %.0f%%)" % tolerance)
+    for name, res in results['sessions'].items():
+        base = baseline.get('sessions', {}).get(name)
+        if base is None:
+            print("  %-24s not in baseline" % name)
+            continue
+        change = (res['fps'] / base['fps'] - 1.0)*100.0 if base['fps'] else 0.0
+        print("  %-24s fps %8.1f -> %8.1f  (%+.1f%%)" % (name, base['fps'], res['fps'], change))
+        if change < -tolerance:
+            regressions.append((name, 'fps'))
+        for stage, stats in res['stages'].items():
+            old = base['stages'].get(stage)
+            if not old or not old['p50_ms']:
+                continue
+            change = (stats['p50_ms'] / old['p50_ms'] - 1.0)*100.0
+            flag = ''
+            if change > tolerance:
+                regressions.append((name, stage))
+                flag = '  slower'
+            elif change < -tolerance:
+                flag = '  faster'
+            print("    %-10s p50 %7.2f -> %7.2f ms  (%+.1f%%)%s" % (stage, old['p50_ms'], stats['p50_ms'], change, flag))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('sessions', nargs='+', help="session directories")
+    parser.add_argument('--out', help="write results as JSON to this file")
+    parser.add_argument('--baseline', help="JSON results to compare against")
+    parser.add_argument('--tolerance', type=float, default=10.0,
+                        help="percent change of p50 or FPS counted as regression")
+    args = parser.parse_args()
+
+    import mediapipe
+    results = {
+        'host': {
+            'platform': platform.platform(),
+            'python': platform.python_version(),
+            'opencv': cv2.__version__,
+            'mediapipe': getattr(mediapipe, '__version__', None),
+        },
+        'sessions': {},
+    }
+    ctx = multiprocessing.get_context('spawn')
+    for path in args.sessions:
+        name = os.path.basename(os.path.normpath(path))
+        with ctx.Pool(1) as pool:
+            res = pool.apply(bench_session, (path,))
+        results['sessions'][name] = res
+
+        rss = res['peak_rss_mb']
+        print("%s (%s): %d frames, %.1f FPS, peak RSS %s" % (
+            name, res['pipeline'], res['frames'], res['fps'],
+            "%.0f MB" % rss if rss is not None else "n/a"))
+        for stage in STAGES:
+            s = res['stages'].get(stage)
+            if s:
+                print("  %-10s p50 %7.2f  p95 %7.2f  p99 %7.2f ms" % (stage, s['p50_ms'], s['p95_ms'], s['p99_ms']))
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
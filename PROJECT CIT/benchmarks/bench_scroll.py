@@ -0,0 +1,71 @@
+"""
+Scroll lines per second of a held minor hand pinch, stepped scrolling
+(one notch per held pinch level) against continuous scrolling through the
+ScrollWorker, for several pinch displacements.
+
+The pinch is moved out to the displacement and held there. Frames are fed
+at '--fps' with their capture timestamps, so both modes see the same time
+line. Lines are counted as 120 wheel units per notch of 3 lines, events are
+all backend calls including modifier key presses.
+
+    python bench_scroll.py --seconds 5 --fps 30
+    python bench_scroll.py --horizontal
+"""
+
+# Imports
+
+import argparse
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'src'))
+from Gesture_Controller import Controller, Gest
+from display import DisplayGeometry
+from input_dispatch import NullBackend, ScrollWorker
+
+UNITS_PER_LINE = 40
+
+
+def hand_at(x, y):
+    return SimpleNamespace(landmark=[SimpleNamespace(x=x, y=y, z=0.0)]*21)
+
+
+def run(continuous, displacement, horizontal, fps, seconds):
+    """returns (lines per second, events per second) of one held pinch."""
+    backend = NullBackend()
+    scroller = ScrollWorker(backend, units_per_line=UNITS_PER_LINE) if continuous else None
+    controller = Controller(backend, display=DisplayGeometry(NullBackend(record=False)), scroller=scroller)
+    frames = int(seconds * fps)
+    ramp = max(1, int(0.2 * fps))  # reach the displacement within 200 ms
+    for i in range(frames):
+        offset = displacement * min(1.0, i / ramp)
+        hand = hand_at(0.5 + offset, 0.5) if horizontal else hand_at(0.5, 0.5 - offset)
+        controller.handle_controls(Gest.PINCH_MINOR, hand, i / fps)
+    controller.handle_controls(Gest.PALM, hand, frames / fps)
+
+    units = sum(abs(args[0]) for name, args, _ in backend.events if name == 'scroll')
+    return units / UNITS_PER_LINE / seconds, len(backend.events) / seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seconds', type=float, default=5.0)
+    parser.add_argument('--fps', type=float, default=30.0)
+    parser.add_argument('--horizontal', action='store_true', help="pinch sideways instead of up")
+    parser.add_argument('--displacement', type=float, nargs='+', default=[0.05, 0.1, 0.2, 0.3],
+                        help="pinch displacements, fraction of the frame")
+    args = parser.parse_args()
+
+    print("%.0f s held pinch at %.0f FPS, %s" % (args.seconds, args.fps,
+                                                 'horizontal' if args.horizontal else 'vertical'))
+    print("displacement   stepped lines/s  events/s   continuous lines/s  events/s")
+    for displacement in args.displacement:
+        step_lines, step_events = run(False, displacement, args.horizontal, args.fps, args.seconds)
+        cont_lines, cont_events = run(True, displacement, args.horizontal, args.fps, args.seconds)
+        print("%10.2f     %15.1f  %8.1f   %18.1f  %8.1f" % (
+            displacement, step_lines, step_events, cont_lines, cont_events))
+
+
+if __name__ == '__main__':
+    main()
@@ -4,12 +4,21 @@ import cv2
 import mediapipe as mp
 import pyautogui
 import math
+import time
+import struct
+import numpy as np
 from enum import IntEnum
-from ctypes import cast, POINTER
-from comtypes import CLSCTX_ALL
-from pycaw.pycaw import AudioUtilities, IAudioEndpointVolume
-from google.protobuf.json_format import MessageToDict
-import screen_brightness_control as sbcontrol
+from camera import CameraStream
+from cursor_filter import DampeningFilter, make_cursor_filter
+from display import DisplayGeometry
+from governor import IdleGovernor
+from hand_roi import HandROI
+from inference_pool import InferencePool, SyncInference
+from input_dispatch import InputDispatcher, ScrollWorker
+from preview import Preview
+from session import SessionRecorder
+from system_controls import LevelWorker, ScreenBrightness, default_volume_backend
+from tracing import tracer
 
 pyautogui.FAILSAFE = False
 mp_drawing = mp.solutions.drawing_utils
@@ -44,13 +53,151 @@ class HLabel(IntEnum):
     MINOR = 0
     MAJOR = 1
 
+# Landmark pairs measured every frame, 'a' -> 'b'
+# rows 0-3 : finger tip -> middle knuckle (signed)
+# rows 4-7 : middle knuckle -> wrist (signed)
+# row 8    : index tip -> thumb tip (pinch)
+# row 9    : index tip -> middle tip (V gesture)
+# row 10   : index knuckle -> middle knuckle (V gesture reference)
+FEATURE_PAIRS = np.array([[8,5],[12,9],[16,13],[20,17],
+                          [5,0],[9,0],[13,0],[17,0],
+                          [8,4],[8,12],[5,9]])
+FINGER_BITS = np.array([8,4,2,1])
+
+# Serialized 'NormalizedLandmark' starts with x, y, z as fixed32 fields:
+# 0x0a len | 0x0d x x x x | 0x15 y y y y | 0x1d z z z z | (visibility, presence)
+_landmark_structs = {}
+
+def landmarks_to_array(hand_result):
+    """
+    returns (N,3) float32 array of x, y, z of every landmark in 'hand_result'.
+
+    Unpacks the serialized message in one call instead of reading 3*N
+    protobuf attributes, falls back to attribute reads when the wire layout
+    is not the expected one. A 'LandmarkArray' from 'InferencePool'
+    already holds the array.
+
+    Returns
+    -------
+    numpy.ndarray
+    """
+    array = getattr(hand_result, 'array', None)
+    if array is not None:
+        return array
+    lms = hand_result.landmark
+    n = len(lms)
+    try:
+        raw = hand_result.SerializeToString()
+        stride = raw[1] + 2
+    except (AttributeError, IndexError):
+        raw, stride = b'', 0
+    if (stride >= 17 and len(raw) == n*stride and raw[0::stride] == b'\n'*n
+            and raw[2::stride] == b'\r'*n and raw[7::stride] == b'\x15'*n
+            and raw[12::stride] == b'\x1d'*n):
+        unpacker = _landmark_structs.get((n, stride))
+        if unpacker is None:
+            unpacker = struct.Struct('<' + ('xxxfxfxf' + 'x'*(stride - 17))*n)
+            _landmark_structs[(n, stride)] = unpacker
+        return np.array(unpacker.unpack(raw), dtype=np.float32).reshape(n, 3)
+
+    out = []
+    for lm in lms:
+        out.extend((lm.x, lm.y, lm.z))
+    return np.array(out, dtype=np.float32).reshape(n, 3)
+
+def compute_features(hands):
+    """
+    computes finger state, pinch distance, V gesture ratio and index-middle
+    z-delta of every 'HandRecog' in 'hands' that holds landmarks, using one
+    batch of array operations.
+
+    Parameters
+    ----------
+    hands : list of 'HandRecog'
+
+    Returns
+    -------
+    None
+    """
+    active = [hand for hand in hands if hand.landmarks is not None]
+    if not active:
+        return
+
+    # float32 holds protobuf floats exactly, math is done in float64 like
+    # the scalar version so thresholds give the same results.
+    pts = np.array([hand.landmarks for hand in active], dtype=np.float64)
+    pairs = pts[:, FEATURE_PAIRS, :2]
+    diff = pairs[:, :, 0] - pairs[:, :, 1]
+    dist = np.sqrt((diff*diff).sum(-1))
+    signed = np.where(diff[..., 1] < 0, dist, -dist)
+
+    den = signed[:, 4:8]
+    den[den == 0] = 0.01
+    # round(ratio,1) > 0.5 holds exactly when ratio >= 0.55
+    finger = (signed[:, 0:4] / den >= 0.55) @ FINGER_BITS
+    dz = np.abs(pts[:, 8, 2] - pts[:, 12, 2])
+
+    for hand, mask, (pinch, tips, knuckles), dz_tips in zip(
+            active, finger.tolist(), dist[:, 8:].tolist(), dz.tolist()):
+        hand.finger_mask = mask
+        hand.pinch_dist = pinch
+        hand.v_ratio = tips/knuckles if knuckles else math.inf
+        hand.dz_tips = dz_tips
+
+# Gesture Classification Table
+# 'HandRecog.get_gesture' looks the finger mask up in 'GESTURE_TABLE'. An
+# entry of None keeps the mask as gesture, otherwise the entry is a
+# refinement called as refine(hand) that returns the gesture, using the
+# measurements of 'compute_features'.
+def refine_pinch(hand):
+    """returns PINCH_MAJOR/PINCH_MINOR if index and thumb tips touch."""
+    if hand.pinch_dist < 0.05:
+        return Gest.PINCH_MINOR if hand.hand_label == HLabel.MINOR else Gest.PINCH_MAJOR
+    return hand.finger
+
+def refine_first2(hand):
+    """returns V_GEST, TWO_FINGER_CLOSED or MID for index and middle finger up."""
+    if hand.v_ratio > 1.7:
+        return Gest.V_GEST
+    if hand.dz_tips < 0.1:
+        return Gest.TWO_FINGER_CLOSED
+    return Gest.MID
+
+GESTURE_REFINERS = {
+    Gest.LAST3: refine_pinch,
+    Gest.LAST4: refine_pinch,
+    Gest.FIRST2: refine_first2,
+}
+GESTURE_TABLE = [None] * 32
+
+def compile_gesture_table():
+    """rebuilds 'GESTURE_TABLE' from 'GESTURE_REFINERS'."""
+    GESTURE_TABLE[:] = [GESTURE_REFINERS.get(mask) for mask in range(32)]
+
+def register_gesture(finger_mask, refine):
+    """
+    makes 'refine' classify every hand whose finger state is 'finger_mask'.
+    'refine' is called as refine(hand) with the 'HandRecog' and returns the
+    gesture, an int that may be a new code above 'Gest.PINCH_MINOR'.
+    Bind an action to new codes with 'bind_gesture'.
+    """
+    GESTURE_REFINERS[finger_mask] = refine
+    compile_gesture_table()
+
+compile_gesture_table()
+
+# Dwell times in ms, measured on capture timestamps so they hold at any frame
+# rate. 150 ms confirms on the same frame as the former 5 frame count at 30 FPS.
+GESTURE_DWELL_MS = 150
+PINCH_DWELL_MS = 150
+
 # Convert Mediapipe Landmarks to recognizable Gestures
 class HandRecog:
     """
     Convert Mediapipe Landmarks to recognizable Gestures.
     """
     
-    def __init__(self, hand_label):
+    def __init__(self, hand_label, dwell_ms=GESTURE_DWELL_MS):
         """
         Constructs all the necessary attributes for the HandRecog object.
 
@@ -65,10 +212,24 @@ class HandRecog:
             prev_gesture : int
                 Represent gesture corresponding to Enum 'Gest',
                 stores gesture computed for previous frame.
-            frame_count : int
-                total no. of frames since 'ori_gesture' is updated.
+            dwell_ms : float
+                time 'prev_gesture' has to persist before it becomes
+                'ori_gesture'.
+            held : float
+                seconds 'prev_gesture' has been seen, every frame with this
+                hand adds 'frame_time'.
+            frame_time : float
+                capture interval between the last two consecutive frames
+                with this hand.
+            last_seen : float
+                capture time of the last frame with this hand, None after a
+                frame without it.
             hand_result : Object
                 Landmarks obtained from mediapipe.
+            landmarks : numpy.ndarray
+                (21,3) float32 copy of 'hand_result', refreshed once per frame.
+            finger_mask, pinch_dist, v_ratio, dz_tips : int, float
+                per-frame measurements filled by 'compute_features'.
             hand_label : int
                 Represents multi-handedness corresponding to Enum 'HLabel'.
         """
@@ -76,12 +237,25 @@ class HandRecog:
         self.finger = 0
         self.ori_gesture = Gest.PALM
         self.prev_gesture = Gest.PALM
-        self.frame_count = 0
+        self.dwell_ms = dwell_ms
+        self.held = 0.0
+        self.frame_time = 0.0
+        self.last_seen = None
         self.hand_result = None
+        self.landmarks = None
+        self.finger_mask = None
+        self.pinch_dist = None
+        self.v_ratio = None
+        self.dz_tips = None
         self.hand_label = hand_label
     
     def update_hand_result(self, hand_result):
+        """stores 'hand_result' and converts its landmarks to an array."""
         self.hand_result = hand_result
+        self.landmarks = None if hand_result is None else landmarks_to_array(hand_result)
+        self.finger_mask = None
+        if hand_result is None:
+            self.last_seen = None
 
     def get_signed_dist(self, point):
         """
@@ -96,13 +270,10 @@ class HandRecog:
         -------
         float
         """
-        sign = -1
-        if self.hand_result.landmark[point[0]].y < self.hand_result.landmark[point[1]].y:
-            sign = 1
-        dist = (self.hand_result.landmark[point[0]].x - self.hand_result.landmark[point[1]].x)**2
-        dist += (self.hand_result.landmark[point[0]].y - self.hand_result.landmark[point[1]].y)**2
-        dist = math.sqrt(dist)
-        return dist*sign
+        p0, p1 = self.landmarks[point[0]], self.landmarks[point[1]]
+        sign = 1 if p0[1] < p1[1] else -1
+        dist = (float(p0[0]) - float(p1[0]))**2 + (float(p0[1]) - float(p1[1]))**2
+        return math.sqrt(dist)*sign
     
     def get_dist(self, point):
         """
@@ -117,10 +288,9 @@ class HandRecog:
         -------
         float
         """
-        dist = (self.hand_result.landmark[point[0]].x - self.hand_result.landmark[point[1]].x)**2
-        dist += (self.hand_result.landmark[point[0]].y - self.hand_result.landmark[point[1]].y)**2
-        dist = math.sqrt(dist)
-        return dist
+        p0, p1 = self.landmarks[point[0]], self.landmarks[point[1]]
+        dist = (float(p0[0]) - float(p1[0]))**2 + (float(p0[1]) - float(p1[1]))**2
+        return math.sqrt(dist)
     
     def get_dz(self,point):
         """
@@ -135,7 +305,7 @@ class HandRecog:
         -------
         float
         """
-        return abs(self.hand_result.landmark[point[0]].z - self.hand_result.landmark[point[1]].z)
+        return abs(float(self.landmarks[point[0]][2]) - float(self.landmarks[point[1]][2]))
     
     # Function to find Gesture Encoding using current finger_state.
     # Finger_state: 1 if finger is open, else 0
@@ -151,30 +321,27 @@ class HandRecog:
         if self.hand_result == None:
             return
 
-        points = [[8,5,0],[12,9,0],[16,13,0],[20,17,0]]
-        self.finger = 0
-        self.finger = self.finger | 0 #thumb
-        for idx,point in enumerate(points):
-            
-            dist = self.get_signed_dist(point[:2])
-            dist2 = self.get_signed_dist(point[1:])
-            
-            try:
-                ratio = round(dist/dist2,1)
-            except:
-                ratio = round(dist1/0.01,1)
-
-            self.finger = self.finger << 1
-            if ratio > 0.5 :
-                self.finger = self.finger | 1
+        if self.finger_mask is None:
+            compute_features([self])
+        self.finger = self.finger_mask
     
 
     # Handling Fluctations due to noise
-    def get_gesture(self):
+    def get_gesture(self, timestamp=None):
         """
         returns int representing gesture corresponding to Enum 'Gest'.
-        sets 'frame_count', 'ori_gesture', 'prev_gesture', 
+        sets 'held', 'ori_gesture', 'prev_gesture', 
         handles fluctations due to noise.
+
+        A gesture is confirmed once it has been seen for 'dwell_ms' of
+        capture time. While the hand is out of view the dwell pauses, the
+        frame it returns on counts as one 'frame_time'.
+
+        Parameters
+        ----------
+        timestamp : float
+            capture time of the frame in seconds, 'time.perf_counter'
+            by default.
         
         Returns
         -------
@@ -183,40 +350,82 @@ class HandRecog:
         if self.hand_result == None:
             return Gest.PALM
 
-        current_gesture = Gest.PALM
-        if self.finger in [Gest.LAST3,Gest.LAST4] and self.get_dist([8,4]) < 0.05:
-            if self.hand_label == HLabel.MINOR :
-                current_gesture = Gest.PINCH_MINOR
-            else:
-                current_gesture = Gest.PINCH_MAJOR
-
-        elif Gest.FIRST2 == self.finger :
-            point = [[8,12],[5,9]]
-            dist1 = self.get_dist(point[0])
-            dist2 = self.get_dist(point[1])
-            ratio = dist1/dist2
-            if ratio > 1.7:
-                current_gesture = Gest.V_GEST
-            else:
-                if self.get_dz([8,12]) < 0.1:
-                    current_gesture =  Gest.TWO_FINGER_CLOSED
-                else:
-                    current_gesture =  Gest.MID
-            
-        else:
-            current_gesture =  self.finger
-        
-        if current_gesture == self.prev_gesture:
-            self.frame_count += 1
-        else:
-            self.frame_count = 0
+        if self.finger_mask is None:
+            compute_features([self])
+
+        refine = GESTURE_TABLE[self.finger]
+        current_gesture = self.finger if refine is None else refine(self)
 
+        if timestamp is None:
+            timestamp = time.perf_counter()
+        if self.last_seen is not None:
+            self.frame_time = timestamp - self.last_seen
+        if current_gesture != self.prev_gesture:
+            self.held = 0.0
+        else:
+            self.held += self.frame_time
         self.prev_gesture = current_gesture
+        self.last_seen = timestamp
 
-        if self.frame_count > 4 :
+        if self.held >= self.dwell_ms / 1000.0:
             self.ori_gesture = current_gesture
         return self.ori_gesture
 
+    def skip_gesture(self, timestamp=None):
+        """
+        pauses the dwell for a frame whose gesture is not evaluated, e.g.
+        the major hand while the minor hand pinches, so the frame time of
+        the skipped frames is not added to 'held' on the next frame.
+        """
+        if self.hand_result is None:
+            return
+        self.last_seen = time.perf_counter() if timestamp is None else timestamp
+
+# Gesture Bindings
+class GestureBinding:
+    """
+    Entry of the 'Controller' gesture state machine.
+
+    Attributes
+    ----------
+    gesture : int
+        gesture code the binding handles.
+    action : callable
+        called as action(controller, x, y, hand_result) on every frame the
+        gesture is handled, x and y are the cursor position.
+    sets_flag : bool
+        True to arm 'Controller.flag' after the action.
+    needs_flag : bool
+        True to act only while 'Controller.flag' is armed, the flag is
+        cleared after the action.
+    hold : str or None
+        name of the 'Controller' flag that is True while the gesture is
+        held, e.g. 'grabflag'.
+    enter : callable or None
+        called as enter(controller, hand_result) when the hold starts.
+    exit : callable or None
+        called as exit(controller) when the hold ends.
+    """
+
+    def __init__(self, gesture, action, sets_flag=False, needs_flag=False, hold=None, enter=None, exit=None):
+        self.gesture = gesture
+        self.action = action
+        self.sets_flag = sets_flag
+        self.needs_flag = needs_flag
+        self.hold = hold
+        self.enter = enter
+        self.exit = exit
+
+GESTURE_BINDINGS = {}
+
+def bind_gesture(gesture, action, sets_flag=False, needs_flag=False, hold=None, enter=None, exit=None):
+    """
+    binds 'action' to 'gesture' for every 'Controller' created afterwards,
+    replacing any earlier binding, see 'GestureBinding' for the parameters.
+    Call at startup, before the controllers are created.
+    """
+    GESTURE_BINDINGS[gesture] = GestureBinding(gesture, action, sets_flag, needs_flag, hold, enter, exit)
+
 # Executes commands according to detected gestures
 class Controller:
     """
@@ -253,84 +462,134 @@ class Controller:
     pinchlv : int
         stores quantized magnitued of pinch gesture displacment, from 
         starting position
-    framecount : int
-        stores no. of frames since 'pinchlv' is updated.
+    pinch_held : float
+        seconds 'prevpinchlv' has been held, every frame that stays on it
+        adds its capture interval.
+    pinch_last : float
+        capture time of the previous 'pinch_control' call, None after
+        'pinch_control_init'.
+    pinch_dwell_ms : float
+        time 'prevpinchlv' has to be held before it is applied, and
+        between repeats while it stays held.
+    scroller : Object of 'ScrollWorker'
+        scrolls continuously at a speed set by the minor hand pinch, None
+        scrolls one step per held pinch level instead.
+    scroll_gain : float
+        scroll lines per second per pinch level past 'pinch_threshold'.
+    now : float
+        capture time of the frame being handled.
     prev_hand : tuple
-        stores (x, y) coordinates of hand in previous frame.
+        stores filtered (x, y) coordinates of hand in previous frame.
+    cursor_filter : Object of 'CursorFilter'
+        smooths hand position before it moves the cursor.
     pinch_threshold : float
         step size for quantization of 'pinchlv'.
+    display : Object of 'DisplayGeometry'
+        cached screen size and cursor position.
+    dispatcher : Object of 'InputDispatcher'
+        sends mouse and keyboard events off the frame loop.
+    volume : Object of 'LevelWorker'
+        applies system volume changes off the frame loop.
+    brightness : Object of 'LevelWorker'
+        fades screen brightness off the frame loop.
+    bindings : dict
+        'GestureBinding' of every handled gesture, a copy of
+        'GESTURE_BINDINGS' extended with 'Controller.bind'.
+    held : Object of 'GestureBinding'
+        binding whose 'hold' flag is set, None if no gesture is held.
+
+    Every 'GestureController' owns its own 'Controller', so several
+    sessions can run side by side in one process.
     """
 
-    tx_old = 0
-    ty_old = 0
-    trial = True
-    flag = False
-    grabflag = False
-    pinchmajorflag = False
-    pinchminorflag = False
-    pinchstartxcoord = None
-    pinchstartycoord = None
-    pinchdirectionflag = None
-    prevpinchlv = 0
-    pinchlv = 0
-    framecount = 0
-    prev_hand = None
-    pinch_threshold = 0.3
-    
-    def getpinchylv(hand_result):
+    def __init__(self, dispatcher=None, volume=None, brightness=None, display=None, cursor_filter=None,
+                 pinch_dwell_ms=PINCH_DWELL_MS, scroller=None):
+        """
+        Initializes gesture state with the given output backends, see
+        'GestureController' for the defaults it creates.
+        """
+        self.display = display
+        self.dispatcher = dispatcher
+        self.volume = volume
+        self.brightness = brightness
+        self.cursor_filter = cursor_filter or DampeningFilter()
+        self.pinch_threshold = 0.3
+        self.pinch_dwell_ms = pinch_dwell_ms
+        self.scroller = scroller
+        self.scroll_gain = 20.0
+        self.bindings = dict(GESTURE_BINDINGS)
+        self.reset()
+
+    def reset(self):
+        """Clears gesture state, e.g. before replaying a session."""
+        self.tx_old = 0
+        self.ty_old = 0
+        self.trial = True
+        self.flag = False
+        self.grabflag = False
+        self.pinchmajorflag = False
+        self.pinchminorflag = False
+        self.pinchstartxcoord = None
+        self.pinchstartycoord = None
+        self.pinchdirectionflag = None
+        self.prevpinchlv = 0
+        self.pinchlv = 0
+        self.pinch_held = 0.0
+        self.pinch_last = None
+        self.now = None
+        self.prev_hand = None
+        self.held = None
+        self.cursor_filter.reset()
+        if self.scroller is not None:
+            self.scroller.end()
+
+    def getpinchylv(self, hand_result):
         """returns distance beween starting pinch y coord and current hand position y coord."""
-        dist = round((Controller.pinchstartycoord - hand_result.landmark[8].y)*10,1)
+        dist = round((self.pinchstartycoord - hand_result.landmark[8].y)*10,1)
         return dist
 
-    def getpinchxlv(hand_result):
+    def getpinchxlv(self, hand_result):
         """returns distance beween starting pinch x coord and current hand position x coord."""
-        dist = round((hand_result.landmark[8].x - Controller.pinchstartxcoord)*10,1)
+        dist = round((hand_result.landmark[8].x - self.pinchstartxcoord)*10,1)
         return dist
     
-    def changesystembrightness():
+    def changesystembrightness(self):
         """sets system brightness based on 'Controller.pinchlv'."""
-        currentBrightnessLv = sbcontrol.get_brightness(display=0)/100.0
-        currentBrightnessLv += Controller.pinchlv/50.0
-        if currentBrightnessLv > 1.0:
-            currentBrightnessLv = 1.0
-        elif currentBrightnessLv < 0.0:
-            currentBrightnessLv = 0.0       
-        sbcontrol.fade_brightness(int(100*currentBrightnessLv) , start = sbcontrol.get_brightness(display=0))
+        self.brightness.change(self.pinchlv/50.0)
     
-    def changesystemvolume():
+    def changesystemvolume(self):
         """sets system volume based on 'Controller.pinchlv'."""
-        devices = AudioUtilities.GetSpeakers()
-        interface = devices.Activate(IAudioEndpointVolume._iid_, CLSCTX_ALL, None)
-        volume = cast(interface, POINTER(IAudioEndpointVolume))
-        currentVolumeLv = volume.GetMasterVolumeLevelScalar()
-        currentVolumeLv += Controller.pinchlv/50.0
-        if currentVolumeLv > 1.0:
-            currentVolumeLv = 1.0
-        elif currentVolumeLv < 0.0:
-            currentVolumeLv = 0.0
-        volume.SetMasterVolumeLevelScalar(currentVolumeLv, None)
+        self.volume.change(self.pinchlv/50.0)
     
-    def scrollVertical():
+    def scrollVertical(self):
         """scrolls on screen vertically."""
-        pyautogui.scroll(120 if Controller.pinchlv>0.0 else -120)
+        self.dispatcher.scroll(120 if self.pinchlv>0.0 else -120)
         
     
-    def scrollHorizontal():
+    def scrollHorizontal(self):
         """scrolls on screen horizontally."""
-        pyautogui.keyDown('shift')
-        pyautogui.keyDown('ctrl')
-        pyautogui.scroll(-120 if Controller.pinchlv>0.0 else 120)
-        pyautogui.keyUp('ctrl')
-        pyautogui.keyUp('shift')
+        self.dispatcher.keyDown('shift')
+        self.dispatcher.keyDown('ctrl')
+        self.dispatcher.scroll(-120 if self.pinchlv>0.0 else 120)
+        self.dispatcher.keyUp('ctrl')
+        self.dispatcher.keyUp('shift')
 
     # Locate Hand to get Cursor Position
-    # Stabilize cursor by Dampening
-    def get_position(hand_result):
+    # Stabilize cursor through 'cursor_filter'
+    def get_position(self, hand_result, timestamp=None):
         """
         returns coordinates of current hand position.
 
         Locates hand to get cursor position also stabilize cursor by 
-        dampening jerky motion of hand.
+        passing hand position through 'Controller.cursor_filter'.
+
+        Parameters
+        ----------
+        hand_result : Object
+            Landmarks obtained from mediapipe.
+        timestamp : float
+            capture time of the frame in seconds, 'time.perf_counter'
+            by default.
 
         Returns
         -------
@@ -338,41 +597,51 @@ class Controller:
         """
         point = 9
         position = [hand_result.landmark[point].x ,hand_result.landmark[point].y]
-        sx,sy = pyautogui.size()
-        x_old,y_old = pyautogui.position()
+        sx,sy = self.display.size()
+        x_old,y_old = self.display.position()
         x = int(position[0]*sx)
         y = int(position[1]*sy)
-        if Controller.prev_hand is None:
-            Controller.prev_hand = x,y
-        delta_x = x - Controller.prev_hand[0]
-        delta_y = y - Controller.prev_hand[1]
-
-        distsq = delta_x**2 + delta_y**2
-        ratio = 1
-        Controller.prev_hand = [x,y]
-
-        if distsq <= 25:
-            ratio = 0
-        elif distsq <= 900:
-            ratio = 0.07 * (distsq ** (1/2))
-        else:
-            ratio = 2.1
-        x , y = x_old + delta_x*ratio , y_old + delta_y*ratio
+        if timestamp is None:
+            timestamp = time.perf_counter()
+
+        cursor_filter = self.cursor_filter
+        if self.prev_hand is None:
+            cursor_filter.reset()
+        fx, fy = cursor_filter.update(x, y, timestamp)
+        if self.prev_hand is None:
+            self.prev_hand = fx,fy
+        delta_x = fx - self.prev_hand[0]
+        delta_y = fy - self.prev_hand[1]
+        self.prev_hand = [fx,fy]
+
+        gain = cursor_filter.gain
+        x , y = x_old + delta_x*gain , y_old + delta_y*gain
         return (x,y)
 
-    def pinch_control_init(hand_result):
+    def set_cursor_filter(self, name, **params):
+        """
+        selects cursor filter registered as 'name' in 'CURSOR_FILTERS'
+        ('dampening', 'one_euro', 'kalman'), 'params' override its defaults.
+        Parameters of the active filter can be tuned at any time with
+        'Controller.cursor_filter.set_params'.
+        """
+        self.cursor_filter = make_cursor_filter(name, **params)
+        self.prev_hand = None
+
+    def pinch_control_init(self, hand_result):
         """Initializes attributes for pinch gesture."""
-        Controller.pinchstartxcoord = hand_result.landmark[8].x
-        Controller.pinchstartycoord = hand_result.landmark[8].y
-        Controller.pinchlv = 0
-        Controller.prevpinchlv = 0
-        Controller.framecount = 0
+        self.pinchstartxcoord = hand_result.landmark[8].x
+        self.pinchstartycoord = hand_result.landmark[8].y
+        self.pinchlv = 0
+        self.prevpinchlv = 0
+        self.pinch_held = 0.0
+        self.pinch_last = None
 
-    # Hold final position for 5 frames to change status
-    def pinch_control(hand_result, controlHorizontal, controlVertical):
+    # Hold final position for 'pinch_dwell_ms' to change status
+    def pinch_control(self, hand_result, controlHorizontal, controlVertical):
         """
         calls 'controlHorizontal' or 'controlVertical' based on pinch flags, 
-        'framecount' and sets 'pinchlv'.
+        'pinch_held' and sets 'pinchlv'.
 
         Parameters
         ----------
@@ -387,87 +656,279 @@ class Controller:
         -------
         None
         """
-        if Controller.framecount == 5:
-            Controller.framecount = 0
-            Controller.pinchlv = Controller.prevpinchlv
+        frame_time = 0.0 if self.pinch_last is None else self.now - self.pinch_last
+        self.pinch_last = self.now
+        if self.pinch_held >= self.pinch_dwell_ms / 1000.0:
+            self.pinch_held = 0.0
+            self.pinchlv = self.prevpinchlv
 
-            if Controller.pinchdirectionflag == True:
+            if self.pinchdirectionflag == True:
                 controlHorizontal() #x
 
-            elif Controller.pinchdirectionflag == False:
+            elif self.pinchdirectionflag == False:
                 controlVertical() #y
 
-        lvx =  Controller.getpinchxlv(hand_result)
-        lvy =  Controller.getpinchylv(hand_result)
+        lvx =  self.getpinchxlv(hand_result)
+        lvy =  self.getpinchylv(hand_result)
             
-        if abs(lvy) > abs(lvx) and abs(lvy) > Controller.pinch_threshold:
-            Controller.pinchdirectionflag = False
-            if abs(Controller.prevpinchlv - lvy) < Controller.pinch_threshold:
-                Controller.framecount += 1
+        if abs(lvy) > abs(lvx) and abs(lvy) > self.pinch_threshold:
+            self.pinchdirectionflag = False
+            if abs(self.prevpinchlv - lvy) < self.pinch_threshold:
+                self.pinch_held += frame_time
             else:
-                Controller.prevpinchlv = lvy
-                Controller.framecount = 0
+                self.prevpinchlv = lvy
+                self.pinch_held = 0.0
 
-        elif abs(lvx) > Controller.pinch_threshold:
-            Controller.pinchdirectionflag = True
-            if abs(Controller.prevpinchlv - lvx) < Controller.pinch_threshold:
-                Controller.framecount += 1
+        elif abs(lvx) > self.pinch_threshold:
+            self.pinchdirectionflag = True
+            if abs(self.prevpinchlv - lvx) < self.pinch_threshold:
+                self.pinch_held += frame_time
             else:
-                Controller.prevpinchlv = lvx
-                Controller.framecount = 0
+                self.prevpinchlv = lvx
+                self.pinch_held = 0.0
+
+    def move_cursor(self, x, y, hand_result):
+        """moves the cursor to ('x', 'y')."""
+        self.dispatcher.moveTo(x, y, duration = 0.1)
+        self.display.moved_to(x, y)
+
+    def left_click(self, x, y, hand_result):
+        self.dispatcher.click()
+
+    def right_click(self, x, y, hand_result):
+        self.dispatcher.click(button='right')
+
+    def double_click(self, x, y, hand_result):
+        self.dispatcher.doubleClick()
+
+    def grab(self, hand_result):
+        self.dispatcher.mouseDown(button = "left")
+
+    def release(self):
+        self.dispatcher.mouseUp(button = "left")
+
+    def pinch_scroll(self, x, y, hand_result):
+        """
+        scrolls with minor hand pinch, at a speed set by the pinch
+        displacement through 'Controller.scroller', or in steps without it,
+        see 'Controller.pinch_control'.
+        """
+        if self.scroller is None:
+            self.pinch_control(hand_result,self.scrollHorizontal, self.scrollVertical)
+            return
+        lvx = self.getpinchxlv(hand_result)
+        lvy = self.getpinchylv(hand_result)
+        if abs(lvy) > abs(lvx):
+            self.scroller.set_velocity(0.0, self.scroll_speed(lvy), self.now)
+        else:
+            self.scroller.set_velocity(self.scroll_speed(lvx), 0.0, self.now)
+
+    def scroll_speed(self, level):
+        """returns scroll lines per second for pinch displacement 'level'."""
+        excess = abs(level) - self.pinch_threshold
+        if excess <= 0:
+            return 0.0
+        return math.copysign(self.scroll_gain * excess, level)
+
+    def pinch_scroll_end(self):
+        if self.scroller is not None:
+            self.scroller.end()
+
+    def pinch_levels_init(self, hand_result):
+        self.pinch_control_init(hand_result)
+        self.volume.refresh()
+        self.brightness.refresh()
+
+    def pinch_levels(self, x, y, hand_result):
+        """sets brightness and volume with major hand pinch, see 'Controller.pinch_control'."""
+        self.pinch_control(hand_result,self.changesystembrightness, self.changesystemvolume)
 
-    def handle_controls(gesture, hand_result):  
-        """Impliments all gesture functionality."""      
+    def bind(self, gesture, action, sets_flag=False, needs_flag=False, hold=None, enter=None, exit=None):
+        """
+        binds 'action' to 'gesture' for this controller only, replacing any
+        earlier binding, see 'bind_gesture'.
+        """
+        self.bindings[gesture] = GestureBinding(gesture, action, sets_flag, needs_flag, hold, enter, exit)
+
+    def release_held(self):
+        """
+        leaves the held state of 'Controller.held', running its 'exit', e.g.
+        when the frame loop goes idle while a pinch scroll or grab is held.
+        """
+        held = self.held
+        if held is None:
+            return
+        self.held = None
+        setattr(self, held.hold, False)
+        if held.exit is not None:
+            held.exit(self)
+
+    def handle_controls(self, gesture, hand_result, timestamp=None):  
+        """
+        Impliments all gesture functionality, runs the binding of 'gesture'
+        from 'Controller.bindings'.
+        """
+        if timestamp is None:
+            timestamp = time.perf_counter()
+        self.now = timestamp
         x,y = None,None
         if gesture != Gest.PALM :
-            x,y = Controller.get_position(hand_result)
-        
-        # flag reset
-        if gesture != Gest.FIST and Controller.grabflag:
-            Controller.grabflag = False
-            pyautogui.mouseUp(button = "left")
-
-        if gesture != Gest.PINCH_MAJOR and Controller.pinchmajorflag:
-            Controller.pinchmajorflag = False
-
-        if gesture != Gest.PINCH_MINOR and Controller.pinchminorflag:
-            Controller.pinchminorflag = False
-
-        # implementation
-        if gesture == Gest.V_GEST:
-            Controller.flag = True
-            pyautogui.moveTo(x, y, duration = 0.1)
-
-        elif gesture == Gest.FIST:
-            if not Controller.grabflag : 
-                Controller.grabflag = True
-                pyautogui.mouseDown(button = "left")
-            pyautogui.moveTo(x, y, duration = 0.1)
-
-        elif gesture == Gest.MID and Controller.flag:
-            pyautogui.click()
-            Controller.flag = False
-
-        elif gesture == Gest.INDEX and Controller.flag:
-            pyautogui.click(button='right')
-            Controller.flag = False
-
-        elif gesture == Gest.TWO_FINGER_CLOSED and Controller.flag:
-            pyautogui.doubleClick()
-            Controller.flag = False
-
-        elif gesture == Gest.PINCH_MINOR:
-            if Controller.pinchminorflag == False:
-                Controller.pinch_control_init(hand_result)
-                Controller.pinchminorflag = True
-            Controller.pinch_control(hand_result,Controller.scrollHorizontal, Controller.scrollVertical)
-        
-        elif gesture == Gest.PINCH_MAJOR:
-            if Controller.pinchmajorflag == False:
-                Controller.pinch_control_init(hand_result)
-                Controller.pinchmajorflag = True
-            Controller.pinch_control(hand_result,Controller.changesystembrightness, Controller.changesystemvolume)
+            x,y = self.get_position(hand_result, timestamp)
         
+        # leave the held state of the previous gesture
+        if self.held is not None and self.held.gesture != gesture:
+            self.release_held()
+
+        binding = self.bindings.get(gesture)
+        if binding is None or (binding.needs_flag and not self.flag):
+            return
+
+        if binding.hold is not None and self.held is None:
+            self.held = binding
+            setattr(self, binding.hold, True)
+            if binding.enter is not None:
+                binding.enter(self, hand_result)
+        binding.action(self, x, y, hand_result)
+        if binding.sets_flag:
+            self.flag = True
+        elif binding.needs_flag:
+            self.flag = False
+
+# Default Gesture Bindings
+bind_gesture(Gest.V_GEST, Controller.move_cursor, sets_flag=True)
+bind_gesture(Gest.FIST, Controller.move_cursor, hold='grabflag', enter=Controller.grab, exit=Controller.release)
+bind_gesture(Gest.MID, Controller.left_click, needs_flag=True)
+bind_gesture(Gest.INDEX, Controller.right_click, needs_flag=True)
+bind_gesture(Gest.TWO_FINGER_CLOSED, Controller.double_click, needs_flag=True)
+bind_gesture(Gest.PINCH_MINOR, Controller.pinch_scroll, hold='pinchminorflag', enter=Controller.pinch_control_init,
+             exit=Controller.pinch_scroll_end)
+bind_gesture(Gest.PINCH_MAJOR, Controller.pinch_levels, hold='pinchmajorflag', enter=Controller.pinch_levels_init)
+
+# Keeps hand identity stable across frames
+class HandednessTracker:
+    """
+    Resolves which detected hand is 'Right' and which is 'Left', reading the
+    classification fields directly and keeping the assignment stable across
+    frames.
+
+    Mediapipe's handedness label can flip for a frame or two, specially when
+    hands cross or only one is visible. A hand is therefore matched to the
+    palm position of each hand in the previous frames first, and the label is
+    used only when no previous position is close enough.
+
+    Attributes
+    ----------
+    max_jump : float
+        largest normalized palm movement between two frames still considered
+        the same hand.
+    max_missing : int
+        no. of frames a hand may be missing before its position is forgotten.
+    anchors : dict
+        'Right'/'Left' -> [x, y, missing], palm centre of each hand when last
+        seen and no. of frames since then.
+    """
+
+    def __init__(self, max_jump=0.15, max_missing=5):
+        self.max_jump = max_jump
+        self.max_missing = max_missing
+        self.anchors = {}
+
+    def reset(self):
+        """Forgets previous hand positions."""
+        self.anchors = {}
+
+    def _assign(self, hands):
+        """
+        returns list of 'Right'/'Left' roles, one for each of 'hands'.
+
+        Parameters
+        ----------
+        hands : list of tuple(str, float, float, float)
+            label, score and palm centre x, y of each hand, at most two.
+        """
+        if len(hands) == 1:
+            candidates = [['Right'], ['Left']]
+        else:
+            candidates = [['Right', 'Left'], ['Left', 'Right']]
+
+        best, best_cost = None, None
+        for roles in candidates:
+            cost, matched = 0.0, 0
+            for role, (_, _, x, y) in zip(roles, hands):
+                anchor = self.anchors.get(role)
+                if anchor is None:
+                    continue
+                dist = math.hypot(x - anchor[0], y - anchor[1])
+                if dist > self.max_jump:
+                    break
+                cost += dist
+                matched += 1
+            else:
+                if matched and (best_cost is None or cost < best_cost):
+                    best, best_cost = roles, cost
+        if best is not None:
+            return best
+
+        # Nothing close to previous positions, trust the classifier.
+        if len(hands) == 1:
+            return [hands[0][0]]
+        if hands[0][0] != hands[1][0]:
+            return [hands[0][0], hands[1][0]]
+        keep = 0 if hands[0][1] >= hands[1][1] else 1
+        other = 'Left' if hands[keep][0] == 'Right' else 'Right'
+        return [hands[0][0], other] if keep == 0 else [other, hands[1][0]]
+
+    def resolve(self, results, dom_hand=True):
+        """
+        returns (major, minor) hand landmarks from mediapipe 'results', None
+        for a hand that is not visible.
+
+        Parameters
+        ----------
+        results : Object
+            output of 'mp_hands.Hands.process'.
+        dom_hand : bool
+            True if right hand is domaniant hand, otherwise False.
+
+        Returns
+        -------
+        tuple(Object, Object)
+        """
+        landmarks = results.multi_hand_landmarks or []
+        handedness = results.multi_handedness or []
+        hands = []
+        for hand_result, hand_class in zip(landmarks[:2], handedness[:2]):
+            category = hand_class.classification[0]
+            palm = hand_result.landmark[9]
+            hands.append((category.label, category.score, palm.x, palm.y))
+
+        assigned = {}
+        if hands:
+            for idx, role in enumerate(self._assign(hands)):
+                assigned[role] = idx
+
+        for role in ('Right', 'Left'):
+            if role in assigned:
+                _, _, x, y = hands[assigned[role]]
+                self.anchors[role] = [x, y, 0]
+            elif role in self.anchors:
+                self.anchors[role][2] += 1
+                if self.anchors[role][2] > self.max_missing:
+                    del self.anchors[role]
+
+        right = landmarks[assigned['Right']] if 'Right' in assigned else None
+        left = landmarks[assigned['Left']] if 'Left' in assigned else None
+        if dom_hand:
+            return right, left
+        return left, right
+
+def draw_hands(image, multi_hand_landmarks):
+    """draws hand landmarks on BGR 'image', used by the preview window."""
+    for hand_landmarks in multi_hand_landmarks:
+        if hasattr(hand_landmarks, 'to_proto'):
+            hand_landmarks = hand_landmarks.to_proto()
+        mp_drawing.draw_landmarks(image, hand_landmarks, mp_hands.HAND_CONNECTIONS)
+
 '''
 ----------------------------------------  Main Class  ----------------------------------------
     Entry point of Gesture Controller
@@ -484,12 +945,17 @@ class GestureController:
     gc_mode : int
         indicates weather gesture controller is running or not,
         1 if running, otherwise 0.
+    camera : int or str
+        camera index or video file opened by 'cv2.VideoCapture', None to
+        open no camera, e.g. to feed 'handle_results' from a session.
     cap : Object
         object obtained from cv2, for capturing video frame.
     CAM_HEIGHT : int
         highet in pixels of obtained frame from camera.
     CAM_WIDTH : int
         width in pixels of obtained frame from camera.
+    controller : Object of 'Controller'
+        gesture state and output backends of this session.
     hr_major : Object of 'HandRecog'
         object representing major hand.
     hr_minor : Object of 'HandRecog'
@@ -497,53 +963,132 @@ class GestureController:
     dom_hand : bool
         True if right hand is domaniant hand, otherwise False.
         default True.
+    handedness : Object of 'HandednessTracker'
+        keeps 'hr_major', 'hr_minor' assignment stable across frames.
+    use_roi : bool
+        True to run mediapipe on a crop around the hands of the previous
+        frame, see 'HandROI'. default True.
+    headless : bool
+        True to run without preview window, stop with 'stop'.
+        default False.
+    preview_fps : float
+        maximum refresh rate of the preview window.
+    record_path : str
+        if set, frames, timestamps and landmarks are recorded to this
+        session directory, see 'SessionRecorder'.
+    frames : int
+        no. of camera frames processed by 'start'.
+    governor : Object of 'IdleGovernor'
+        drops to a slow, low resolution detection cadence after
+        'idle_after' seconds without hands, None never goes idle.
+    inference_workers : int
+        no. of processes running mediapipe through 'InferencePool', 0 runs
+        it in the frame loop. Workers process whole frames, 'use_roi'
+        applies to the in-process mode only.
+    dwell_ms : float
+        time a gesture has to persist before it is handled, see
+        'HandRecog.get_gesture'.
+
+    All state belongs to the instance, several controllers can run at the
+    same time on different cameras, see 'supervisor.Supervisor'.
     """
-    gc_mode = 0
-    cap = None
-    CAM_HEIGHT = None
-    CAM_WIDTH = None
-    hr_major = None # Right Hand by default
-    hr_minor = None # Left hand by default
-    dom_hand = True
-
-    def __init__(self):
-        """Initilaizes attributes."""
-        GestureController.gc_mode = 1
-        GestureController.cap = cv2.VideoCapture(0)
-        GestureController.CAM_HEIGHT = GestureController.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)
-        GestureController.CAM_WIDTH = GestureController.cap.get(cv2.CAP_PROP_FRAME_WIDTH)
-    
-    def classify_hands(results):
+
+    def __init__(self, camera=0, controller=None, dom_hand=True, use_roi=True,
+                 headless=False, preview_fps=10, record_path=None, idle_after=3.0, inference_workers=0,
+                 dwell_ms=GESTURE_DWELL_MS, pinch_dwell_ms=PINCH_DWELL_MS):
+        """
+        Initilaizes attributes and opens 'camera'. Without 'controller' a
+        new one is created with its own display, input, scroll, volume and
+        brightness workers, which are stopped when 'start' returns, and
+        'pinch_dwell_ms'.
+        """
+        self.gc_mode = 1
+        self.camera = camera
+        self.cap = None
+        self.CAM_HEIGHT = None
+        self.CAM_WIDTH = None
+        if camera is not None:
+            self.cap = cv2.VideoCapture(camera)
+            self.CAM_HEIGHT = self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)
+            self.CAM_WIDTH = self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)
+        self.workers = []
+        if controller is None:
+            dispatcher = InputDispatcher().start()
+            display = DisplayGeometry(dispatcher=dispatcher).start()
+            # stopped before the dispatcher, so held scroll modifiers get released
+            scroller = ScrollWorker(dispatcher).start()
+            volume = LevelWorker(default_volume_backend, 'volume').start()
+            brightness = LevelWorker(ScreenBrightness, 'brightness').start()
+            self.workers = [display, scroller, dispatcher, volume, brightness]
+            controller = Controller(dispatcher, volume, brightness, display, pinch_dwell_ms=pinch_dwell_ms,
+                                    scroller=scroller)
+        self.controller = controller
+        self.hr_major = None # Right Hand by default
+        self.hr_minor = None # Left hand by default
+        self.dom_hand = dom_hand
+        self.handedness = HandednessTracker()
+        self.use_roi = use_roi
+        self.headless = headless
+        self.preview_fps = preview_fps
+        self.record_path = record_path
+        self.frames = 0
+        self.governor = IdleGovernor(enabled=idle_after is not None, idle_after=idle_after or 0.0)
+        self.inference_workers = inference_workers
+        self.dwell_ms = dwell_ms
+
+    def stop(self):
+        """Ends the frame loop of 'start', safe to call from any thread."""
+        self.gc_mode = 0
+
+    def classify_hands(self, results):
         """
         sets 'hr_major', 'hr_minor' based on classification(left, right) of 
         hand obtained from mediapipe, uses 'dom_hand' to decide major and
-        minor hand.
-        """
-        left , right = None,None
-        try:
-            handedness_dict = MessageToDict(results.multi_handedness[0])
-            if handedness_dict['classification'][0]['label'] == 'Right':
-                right = results.multi_hand_landmarks[0]
-            else :
-                left = results.multi_hand_landmarks[0]
-        except:
-            pass
-
-        try:
-            handedness_dict = MessageToDict(results.multi_handedness[1])
-            if handedness_dict['classification'][0]['label'] == 'Right':
-                right = results.multi_hand_landmarks[1]
-            else :
-                left = results.multi_hand_landmarks[1]
-        except:
-            pass
-        
-        if GestureController.dom_hand == True:
-            GestureController.hr_major = right
-            GestureController.hr_minor = left
-        else :
-            GestureController.hr_major = left
-            GestureController.hr_minor = right
+        minor hand and 'handedness' to keep them stable across frames.
+        """
+        self.hr_major, self.hr_minor = self.handedness.resolve(results, self.dom_hand)
+
+    def handle_results(self, handmajor, handminor, results, timestamp=None):
+        """
+        runs gesture recognition and controls for one frame of mediapipe
+        'results', returns the gesture handled or None if no hand was found.
+
+        Parameters
+        ----------
+        handmajor, handminor : Object of 'HandRecog'
+        results : Object
+            output of 'mp_hands.Hands.process'.
+        timestamp : float
+            capture time of the frame.
+        """
+        if not results.multi_hand_landmarks:
+            self.controller.prev_hand = None
+            # a held grab outlasts a dropout, the scroll must not
+            self.controller.pinch_scroll_end()
+            self.handedness.resolve(results)
+            handmajor.update_hand_result(None)
+            handminor.update_hand_result(None)
+            return None
+
+        self.classify_hands(results)
+        handmajor.update_hand_result(self.hr_major)
+        handminor.update_hand_result(self.hr_minor)
+        compute_features([handmajor, handminor])
+
+        handmajor.set_finger_state()
+        handminor.set_finger_state()
+        with tracer.span('HandRecog.get_gesture'):
+            gest_name = handminor.get_gesture(timestamp)
+            hand = handminor
+            if gest_name != Gest.PINCH_MINOR:
+                gest_name = handmajor.get_gesture(timestamp)
+                hand = handmajor
+            else:
+                handmajor.skip_gesture(timestamp)
+
+        with tracer.span('Controller.handle_controls'):
+            self.controller.handle_controls(gest_name, hand.hand_result, timestamp)
+        return gest_name
 
     def start(self):
         """
@@ -552,48 +1097,79 @@ class GestureController:
         controlling.
         """
         
-        handmajor = HandRecog(HLabel.MAJOR)
-        handminor = HandRecog(HLabel.MINOR)
+        handmajor = HandRecog(HLabel.MAJOR, self.dwell_ms)
+        handminor = HandRecog(HLabel.MINOR, self.dwell_ms)
+        stream = CameraStream(self.cap).start()
+        recorder = None
+        if self.record_path:
+            recorder = SessionRecorder(self.record_path, 'hands', 'Gesture_Controller', 2, 21).start()
+        preview = None
+        if not self.headless:
+            preview = Preview('Gesture Controller', draw_hands, self.preview_fps).start()
 
-        with mp_hands.Hands(max_num_hands = 2,min_detection_confidence=0.5, min_tracking_confidence=0.5) as hands:
-            while GestureController.cap.isOpened() and GestureController.gc_mode:
-                success, image = GestureController.cap.read()
+        hands_args = dict(max_num_hands = 2,min_detection_confidence=0.5, min_tracking_confidence=0.5)
+        if self.inference_workers:
+            inference = InferencePool('hands', self.inference_workers, **hands_args)
+        else:
+            inference = SyncInference(HandROI(enabled=self.use_roi, **hands_args))
 
-                if not success:
-                    print("Ignoring empty camera frame.")
-                    continue
-                
-                image = cv2.cvtColor(cv2.flip(image, 1), cv2.COLOR_BGR2RGB)
-                image.flags.writeable = False
-                results = hands.process(image)
-                
-                image.flags.writeable = True
-                image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
-
-                if results.multi_hand_landmarks:                   
-                    GestureController.classify_hands(results)
-                    handmajor.update_hand_result(GestureController.hr_major)
-                    handminor.update_hand_result(GestureController.hr_minor)
-
-                    handmajor.set_finger_state()
-                    handminor.set_finger_state()
-                    gest_name = handminor.get_gesture()
-
-                    if gest_name == Gest.PINCH_MINOR:
-                        Controller.handle_controls(gest_name, handminor.hand_result)
-                    else:
-                        gest_name = handmajor.get_gesture()
-                        Controller.handle_controls(gest_name, handmajor.hand_result)
-                    
-                    for hand_landmarks in results.multi_hand_landmarks:
-                        mp_drawing.draw_landmarks(image, hand_landmarks, mp_hands.HAND_CONNECTIONS)
+        def dispatch(finished):
+            """handles the inference results in 'finished', oldest first."""
+            for (frame, captured_at, idle, image), results in finished:
+                self.governor.update(bool(results.multi_hand_landmarks), captured_at)
+                if not idle:
+                    self.handle_results(handmajor, handminor, results, captured_at)
+                    # with or without a hand, the frame's controls are done
+                    stream.mark_dispatched(captured_at)
                 else:
-                    Controller.prev_hand = None
-                cv2.imshow('Gesture Controller', image)
-                if cv2.waitKey(5) & 0xFF == 13:
-                    break
-        GestureController.cap.release()
-        cv2.destroyAllWindows()
+                    self.controller.release_held()
+                    handmajor.ori_gesture = handminor.ori_gesture = Gest.PALM
+                self.frames += 1
+                if recorder is not None:
+                    recorder.write(frame, captured_at, results.multi_hand_landmarks, results.multi_handedness)
+
+                if preview is not None:
+                    preview.submit(image, results.multi_hand_landmarks)
+                    if preview.closed:
+                        self.stop()
+
+        with inference:
+            while stream.isOpened() and self.gc_mode:
+                with tracer.span('frame'):
+                    with tracer.span('cap.read'):
+                        success, frame, captured_at = stream.read()
+
+                    if not success:
+                        print("Ignoring empty camera frame.")
+                        continue
+                    if not self.governor.due(captured_at):
+                        continue
+
+                    # idle frames only look for a hand, controls resume with the next frame
+                    idle = self.governor.idle
+                    image = cv2.cvtColor(cv2.flip(self.governor.prepare(frame), 1), cv2.COLOR_BGR2RGB)
+                    image.flags.writeable = False
+                    with tracer.span('hands.process'):
+                        finished = inference.push(image, (frame, captured_at, idle, image))
+
+                    dispatch(finished)
+
+            # frames still in the workers, so a recording keeps its tail
+            with tracer.span('hands.drain'):
+                dispatch(inference.drain())
+        if preview is not None:
+            preview.stop()
+        if recorder is not None:
+            recorder.close()
+        stream.release()
+        for worker in self.workers:
+            worker.stop()
+        self.gc_mode = 0
+        print(stream.report())
+        print(inference.report())
+        print(self.governor.report())
+        if tracer.events:
+            print("trace written to", tracer.dump())
 
 #gc1 = GestureController()
 #gc1.start()
\ No newline at end of file
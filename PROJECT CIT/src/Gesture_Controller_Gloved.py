@@ -2,44 +2,26 @@ import numpy as np
 import cv2
 import cv2.aruco as aruco
 import os
-import glob
 import math
 import pyautogui
 import time
+from calibration import CalibrationStore
+from display import DisplayGeometry
+from input_dispatch import InputDispatcher
+from marker_tracker import DetectTracker
+from scheduler import FrameScheduler
+from session import SessionRecorder
+from tracing import tracer
 
 class Marker:
-    def __init__(self, dict_type = aruco.DICT_4X4_50, thresh_constant = 1):
+    def __init__(self, dict_type = aruco.DICT_4X4_50, thresh_constant = 1, intrinsics = None):
         self.aruco_dict = aruco.Dictionary_get(dict_type)
         self.parameters = aruco.DetectorParameters_create()
         self.parameters.adaptiveThreshConstant = thresh_constant
         self.corners = None # corners of Marker
         self.marker_x2y = 1 # width:height ratio
-        self.mtx, self.dist = Marker.calibrate()
-    
-    def calibrate():
-        criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 30, 0.001)
-        objp = np.zeros((6*7,3), np.float32)
-        objp[:,:2] = np.mgrid[0:7,0:6].T.reshape(-1,2)
-        objpoints = [] # 3d point in real world space
-        imgpoints = [] # 2d points in image plane.
-        path = os.path.dirname(os.path.abspath(__file__))
-        p1 = path + r'\calib_images\checkerboard\*.jpg'
-        images = glob.glob(p1)
-        for fname in images:
-            img = cv2.imread(fname)
-            gray = cv2.cvtColor(img,cv2.COLOR_BGR2GRAY)
-            ret, corners = cv2.findChessboardCorners(gray, (7,6),None)
-            if ret == True:
-                objpoints.append(objp)
-                corners2 = cv2.cornerSubPix(gray,corners,(11,11),(-1,-1),criteria)
-                imgpoints.append(corners2)
-                img = cv2.drawChessboardCorners(img, (7,6), corners2,ret)
-                
-        ret, mtx, dist, rvecs, tvecs = cv2.calibrateCamera(objpoints, imgpoints, gray.shape[::-1],None,None)
-        
-        #mtx = [[534.34144579,0.0,339.15527836],[0.0,534.68425882,233.84359493],[0.0,0.0,1.0]]
-        #dist = [[-2.88320983e-01, 5.41079685e-02, 1.73501622e-03, -2.61333895e-04, 2.04110465e-01]]
-        return mtx, dist
+        # (camera matrix, distortion), cached calibration from 'calib_images' by default
+        self.mtx, self.dist = intrinsics if intrinsics is not None else CalibrationStore().load()
     
     def detect(self, frame):
         gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
@@ -59,10 +41,6 @@ class Marker:
     
         
 
-def ecu_dis(p1, p2):
-    dist = np.sqrt((p1[0]-p2[0])**2 + (p1[1]-p2[1])**2)
-    return dist
-
 def find_HSV(samples):
     try:
         color = np.uint8([ samples ])
@@ -79,18 +57,98 @@ def draw_box(frame, points, color=(0,255,127)):
         frame = cv2.line(frame, points[2], points[3], color, thickness=2, lineType=8) #bottom
         frame = cv2.line(frame, points[3], points[0], color, thickness=2, lineType=8) #left
 
-def in_cam(val, type_):
-    if type_ == 'x':
-        if val<0:
-            return 0
-        if val>GestureController.cam_width:
-            return GestureController.cam_width
-    elif type_ == 'y':
-        if val<0:
-            return 0
-        if val>GestureController.cam_height:
-            return GestureController.cam_height
-    return val
+def region_transform(regions):
+    """
+    returns the (5, 2 * corners) matrix 'marker_regions' maps markers with.
+
+    'regions' is a list of (quad, lift). A quad is four (x, y) corners in
+    marker units: x along the top edge of the marker from its mid-point, y
+    up and perpendicular to it, both in marker heights. 'lift' shifts the
+    region straight up the frame by that many marker heights.
+    """
+    columns = []
+    for quad, lift in regions:
+        for x, y in quad:
+            columns.append((x, y, 0.0, 0.5, 0.0))
+            columns.append((-y, x, -lift, 0.0, 0.5))
+    return np.array(columns).T
+
+
+def marker_regions(corners, transform, frame_shape):
+    """
+    returns the corners of regions placed relative to each marker, clamped
+    to the frame.
+
+    A marker is reduced to its top edge direction scaled to the marker
+    height, its height and twice its top edge mid-point. The edge direction
+    is taken pointing right, so regions with positive y stay above the
+    marker however it is turned and vertical edges need no special case.
+    The regions of all markers are then one product with 'transform'.
+
+    Parameters
+    ----------
+    corners : numpy.ndarray
+        (markers, 4, 2) marker corners in 'aruco.detectMarkers' order.
+    transform : numpy.ndarray
+        matrix of 'region_transform'.
+    frame_shape : tuple
+        shape of the frame to clamp to.
+
+    Returns
+    -------
+    points : numpy.ndarray
+        (markers, corners, 2) int region corners.
+    top : numpy.ndarray
+        (markers, 2) mid-points of the top edges.
+    x2y : numpy.ndarray
+        (markers,) width to height ratio, 999.0 for a degenerate marker.
+    """
+    c = np.asarray(corners).reshape(-1, 4, 2).astype(int)
+    edges = c[:, [1, 2, 3, 0]] - c
+    width, right, _, height = np.sqrt((edges * edges).sum(axis=2)).T
+    x2y = np.where(right > 0, width / np.maximum(right, 1), 999.0)
+    along = edges[:, 0] * np.copysign(height / np.maximum(width, 1), edges[:, 0, 0])[:, None]
+    marker = np.column_stack([along, height, c[:, 0] + c[:, 1]])
+    points = (marker @ transform).reshape(len(c), -1, 2)
+    points = np.minimum(np.maximum(points, 0), frame_shape[1::-1])
+    return points.astype(int), marker[:, 3:] / 2, x2y
+
+
+class BufferPool:
+    """
+    Named image buffers reused from frame to frame, so images whose size
+    changes every frame do not allocate a new array each time.
+
+    'get' returns a contiguous view of the start of a flat buffer, which is
+    allocated at 'capacity' bytes, or larger if a bigger image is asked
+    for. A view stays valid until the next 'get' of the same name.
+
+    Attributes
+    ----------
+    capacity : int
+        bytes allocated for a new buffer, at least.
+    allocations : int
+        no. of buffers allocated so far.
+    """
+
+    def __init__(self, capacity=0):
+        self.capacity = capacity
+        self.allocations = 0
+        self._buffers = {}
+
+    def get(self, name, shape, dtype=np.uint8):
+        """returns an uninitialised array 'shape' of 'dtype' backed by buffer 'name'."""
+        dtype = np.dtype(dtype)
+        size = math.prod(shape) * dtype.itemsize
+        buffer = self._buffers.get(name)
+        if buffer is None or buffer.size < size:
+            buffer = np.empty(max(size, self.capacity), np.uint8)
+            self._buffers[name] = buffer
+            self.allocations += 1
+        view = buffer[:size]
+        if dtype != buffer.dtype:
+            view = view.view(dtype)
+        return view.reshape(shape)
 
     
 class ROI:
@@ -106,146 +164,84 @@ class ROI:
         self.hsv_corners = None
         
         self.marker_top = None
-        self.glove_hsv = None
+        self.hsv_glove = None
+        
+        # hand region and glove colour sample, both above the marker's top edge
+        self.regions = region_transform([
+            ([(-roi_alpha1, 0), (roi_alpha2, 0), (roi_alpha2, roi_beta), (-roi_alpha1, roi_beta)], 0.0),
+            ([(-hsv_alpha, 0), (hsv_alpha, 0), (hsv_alpha, hsv_beta), (-hsv_alpha, hsv_beta)], hsv_lift_up),
+        ])
+        
+        # segmentation buffers of 'cropROI', sized to the frame on first use
+        self.buffers = BufferPool()
+        self.kernel_open = np.ones((3,3),np.uint8)
+        self.kernel_close = np.ones((5,5),np.uint8)
+        self.lower_range = np.array([0,50,50])
+        self.upper_range = np.array([0,255,255])
+        self._pts = np.zeros((4,2), np.int32)
         
     def findROI(self, frame, marker):
-        rec_coor = marker.corners[0][0]
-        c1 = (int(rec_coor[0][0]),int(rec_coor[0][1]))
-        c2 = (int(rec_coor[1][0]),int(rec_coor[1][1]))
-        c3 = (int(rec_coor[2][0]),int(rec_coor[2][1]))
-        c4 = (int(rec_coor[3][0]),int(rec_coor[3][1]))
-        
-        try:
-            marker.marker_x2y = np.sqrt((c1[0]-c2[0])**2 + (c1[1]-c2[1])**2) / np.sqrt((c3[0]-c2[0])**2 + (c3[1]-c2[1])**2)
-        except:
-            marker.marker_x2y = 999.0
-        
-        #mid-point of top line of Marker
-        cx = (c1[0] + c2[0])/2
-        cy = (c1[1] + c2[1])/2
-        
-        self.marker_top = [cx, cy]
-        
-        l = np.absolute(ecu_dis(c1,c4))
-        
-        try:
-            slope_12 = (c1[1]-c2[1])/(c1[0]-c2[0])
-        except:
-            slope_12 = (c1[1]-c2[1])*999.0 + 0.1
-        
-        try:
-            slope_14 = -1 / slope_12
-        except:
-            slope_14 = -999.0
-        
-        if slope_14 < 0:
-            sign = 1
-        else:
-            sign = -1
-        
-        bot_rx = int(cx + self.roi_alpha2 * l * np.sqrt(1/(1+slope_12**2)))
-        bot_ry = int(cy + self.roi_alpha2 * slope_12 * l * np.sqrt(1/(1+slope_12**2)))
-        
-        bot_lx = int(cx - self.roi_alpha1 * l * np.sqrt(1/(1+slope_12**2)))
-        bot_ly = int(cy - self.roi_alpha1 * slope_12 * l * np.sqrt(1/(1+slope_12**2)))
-        
-        top_lx = int(bot_lx + sign * self.roi_beta * l * np.sqrt(1/(1+slope_14**2)))
-        top_ly = int(bot_ly + sign * self.roi_beta * slope_14 * l * np.sqrt(1/(1+slope_14**2)))
-        
-        top_rx = int(bot_rx + sign * self.roi_beta * l * np.sqrt(1/(1+slope_14**2)))
-        top_ry = int(bot_ry + sign * self.roi_beta * slope_14 * l * np.sqrt(1/(1+slope_14**2)))
-        
-        bot_lx = in_cam(bot_lx, 'x')
-        bot_ly = in_cam(bot_ly, 'y')
-        
-        bot_rx = in_cam(bot_rx, 'x')
-        bot_ry = in_cam(bot_ry, 'y')
-        
-        top_lx = in_cam(top_lx, 'x')
-        top_ly = in_cam(top_ly, 'y')
-        
-        top_rx = in_cam(top_rx, 'x')
-        top_ry = in_cam(top_ry, 'y')
-        
-        self.roi_corners = [(bot_lx,bot_ly), (bot_rx,bot_ry), (top_rx,top_ry), (top_lx,top_ly)]
+        """
+        places the hand region and the glove colour sample relative to the
+        first marker of 'marker', see 'marker_regions'.
+        """
+        points, top, x2y = marker_regions(marker.corners[0], self.regions, frame.shape)
+        marker.marker_x2y = float(x2y[0])
+        self.marker_top = top[0].tolist()
+        corners = [tuple(p) for p in points[0].tolist()]
+        self.roi_corners = corners[:4]
+        self.hsv_corners = corners[4:]
         
         
     def find_glove_hsv(self, frame, marker):
-        rec_coor = marker.corners[0][0]
-        c1 = (int(rec_coor[0][0]),int(rec_coor[0][1]))
-        c2 = (int(rec_coor[1][0]),int(rec_coor[1][1]))
-        c3 = (int(rec_coor[2][0]),int(rec_coor[2][1]))
-        c4 = (int(rec_coor[3][0]),int(rec_coor[3][1]))
-        
-        l = np.absolute(ecu_dis(c1,c4))
-        
-        try:
-            slope_12 = (c1[1]-c2[1])/(c1[0]-c2[0])
-        except:
-            slope_12 = (c1[1]-c2[1])*999.0 + 0.1
-        try:
-            slope_14 = -1 / slope_12
-        except:
-            slope_14 = -999.0
-        
-        if slope_14 < 0:
-            sign = 1
-        else:
-            sign = -1
-               
-        bot_rx = int(self.marker_top[0] + self.hsv_alpha * l * np.sqrt(1/(1+slope_12**2)))
-        bot_ry = int(self.marker_top[1] - self.hsv_lift_up*l + self.hsv_alpha * slope_12 * l * np.sqrt(1/(1+slope_12**2)))
-        
-        bot_lx = int(self.marker_top[0] - self.hsv_alpha * l * np.sqrt(1/(1+slope_12**2)))
-        bot_ly = int(self.marker_top[1] - self.hsv_lift_up*l - self.hsv_alpha * slope_12 * l * np.sqrt(1/(1+slope_12**2)))
-        
-        top_lx = int(bot_lx + sign * self.hsv_beta * l * np.sqrt(1/(1+slope_14**2)))
-        top_ly = int(bot_ly + sign * self.hsv_beta * slope_14 * l * np.sqrt(1/(1+slope_14**2)))
-        
-        top_rx = int(bot_rx + sign * self.hsv_beta * l * np.sqrt(1/(1+slope_14**2)))
-        top_ry = int(bot_ry + sign * self.hsv_beta * slope_14 * l * np.sqrt(1/(1+slope_14**2)))
-        
+        """samples the glove colour from the region placed by 'findROI'."""
+        (bot_lx, bot_ly), (bot_rx, bot_ry), (top_rx, top_ry), (top_lx, top_ly) = self.hsv_corners
         region = frame[top_ry:bot_ry , top_lx:bot_rx]
-        b, g, r = np.mean(region, axis=(0, 1))
-        
-        self.hsv_glove = find_HSV([[r,g,b]])
-        self.hsv_corners =  [(bot_lx,bot_ly), (bot_rx,bot_ry), (top_rx,top_ry), (top_lx,top_ly)]
+        if region.size:
+            b, g, r, _ = cv2.mean(region)
+            self.hsv_glove = find_HSV([[r,g,b]])
+        elif self.hsv_glove is None:
+            self.hsv_glove = find_HSV(None) # default glove colour
         
     
     def cropROI(self, frame):
-        pts = np.array(self.roi_corners)
+        """
+        returns the mask of glove coloured pixels inside the hand region.
+
+        The crop is not copied and all images go to 'buffers', so the
+        returned mask is overwritten by the next call. Pixels outside the
+        region are masked out after the colour test, which gives the same
+        mask as blacking them out first since black is never in range.
+        """
+        self._pts[:] = self.roi_corners
+        frame_h, frame_w = frame.shape[:2]
+        if not self.buffers.capacity:
+            self.buffers.capacity = frame_h * frame_w * 3
         
         ## (1) Crop the bounding rect
-        rect = cv2.boundingRect(pts)
-        x,y,w,h = rect
-        croped = frame[y:y+h, x:x+w].copy()
-        
-        ## (2) make mask
-        pts = pts - pts.min(axis=0)
+        x,y,w,h = cv2.boundingRect(self._pts)
+        croped = frame[y:y+h, x:x+w]
+        h, w = croped.shape[:2]
         
-        mask = np.zeros(croped.shape[:2], np.uint8)
-        cv2.drawContours(mask, [pts], -1, (255, 255, 255), -1, cv2.LINE_AA)
+        ## (2) make mask of the region
+        pts = self._pts - (x, y)
+        region = self.buffers.get('region', (h, w))
+        region.fill(0)
+        cv2.drawContours(region, [pts], -1, (255, 255, 255), -1, cv2.LINE_AA)
         
-        ## (3) do bit-op
-        dst = cv2.bitwise_and(croped, croped, mask=mask)
+        ## (3) glove colour in the crop, then inside the region only
+        hsv = cv2.cvtColor(croped, cv2.COLOR_BGR2HSV, dst=self.buffers.get('hsv', (h, w, 3)))
         
-        ## (4) add the white background
-        bg = np.ones_like(croped, np.uint8)*255
-        cv2.bitwise_not(bg,bg, mask=mask)
+        self.lower_range[0] = self.hsv_glove[0][0][0]//1-5
+        self.upper_range[0] = self.hsv_glove[0][0][0]//1+5
         
-        kernelOpen = np.ones((3,3),np.uint8)
-        kernelClose = np.ones((5,5),np.uint8)
+        in_range = cv2.inRange(hsv, self.lower_range, self.upper_range, dst=self.buffers.get('in_range', (h, w)))
+        mask = self.buffers.get('mask', (h, w))
+        mask.fill(0)
+        cv2.bitwise_and(in_range, in_range, dst=mask, mask=region)
         
-        hsv = cv2.cvtColor(dst, cv2.COLOR_BGR2HSV)
-        
-        lower_range = np.array([self.hsv_glove[0][0][0]//1-5,50,50])
-        upper_range = np.array([self.hsv_glove[0][0][0]//1+5,255,255])
-        
-        mask = cv2.inRange(hsv, lower_range, upper_range)
-        #mask = cv2.dilate(mask,kernelOpen,iterations = 1)
-        Opening =cv2.morphologyEx(mask,cv2.MORPH_OPEN,kernelOpen)
-        Closing =cv2.morphologyEx(Opening,cv2.MORPH_CLOSE,kernelClose)
-        FinalMask = Closing
+        Opening = cv2.morphologyEx(mask, cv2.MORPH_OPEN, self.kernel_open, dst=in_range)
+        FinalMask = cv2.morphologyEx(Opening, cv2.MORPH_CLOSE, self.kernel_close, dst=mask)
         
         return FinalMask
 
@@ -349,90 +345,20 @@ class Glove:
            # cv2.putText(frame,'reposition',(10,50), font, 2, (0,0,255), 3, cv2.LINE_AA)
         '''
 
-class Tracker:
-    def __init__(self):
-        self.tracker_started = False
-        self.tracker = None
-        self.start_time = 0.0
-        self.now_time = 0.0
-        self.tracker_bbox = None
-        
-    def corners_to_tracker(self, corners):
-        csrt_minX = int( min( [corners[0][0][0][0], corners[0][0][1][0], corners[0][0][2][0], corners[0][0][3][0]] ))
-        csrt_maxX = int( max( [corners[0][0][0][0], corners[0][0][1][0], corners[0][0][2][0], corners[0][0][3][0]] ))
-        csrt_minY = int( min( [corners[0][0][0][1], corners[0][0][1][1], corners[0][0][2][1], corners[0][0][3][1]] ))
-        csrt_maxY = int( max( [corners[0][0][0][1], corners[0][0][1][1], corners[0][0][2][1], corners[0][0][3][1]] ))
-        self.tracker_bbox = [csrt_minX, csrt_minY, csrt_maxX-csrt_minX, csrt_maxY-csrt_minY]
-        
-    def tracker_to_corner(self, final_bbox):
-        if self.tracker_bbox == None:
-            return None
-        final_bbox = [[[1,2],[3,4],[5,6],[7,8]]]
-        final_bbox[0][0] = [self.tracker_bbox[0],self.tracker_bbox[1]]
-        final_bbox[0][1] = [self.tracker_bbox[0]+ self.tracker_bbox[2],self.tracker_bbox[1]]
-        final_bbox[0][2] = [self.tracker_bbox[0]+ self.tracker_bbox[2],self.tracker_bbox[1] + self.tracker_bbox[3]]
-        final_bbox[0][3] = [self.tracker_bbox[0],self.tracker_bbox[1] +self.tracker_bbox[3]]
-        return [np.array(final_bbox, dtype = 'f')]
-        
-    def CSRT_tracker(self, frame):        
-        if self.tracker_bbox == None and self.tracker_started == False:
-            return
-        
-        if self.tracker_started == False:
-            if self.tracker == None:
-                self.tracker = cv2.TrackerCSRT_create()
-        
-        if self.tracker_bbox != None:
-            try:
-                self.start_time = time.time()
-                ok = self.tracker.init(frame, self.tracker_bbox)
-                self.tracker_started = True
-            except:
-                print("tracker.init failed")
-        try:
-            ok, self.tracker_bbox = self.tracker.update(frame)
-        except:
-            ok = None
-            print("tracker.update failed")
-        self.now_time = time.time()
-        
-        if self.now_time-self.start_time >= 2.0 :
-            #cv2.putText(frame, "Please posture your hand correctly", (10,50), cv2.FONT_HERSHEY_SIMPLEX, 1,(0,0,255),1)
-            cv2.putText(frame,'Posture your hand correctly',(10,10), cv2.FONT_HERSHEY_SIMPLEX, 0.75, (0,0,255), 1, cv2.LINE_AA)
-            #print("tracking timeout")
-            self.tracker_started = False
-            self.tracker_bbox = None
-            return
-            
-        if ok:
-            # Tracking success
-            p1 = (int(self.tracker_bbox[0]), int(self.tracker_bbox[1]))
-            p2 = (int(self.tracker_bbox[0] + self.tracker_bbox[2]), int(self.tracker_bbox[1] + self.tracker_bbox[3]))
-            cv2.rectangle(frame, p1, p2, (80, 255, 255), 2, 1)
-        else :
-            # Tracking failure
-            self.tracker_started = False
-            cv2.putText(frame, "Tracking failure detected", (100,80), cv2.FONT_HERSHEY_SIMPLEX, 0.75,(0,0,255),2)
-            print("Tracking failure detected")
-            #reintiallize code to tackle tracking failure
-            
-    
-        
-        
-        
-
 class Mouse:
     def __init__(self):
         self.tx_old = 0
         self.ty_old = 0
         self.trial = True
         self.flag = 0
+        self.display = None # DisplayGeometry, set by GestureController
+        self.dispatcher = None # InputDispatcher, set by GestureController
         
     def move_mouse(self,frame,position,gesture):
         
-        (sx,sy)=pyautogui.size()
+        (sx,sy)=self.display.size()
         (camx,camy) = (frame.shape[:2][0],frame.shape[:2][1])
-        (mx_old,my_old) = pyautogui.position()
+        (mx_old,my_old) = self.display.position()
         
         
         Damping = 2 # Hyperparameter we will have to adjust
@@ -449,11 +375,12 @@ class Mouse:
             self.flag = 0
             mx = mx_old + (delta_tx*sx) // (camx*Damping)
             my = my_old + (delta_ty*sy) // (camy*Damping)            
-            pyautogui.moveTo(mx,my, duration = 0.1)
+            self.dispatcher.moveTo(mx,my, duration = 0.1)
+            self.display.moved_to(mx,my)
 
         elif(gesture == 0):
             if self.flag == 0:
-                pyautogui.doubleClick()
+                self.dispatcher.doubleClick()
                 self.flag = 1
         elif(gesture == 1):
             print('1 Finger Open')
@@ -463,82 +390,147 @@ class Mouse:
 
 
 class GestureController:
-    gc_mode = 0
     pyautogui.FAILSAFE = False
-    f_start_time = 0
-    f_now_time = 0
     
-    cam_width  = 0
-    cam_height = 0
-    
-    aru_marker = Marker()
-    hand_roi = ROI(2.5, 2.5, 6, 0.45, 0.6, 0.4)
-    glove = Glove()
-    csrt_track = Tracker()
-    mouse = Mouse()
+    def __init__(self, camera=0, record_path=None, display=None, dispatcher=None, fps=30.0,
+                 tracker='flow', detect_every=5):
+        """
+        Opens 'camera' (index or video file, None for no camera) and sets up
+        the per-session marker, glove and tracker state. Without 'display'
+        and 'dispatcher' the session starts its own workers.
+        'record_path' is a session directory to record to, see SessionRecorder.
+        'fps' is the target frame rate of 'start', see FrameScheduler.
+        'tracker' ('flow', 'kcf', 'mosse' or 'csrt') follows the marker
+        between ArUco detections run every 'detect_every' frames, see
+        DetectTracker.
+        """
+        self.gc_mode = 1
+        self.cap = None
+        self.cam_width  = 0
+        self.cam_height = 0
+        if camera is not None:
+            self.cap = cv2.VideoCapture(camera)
+            if self.cap.isOpened():
+                self.cam_width  = int( self.cap.get(cv2.CAP_PROP_FRAME_WIDTH) )
+                self.cam_height = int( self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT) )
+            else:
+                print("CANNOT OPEN CAMERA")
+        
+        intrinsics = CalibrationStore().load(camera, (self.cam_width, self.cam_height))
+        self.aru_marker = Marker(intrinsics = intrinsics)
+        self.hand_roi = ROI(2.5, 2.5, 6, 0.45, 0.6, 0.4)
+        self.glove = Glove()
+        self.marker_track = DetectTracker(tracker, detect_every)
+        self.mouse = Mouse()
+        self.record_path = record_path
+        self.frames = 0
+        self.workers = []
+        own_dispatcher = dispatcher is None
+        if own_dispatcher:
+            dispatcher = InputDispatcher().start()
+        if display is None:
+            display = DisplayGeometry(dispatcher=dispatcher).start()
+            self.workers.append(display)
+        if own_dispatcher:
+            self.workers.append(dispatcher)
+        self.mouse.display = display
+        self.mouse.dispatcher = dispatcher
+        self.scheduler = FrameScheduler(fps)
     
-    def __init__(self):
-        GestureController.cap = cv2.VideoCapture(0)
-        if GestureController.cap.isOpened():
-            GestureController.cam_width  = int( GestureController.cap.get(cv2.CAP_PROP_FRAME_WIDTH) )
-            GestureController.cam_height = int( GestureController.cap.get(cv2.CAP_PROP_FRAME_HEIGHT) )
+    def stop(self):
+        """Ends the frame loop of 'start', safe to call from any thread."""
+        self.gc_mode = 0
+        
+    def detect_marker(self, frame):
+        """returns marker corners detected in 'frame', None if there is none."""
+        with tracer.span('aruco.detect'):
+            self.aru_marker.detect(frame)
+        return self.aru_marker.corners
+        
+    def process_frame(self, frame, now=None, detect=True):
+        """
+        runs marker tracking, glove segmentation and mouse control on one
+        flipped BGR 'frame', returns the glove mask or None if no marker.
+        With 'detect' False the marker corners already set on 'aru_marker'
+        stand in for the result of a detection, e.g. when replaying a
+        session, and are only used on the frames a detection is due.
+        """
+        #detect or track Marker, find ROI, find glove HSV, get FinalMask on glove
+        if detect:
+            detector = self.detect_marker
         else:
-            print("CANNOT OPEN CAMERA")
-        
-        GestureController.gc_mode = 1
-        GestureController.f_start_time = time.time()
-        GestureController.f_now_time = time.time()
+            given = self.aru_marker.corners
+            detector = lambda frame: given
+        self.aru_marker.corners = self.marker_track.update(frame, detector, now)
+        
+        if self.aru_marker.is_detected():
+            self.hand_roi.findROI(frame, self.aru_marker)
+            self.hand_roi.find_glove_hsv(frame, self.aru_marker)
+            FinalMask = self.hand_roi.cropROI(frame)
+            with tracer.span('Glove.find_fingers'):
+                self.glove.find_fingers(FinalMask)
+            self.glove.find_gesture(frame)
+            self.mouse.move_mouse(frame,self.hand_roi.marker_top,self.glove.gesture)
+            return FinalMask
+        return None
         
     def start(self):
+        recorder = None
+        if self.record_path:
+            recorder = SessionRecorder(self.record_path, 'marker', 'Gesture_Controller_Gloved', 1, 4).start()
         while (True):
             #mode checking
-            if not GestureController.gc_mode:
+            if not self.gc_mode:
                 print('Exiting Gesture Controller')
                 break
-            #fps control
-            fps = 30.0
-            GestureController.f_start_time = time.time()
-            while (GestureController.f_now_time-GestureController.f_start_time <= 1.0/fps):
-                GestureController.f_now_time = time.time()
-            
-            #read camera
-            ret, frame = GestureController.cap.read()
-            frame = cv2.flip(frame, 1)
+            #fps control, sleeps until the next frame is due
+            self.scheduler.wait()
             
-            #detect Marker, find ROI, find glove HSV, get FinalMask on glove
-            GestureController.aru_marker.detect(frame)
-            if GestureController.aru_marker.is_detected():
-                GestureController.csrt_track.corners_to_tracker(GestureController.aru_marker.corners)
-                GestureController.csrt_track.CSRT_tracker(frame)
-                
-            else:
-                GestureController.csrt_track.tracker_bbox = None
-                GestureController.csrt_track.CSRT_tracker(frame)
-                GestureController.aru_marker.corners = GestureController.csrt_track.tracker_to_corner(GestureController.aru_marker.corners)
+            with tracer.span('frame'):
+                #read camera
+                with tracer.span('cap.read'):
+                    ret, raw_frame = self.cap.read()
+                now = time.time()
+                frame = cv2.flip(raw_frame, 1)
             
-            if GestureController.aru_marker.is_detected():
-                GestureController.hand_roi.findROI(frame, GestureController.aru_marker)
-                GestureController.hand_roi.find_glove_hsv(frame, GestureController.aru_marker)
-                FinalMask = GestureController.hand_roi.cropROI(frame)
-                GestureController.glove.find_fingers(FinalMask)
-                GestureController.glove.find_gesture(frame)
-                GestureController.mouse.move_mouse(frame,GestureController.hand_roi.marker_top,GestureController.glove.gesture)
+                if recorder is None:
+                    FinalMask = self.process_frame(frame, now)
+                else:
+                    # recordings keep a detection of every frame
+                    corners = self.detect_marker(frame)
+                    marker = None
+                    if corners:
+                        marker = [np.c_[corners[0][0], np.zeros(4)]]
+                    recorder.write(raw_frame, now, marker)
+                    FinalMask = self.process_frame(frame, now, detect=False)
+                self.frames += 1
             
-            #draw call
-            if GestureController.aru_marker.is_detected():
-                GestureController.aru_marker.draw_marker(frame)
-                draw_box(frame, GestureController.hand_roi.roi_corners, (255,0,0))
-                draw_box(frame, GestureController.hand_roi.hsv_corners, (0,0,250))
-                cv2.imshow('FinalMask',FinalMask)
+                #draw call
+                if self.aru_marker.is_detected():
+                    self.aru_marker.draw_marker(frame)
+                    draw_box(frame, self.hand_roi.roi_corners, (255,0,0))
+                    draw_box(frame, self.hand_roi.hsv_corners, (0,0,250))
+                    cv2.imshow('FinalMask',FinalMask)
+                elif self.marker_track.timed_out:
+                    cv2.putText(frame,'Posture your hand correctly',(10,10), cv2.FONT_HERSHEY_SIMPLEX, 0.75, (0,0,255), 1, cv2.LINE_AA)
             
-            #display frame
-            cv2.imshow('frame',frame)
-            if cv2.waitKey(1) & 0xFF == ord('q'):
-                break
+                #display frame
+                with tracer.span('cv2.imshow'):
+                    cv2.imshow('frame',frame)
+                    key = cv2.waitKey(1) & 0xFF
+                tracer.handle_key(key)
+                if key == ord('q'):
+                    break
         
         # When everything done, release the capture
-        GestureController.cap.release()
+        if recorder is not None:
+            recorder.close()
+        self.cap.release()
+        for worker in self.workers:
+            worker.stop()
+        self.gc_mode = 0
         cv2.destroyAllWindows()
-        
-        
-        
+        print(self.scheduler.report())
+        print(self.marker_track.report())
+        if tracer.events:
+            print("trace written to", tracer.dump())
\ No newline at end of file
@@ -1,37 +1,52 @@
-import pyttsx3
-import speech_recognition as sr
 from datetime import date
 import time
 import webbrowser
 import datetime
-from pynput.keyboard import Key, Controller
-import pyautogui
 import sys
 import os
 from os import listdir
 from os.path import isfile, join
-import smtplib
-import wikipedia
-import Gesture_Controller
-#import Gesture_Controller_Gloved as Gesture_Controller
+from threading import Lock, Thread
+from startup import Deferred, lazy_import, profile, warm_up
+# Speech, keyboard and gesture modules load on first use or in the warm-up
+# after the UI is up, so the assistant greets without waiting for them.
+pyttsx3 = lazy_import('pyttsx3')
+sr = lazy_import('speech_recognition')
+pynput_keyboard = lazy_import('pynput.keyboard')
+Gesture_Controller = lazy_import('Gesture_Controller')
+#Gesture_Controller = lazy_import('Gesture_Controller_Gloved')
 import app
-from threading import Thread
 
 
 # -------------Object Initialization---------------
 today = date.today()
-r = sr.Recognizer()
-keyboard = Controller()
-engine = pyttsx3.init('sapi5')
-engine = pyttsx3.init()
-voices = engine.getProperty('voices')
-engine.setProperty('voice', voices[0].id)
+
+
+def make_recognizer():
+    recognizer = sr.Recognizer()
+    recognizer.energy_threshold = 500
+    recognizer.dynamic_energy_threshold = False
+    return recognizer
+
+
+def make_engine():
+    engine = pyttsx3.init()
+    voices = engine.getProperty('voices')
+    engine.setProperty('voice', voices[0].id)
+    return engine
+
+
+r = Deferred('recognizer', make_recognizer)
+keyboard = Deferred('keyboard', lambda: pynput_keyboard.Controller())
+engine = Deferred('speech engine', make_engine)
 
 # ----------------Variables------------------------
 file_exp_status = False
 files =[]
 path = ''
 is_awake = True  #Bot status
+gesture_session = None  # running GestureController
+gesture_lock = Lock()  # guards gesture_session
 
 # ------------------Functions----------------------
 def reply(audio):
@@ -54,10 +69,30 @@ def wish():
         
     reply("I am Proton, how may I help you?")
 
-# Set Microphone parameters
-with sr.Microphone() as source:
-        r.energy_threshold = 500 
-        r.dynamic_energy_threshold = False
+
+# Gesture recognition runs on its own thread with its own GestureController,
+# the voice loop only starts and stops it through these helpers.
+def launch_gesture_recognition():
+    """starts a gesture session, returns False if one is already running."""
+    global gesture_session
+    with gesture_lock:
+        if gesture_session is not None and gesture_session.gc_mode:
+            return False
+        gesture_session = Gesture_Controller.GestureController()
+        Thread(target=gesture_session.start).start()
+        return True
+
+
+def stop_gesture_recognition():
+    """stops the running gesture session, returns False if none was running."""
+    global gesture_session
+    with gesture_lock:
+        if gesture_session is None or not gesture_session.gc_mode:
+            return False
+        gesture_session.stop()
+        gesture_session = None
+        return True
+
 
 # Audio to String
 def record_audio():
@@ -127,8 +162,7 @@ def respond(voice_data):
         is_awake = False
 
     elif ('exit' in voice_data) or ('terminate' in voice_data):
-        if Gesture_Controller.GestureController.gc_mode:
-            Gesture_Controller.GestureController.gc_mode = 0
+        stop_gesture_recognition()
         app.ChatBot.close()
         #sys.exit() always raises SystemExit, Handle it in main loop
         sys.exit()
@@ -136,29 +170,25 @@ def respond(voice_data):
     
     # DYNAMIC CONTROLS
     elif 'launch gesture recognition' in voice_data:
-        if Gesture_Controller.GestureController.gc_mode:
-            reply('Gesture recognition is already active')
-        else:
-            gc = Gesture_Controller.GestureController()
-            t = Thread(target = gc.start)
-            t.start()
+        if launch_gesture_recognition():
             reply('Launched Successfully')
+        else:
+            reply('Gesture recognition is already active')
 
     elif ('stop gesture recognition' in voice_data) or ('top gesture recognition' in voice_data):
-        if Gesture_Controller.GestureController.gc_mode:
-            Gesture_Controller.GestureController.gc_mode = 0
+        if stop_gesture_recognition():
             reply('Gesture recognition stopped')
         else:
             reply('Gesture recognition is already inactive')
         
     elif 'copy' in voice_data:
-        with keyboard.pressed(Key.ctrl):
+        with keyboard.pressed(pynput_keyboard.Key.ctrl):
             keyboard.press('c')
             keyboard.release('c')
         reply('Copied')
           
     elif 'page' in voice_data or 'pest'  in voice_data or 'paste' in voice_data:
-        with keyboard.pressed(Key.ctrl):
+        with keyboard.pressed(pynput_keyboard.Key.ctrl):
             keyboard.press('v')
             keyboard.release('v')
         reply('Pasted')
@@ -225,8 +255,13 @@ t1.start()
 # Lock main thread until Chatbot has started
 while not app.ChatBot.started:
     time.sleep(0.5)
+profile.mark('ui started')
 
+# the speech engine is built by the first reply on this thread, pyttsx3 drivers
+# expect to be run from the thread that created them
+warm_up(sr, r, pynput_keyboard, Gesture_Controller, done=lambda: print(profile.report()))
 wish()
+profile.mark('greeted')
 voice_data = None
 while True:
     if app.ChatBot.isUserInput():
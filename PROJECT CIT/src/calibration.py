@@ -0,0 +1,190 @@
+# Imports
+
+import glob
+import hashlib
+import os
+import re
+import cv2
+import numpy as np
+
+CALIB_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'calib_images')
+
+# Checkerboard Calibration
+def checkerboard_images(calib_dir=CALIB_DIR):
+    """returns sorted paths of the checkerboard images in 'calib_dir'."""
+    return sorted(glob.glob(os.path.join(calib_dir, 'checkerboard', '*.jpg')))
+
+
+def checkerboard_hash(images, pattern=(7, 6)):
+    """returns a hash of the names and contents of 'images' and 'pattern'."""
+    h = hashlib.sha1(repr(tuple(pattern)).encode())
+    for path in images:
+        h.update(os.path.basename(path).encode())
+        with open(path, 'rb') as f:
+            h.update(f.read())
+    return h.hexdigest()[:16]
+
+
+def calibrate(images, pattern=(7, 6)):
+    """
+    returns camera matrix, distortion coefficients and (width, height) of
+    the checkerboard 'images', with 'pattern' inner corners per row and
+    column.
+    """
+    criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 30, 0.001)
+    objp = np.zeros((pattern[0]*pattern[1], 3), np.float32)
+    objp[:, :2] = np.mgrid[0:pattern[0], 0:pattern[1]].T.reshape(-1, 2)
+    objpoints = []  # 3d point in real world space
+    imgpoints = []  # 2d points in image plane.
+    size = None
+    for fname in images:
+        gray = cv2.cvtColor(cv2.imread(fname), cv2.COLOR_BGR2GRAY)
+        size = gray.shape[::-1]
+        ret, corners = cv2.findChessboardCorners(gray, pattern, None)
+        if ret:
+            objpoints.append(objp)
+            imgpoints.append(cv2.cornerSubPix(gray, corners, (11, 11), (-1, -1), criteria))
+    if not objpoints:
+        raise RuntimeError("no checkerboard found in %d calibration images" % len(images))
+    ret, mtx, dist, rvecs, tvecs = cv2.calibrateCamera(objpoints, imgpoints, size, None, None)
+    return mtx, dist, size
+
+# Intrinsics Files
+def read_intrinsics(path):
+    """
+    returns dict with 'mtx', 'dist' and, if stored, 'size' and 'hash' read
+    from the 'cv2.FileStorage' file at 'path', None if it is missing or has
+    no camera matrix.
+    """
+    if not os.path.exists(path):
+        return None
+    fs = cv2.FileStorage(path, cv2.FILE_STORAGE_READ)
+    try:
+        mtx = fs.getNode('camera_matrix').mat()
+        if mtx is None:
+            return None
+        width = fs.getNode('image_width')
+        height = fs.getNode('image_height')
+        digest = fs.getNode('checkerboard_hash')
+        return {
+            'mtx': mtx,
+            'dist': fs.getNode('dist_coeff').mat(),
+            'size': None if width.empty() else (int(width.real()), int(height.real())),
+            'hash': None if digest.empty() else digest.string(),
+        }
+    finally:
+        fs.release()
+
+
+def write_intrinsics(path, mtx, dist, size=None, digest=None):
+    """Writes intrinsics to 'path' in the layout 'read_intrinsics' reads."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fs = cv2.FileStorage(path, cv2.FILE_STORAGE_WRITE)
+    try:
+        fs.write('camera_matrix', np.asarray(mtx, dtype=np.float64))
+        fs.write('dist_coeff', np.asarray(dist, dtype=np.float64))
+        if size is not None:
+            fs.write('image_width', int(size[0]))
+            fs.write('image_height', int(size[1]))
+        if digest is not None:
+            fs.write('checkerboard_hash', digest)
+    finally:
+        fs.release()
+
+
+def scale_intrinsics(mtx, size, resolution):
+    """returns camera matrix 'mtx' of a 'size' image scaled to 'resolution'."""
+    mtx = np.array(mtx, dtype=np.float64)
+    sx, sy = resolution[0] / size[0], resolution[1] / size[1]
+    mtx[0, :] *= sx
+    mtx[1, :] *= sy
+    mtx[2, :] = (0.0, 0.0, 1.0)
+    return mtx
+
+# Calibration Store
+class CalibrationStore:
+    """
+    Camera intrinsics for ArUco pose estimation, read from 'cv2.FileStorage'
+    files instead of calibrating on every start.
+
+    The base calibration is 'calib_images/test.yaml'. The checkerboard
+    images are only calibrated again when their content hash differs from
+    the one stored with the base, the result then goes to
+    'cache/checkerboard.yaml'. Intrinsics for a camera and resolution are
+    scaled from the base and cached per device and resolution. A file
+    without a stored hash is used as it is.
+
+    Attributes
+    ----------
+    calib_dir : str
+        directory with 'test.yaml' and the 'checkerboard' images.
+    pattern : tuple(int, int)
+        inner corners per row and column of the checkerboard.
+    calibrated : bool
+        True if the last 'load' had to run the calibration.
+    """
+
+    def __init__(self, calib_dir=CALIB_DIR, pattern=(7, 6)):
+        self.calib_dir = calib_dir
+        self.pattern = pattern
+        self.calibrated = False
+        self._hash = None
+
+    @property
+    def base_path(self):
+        return os.path.join(self.calib_dir, 'test.yaml')
+
+    def cache_path(self, camera=None, resolution=None):
+        """returns the cache file of 'camera' at 'resolution', the recalibrated base without them."""
+        if camera is None or resolution is None:
+            name = 'checkerboard'
+        else:
+            device = re.sub(r'[^A-Za-z0-9.-]+', '_', os.path.basename(str(camera)))
+            name = 'camera-%s_%dx%d' % (device, resolution[0], resolution[1])
+        return os.path.join(self.calib_dir, 'cache', name + '.yaml')
+
+    def checkerboard_hash(self):
+        if self._hash is None:
+            self._hash = checkerboard_hash(checkerboard_images(self.calib_dir), self.pattern)
+        return self._hash
+
+    def _save(self, path, *args):
+        try:
+            write_intrinsics(path, *args)
+        except (OSError, cv2.error) as e:
+            print("calibration cache not written:", path, e)
+
+    def _valid(self, data):
+        return data is not None and (data['hash'] is None or data['hash'] == self.checkerboard_hash())
+
+    def base(self):
+        """returns base intrinsics, calibrating only if no stored one matches the images."""
+        for path in (self.cache_path(), self.base_path):
+            data = read_intrinsics(path)
+            if self._valid(data):
+                return data
+        mtx, dist, size = calibrate(checkerboard_images(self.calib_dir), self.pattern)
+        self.calibrated = True
+        self._save(self.cache_path(), mtx, dist, size, self.checkerboard_hash())
+        return {'mtx': mtx, 'dist': dist, 'size': size, 'hash': self.checkerboard_hash()}
+
+    def load(self, camera=None, resolution=None):
+        """
+        returns (camera matrix, distortion coefficients) for 'camera' at
+        'resolution' (width, height), the base calibration if either is
+        unknown.
+        """
+        self.calibrated = False
+        if camera is None or not resolution or not all(resolution):
+            data = self.base()
+            return data['mtx'], data['dist']
+        path = self.cache_path(camera, resolution)
+        data = read_intrinsics(path)
+        if self._valid(data):
+            return data['mtx'], data['dist']
+        data = self.base()
+        mtx = data['mtx']
+        if data['size'] is not None and tuple(data['size']) != tuple(resolution):
+            mtx = scale_intrinsics(mtx, data['size'], resolution)
+        self._save(path, mtx, data['dist'], resolution, data['hash'] or self.checkerboard_hash())
+        return mtx, data['dist']
@@ -0,0 +1,160 @@
+# Imports
+
+import threading
+import time
+import cv2
+
+# Threaded Camera Capture
+class CameraStream:
+    """
+    Grabs frames from a camera on its own thread and hands over only the
+    newest one, so the consumer always works on the freshest image.
+
+    Frames the consumer did not pick up in time are overwritten and counted
+    as dropped. Every frame carries the 'time.perf_counter' timestamp at
+    which it was read, which is used to report capture-to-dispatch latency.
+
+    Attributes
+    ----------
+    cap : Object
+        object obtained from cv2, for capturing video frame.
+    frames_read : int
+        total no. of frames read from the camera.
+    frames_dropped : int
+        no. of frames replaced by a newer one before being consumed.
+    frames_failed : int
+        no. of unsuccessful 'cap.read' calls.
+    latency_count : int
+        no. of frames reported through 'mark_dispatched'.
+    latency_total : float
+        sum of capture-to-dispatch latency in seconds.
+    latency_max : float
+        worst capture-to-dispatch latency in seconds.
+    """
+
+    def __init__(self, cap):
+        """
+        Parameters
+        ----------
+        cap : Object
+            opened cv2.VideoCapture, released by 'release'.
+        """
+        self.cap = cap
+        self.frames_read = 0
+        self.frames_dropped = 0
+        self.frames_failed = 0
+        self.latency_count = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+        self._cond = threading.Condition()
+        self._frame = None
+        self._timestamp = None
+        self._seq = 0
+        self._consumed_seq = 0
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        """Starts the capture thread, returns self."""
+        if self._running:
+            return self
+        # Keep the driver queue short, the thread below drains it anyway.
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        self._running = True
+        self._thread = threading.Thread(target=self._update, name='CameraStream', daemon=True)
+        self._thread.start()
+        return self
+
+    def _update(self):
+        """Capture loop, keeps only the most recent frame."""
+        while self._running:
+            success, frame = self.cap.read()
+            timestamp = time.perf_counter()
+            if not success:
+                with self._cond:
+                    self.frames_failed += 1
+                time.sleep(0.005)
+                continue
+
+            with self._cond:
+                self.frames_read += 1
+                if self._seq != self._consumed_seq:
+                    self.frames_dropped += 1
+                self._frame = frame
+                self._timestamp = timestamp
+                self._seq += 1
+                self._cond.notify_all()
+
+    def read(self, timeout=1.0):
+        """
+        returns the newest frame not yet handed out.
+
+        Blocks until a new frame arrives or 'timeout' seconds pass.
+
+        Returns
+        -------
+        tuple(bool, numpy.ndarray, float)
+            success flag, frame and capture timestamp.
+        """
+        with self._cond:
+            ready = self._cond.wait_for(
+                lambda: self._seq != self._consumed_seq or not self._running, timeout)
+            if not ready or self._seq == self._consumed_seq:
+                return False, None, None
+            self._consumed_seq = self._seq
+            return True, self._frame, self._timestamp
+
+    def mark_dispatched(self, timestamp):
+        """records latency between capture 'timestamp' and now."""
+        latency = time.perf_counter() - timestamp
+        self.latency_count += 1
+        self.latency_total += latency
+        if latency > self.latency_max:
+            self.latency_max = latency
+
+    def stats(self):
+        """
+        returns capture counters and latency figures.
+
+        Returns
+        -------
+        dict
+        """
+        with self._cond:
+            read, dropped, failed = self.frames_read, self.frames_dropped, self.frames_failed
+        mean = self.latency_total / self.latency_count if self.latency_count else 0.0
+        return {
+            'frames_read': read,
+            'frames_dropped': dropped,
+            'frames_failed': failed,
+            'latency_mean_ms': mean * 1000.0,
+            'latency_max_ms': self.latency_max * 1000.0,
+        }
+
+    def report(self):
+        """returns 'stats' as a single printable line."""
+        s = self.stats()
+        return ("frames read: {frames_read}, dropped: {frames_dropped}, failed: {frames_failed}, "
+                "capture-to-dispatch latency: mean {latency_mean_ms:.1f} ms, "
+                "max {latency_max_ms:.1f} ms").format(**s)
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def get(self, prop):
+        return self.cap.get(prop)
+
+    def stop(self):
+        """Stops the capture thread, wakes up any waiting 'read'."""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def release(self):
+        """Stops the capture thread and releases the camera."""
+        self.stop()
+        self.cap.release()
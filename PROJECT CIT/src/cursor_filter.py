@@ -0,0 +1,202 @@
+# Imports
+
+import math
+
+# Cursor Filters
+class CursorFilter:
+    """
+    Smooths the hand position (in screen pixels) used to move the cursor.
+
+    'update' takes the raw position and its capture timestamp and returns the
+    filtered position. The cursor then moves by the change of the filtered
+    position times 'gain'. Every keyword given to the constructor is a
+    parameter that can be changed at runtime through 'set_params'.
+
+    Attributes
+    ----------
+    gain : float
+        cursor pixels moved per pixel of filtered hand movement.
+    prediction : float
+        seconds to extrapolate the filtered position ahead, to offset the
+        capture-to-dispatch latency. 0 disables prediction.
+    """
+
+    defaults = {'gain': 1.0, 'prediction': 0.0}
+
+    def __init__(self, **params):
+        for name, value in self.defaults.items():
+            setattr(self, name, value)
+        self.set_params(**params)
+        self.reset()
+
+    def set_params(self, **params):
+        """changes filter parameters, unknown names raise 'ValueError'."""
+        for name, value in params.items():
+            if name not in self.defaults:
+                raise ValueError("%s has no parameter '%s'" % (type(self).__name__, name))
+            setattr(self, name, value)
+
+    def get_params(self):
+        """returns current parameters as dict."""
+        return {name: getattr(self, name) for name in self.defaults}
+
+    def reset(self):
+        """Forgets filter state, e.g. when the hand was lost."""
+        self.last_t = None
+
+    def update(self, x, y, t):
+        """
+        returns filtered (x, y) for raw position (x, y) captured at 't'.
+
+        Returns
+        -------
+        tuple(float, float)
+        """
+        raise NotImplementedError
+
+
+class DampeningFilter(CursorFilter):
+    """
+    Piecewise dampening on the movement between two frames, the original
+    'Controller.get_position' behaviour. Ignores timestamps.
+
+    Moves below 'dead_zone' pixels are dropped, moves up to 'ramp_end' pixels
+    are scaled by 'ramp_slope' * distance, longer ones by 'max_ratio'.
+    """
+
+    defaults = {'gain': 1.0, 'prediction': 0.0, 'dead_zone': 5.0,
+                'ramp_end': 30.0, 'ramp_slope': 0.07, 'max_ratio': 2.1}
+
+    def reset(self):
+        self.last_t = None
+        self.raw = None
+        self.out = None
+
+    def update(self, x, y, t):
+        if self.raw is None:
+            self.raw = self.out = (x, y)
+            return self.out
+        delta_x = x - self.raw[0]
+        delta_y = y - self.raw[1]
+        self.raw = (x, y)
+
+        distsq = delta_x**2 + delta_y**2
+        if distsq <= self.dead_zone**2:
+            ratio = 0
+        elif distsq <= self.ramp_end**2:
+            ratio = self.ramp_slope * (distsq ** (1/2))
+        else:
+            ratio = self.max_ratio
+        self.out = (self.out[0] + delta_x*ratio, self.out[1] + delta_y*ratio)
+        return self.out
+
+
+class OneEuroFilter(CursorFilter):
+    """
+    One Euro filter (Casiez et al. 2012), a low-pass filter whose cutoff rises
+    with speed: slow movements are smoothed hard, fast ones follow closely.
+
+    'min_cutoff' (Hz) sets smoothing at rest, 'beta' how fast the cutoff
+    grows with speed (pixels/s), 'd_cutoff' (Hz) smooths the speed estimate.
+    """
+
+    defaults = {'gain': 1.5, 'prediction': 0.0, 'min_cutoff': 0.5,
+                'beta': 0.005, 'd_cutoff': 1.0}
+
+    def reset(self):
+        self.last_t = None
+        self.x_hat = None
+        self.dx_hat = None
+
+    @staticmethod
+    def alpha(cutoff, dt):
+        tau = 1.0 / (2*math.pi*cutoff)
+        return 1.0 / (1.0 + tau/dt)
+
+    def update(self, x, y, t):
+        if self.x_hat is None or t <= self.last_t:
+            if self.x_hat is None:
+                self.x_hat, self.dx_hat = (x, y), (0.0, 0.0)
+            self.last_t = t
+            return self.x_hat
+
+        dt = t - self.last_t
+        self.last_t = t
+        a_d = self.alpha(self.d_cutoff, dt)
+        dx = ((x - self.x_hat[0])/dt, (y - self.x_hat[1])/dt)
+        self.dx_hat = (self.dx_hat[0] + a_d*(dx[0] - self.dx_hat[0]),
+                       self.dx_hat[1] + a_d*(dx[1] - self.dx_hat[1]))
+
+        speed = math.hypot(*self.dx_hat)
+        a = self.alpha(self.min_cutoff + self.beta*speed, dt)
+        self.x_hat = (self.x_hat[0] + a*(x - self.x_hat[0]),
+                      self.x_hat[1] + a*(y - self.x_hat[1]))
+
+        if self.prediction:
+            return (self.x_hat[0] + self.dx_hat[0]*self.prediction,
+                    self.x_hat[1] + self.dx_hat[1]*self.prediction)
+        return self.x_hat
+
+
+class KalmanFilter(CursorFilter):
+    """
+    Constant-velocity Kalman filter, one independent filter per axis with
+    state (position, velocity).
+
+    'process_noise' is the white acceleration spectral density
+    (pixels^2/s^3), 'measurement_noise' the variance of the landmark jitter
+    (pixels^2).
+    """
+
+    defaults = {'gain': 1.5, 'prediction': 0.0, 'process_noise': 1.0e5,
+                'measurement_noise': 64.0}
+
+    def reset(self):
+        self.last_t = None
+        self.state = None
+
+    def _step(self, axis, z, dt):
+        p, v, p00, p01, p11 = axis
+        # predict
+        p += v*dt
+        q = self.process_noise
+        p00 += dt*(2*p01 + dt*p11) + q*dt**3/3
+        p01 += dt*p11 + q*dt**2/2
+        p11 += q*dt
+        # correct
+        s = p00 + self.measurement_noise
+        k0, k1 = p00/s, p01/s
+        r = z - p
+        p += k0*r
+        v += k1*r
+        p11 -= k1*p01
+        p01 -= k0*p01
+        p00 -= k0*p00
+        return [p, v, p00, p01, p11]
+
+    def update(self, x, y, t):
+        if self.state is None:
+            r = self.measurement_noise
+            self.state = [[x, 0.0, r, 0.0, 1.0e6], [y, 0.0, r, 0.0, 1.0e6]]
+            self.last_t = t
+            return (x, y)
+        dt = t - self.last_t
+        if dt > 0:
+            self.last_t = t
+            self.state = [self._step(self.state[0], x, dt), self._step(self.state[1], y, dt)]
+        (px, vx, *_), (py, vy, *_) = self.state
+        return (px + vx*self.prediction, py + vy*self.prediction)
+
+
+CURSOR_FILTERS = {
+    'dampening': DampeningFilter,
+    'one_euro': OneEuroFilter,
+    'kalman': KalmanFilter,
+}
+
+def make_cursor_filter(name, **params):
+    """returns a new filter registered as 'name' in 'CURSOR_FILTERS'."""
+    try:
+        return CURSOR_FILTERS[name](**params)
+    except KeyError:
+        raise ValueError("unknown cursor filter '%s', choose from %s" % (name, ', '.join(CURSOR_FILTERS)))
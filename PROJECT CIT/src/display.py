@@ -0,0 +1,104 @@
+# Imports
+
+import threading
+import time
+import pyautogui
+
+# Cached Display Geometry
+class DisplayGeometry:
+    """
+    Caches screen size and keeps an internal model of the cursor position, so
+    the frame loop never makes a round trip to the display server.
+
+    A low-rate watcher thread re-reads the screen size to pick up display
+    configuration changes, and corrects the cursor model from the real
+    cursor position now and then (e.g. after the user moved the mouse). The
+    correction is skipped while 'dispatcher' still runs a move, the real
+    cursor is then somewhere along the way to the modelled target.
+
+    Attributes
+    ----------
+    refresh_interval : float
+        seconds between two screen size checks.
+    resync_interval : float
+        seconds between two corrections of the cursor model.
+    screen : tuple(int, int)
+        cached (width, height) of the screen.
+    cursor : tuple(float, float)
+        cursor position as last commanded or corrected.
+    dispatcher : Object
+        'InputDispatcher' the moves go through, None if they complete
+        before 'moved_to' is called, e.g. plain 'pyautogui.moveTo'.
+    """
+
+    def __init__(self, backend=pyautogui, refresh_interval=2.0, resync_interval=1.0, dispatcher=None):
+        """
+        Parameters
+        ----------
+        backend : Object
+            provides 'size' and 'position', 'pyautogui' by default.
+        """
+        self.backend = backend
+        self.refresh_interval = refresh_interval
+        self.resync_interval = resync_interval
+        self.dispatcher = dispatcher
+        self.screen = tuple(backend.size())
+        self.cursor = tuple(backend.position())
+        self._moves = 0
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        """Starts the watcher thread, returns self."""
+        if not self._running:
+            self._running = True
+            self._thread = threading.Thread(target=self._watch, name='DisplayGeometry', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._running = False
+
+    def _watch(self):
+        """Refreshes screen size and cursor model at a low rate."""
+        last_refresh = last_resync = time.monotonic()
+        while self._running:
+            time.sleep(min(self.refresh_interval, self.resync_interval) / 2)
+            now = time.monotonic()
+            try:
+                if now - last_refresh >= self.refresh_interval:
+                    last_refresh = now
+                    screen = tuple(self.backend.size())
+                    if screen != self.screen:
+                        self.screen = screen
+                        self.cursor = self.clamp(*self.cursor)
+                # retried on the next check while a move is in flight
+                if now - last_resync >= self.resync_interval and (
+                        self.dispatcher is None or self.dispatcher.idle()):
+                    last_resync = now
+                    moves = self._moves
+                    cursor = tuple(self.backend.position())
+                    # Skip if a move was commanded while querying, the real
+                    # cursor is older than the model then.
+                    if moves == self._moves:
+                        self.cursor = cursor
+            except Exception as e:
+                print("display query failed:", e)
+
+    def size(self):
+        """returns cached (width, height) of the screen."""
+        return self.screen
+
+    def position(self):
+        """returns modelled (x, y) of the cursor."""
+        return self.cursor
+
+    def clamp(self, x, y):
+        """returns (x, y) limited to the screen."""
+        sx, sy = self.screen
+        return min(max(x, 0), sx - 1), min(max(y, 0), sy - 1)
+
+    def moved_to(self, x, y):
+        """updates the cursor model after a move to (x, y) was commanded."""
+        self.cursor = self.clamp(x, y)
+        self._moves += 1
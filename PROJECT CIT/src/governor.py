@@ -0,0 +1,119 @@
+# Imports
+
+import time
+import cv2
+
+# Idle Frame Governor
+class IdleGovernor:
+    """
+    Lowers the frame loop to a slow, low resolution detection cadence while
+    no hand is in view and returns to full rate as soon as one shows up.
+
+    The loop asks 'due' whether to process a frame and passes detection
+    results to 'update'. While active every frame is due. After
+    'idle_after' seconds without a hand the governor goes idle: only one
+    frame per 1/'idle_fps' seconds is due, and 'prepare' scales it by
+    'idle_scale' before inference. The first idle frame with a hand makes
+    the governor active again, so the next frame is processed in full.
+
+    Process CPU time and wall time are accounted per state, 'stats' reports
+    them as CPU seconds per minute.
+
+    Attributes
+    ----------
+    enabled : bool
+        if False the governor never goes idle.
+    idle_after : float
+        seconds without a hand before going idle.
+    idle_fps : float
+        frames processed per second while idle.
+    idle_scale : float
+        scale factor of frames processed while idle.
+    idle : bool
+        True while in the idle cadence.
+    transitions : int
+        no. of switches between active and idle.
+    """
+
+    def __init__(self, enabled=True, idle_after=3.0, idle_fps=4.0, idle_scale=0.5):
+        self.enabled = enabled
+        self.idle_after = idle_after
+        self.idle_fps = idle_fps
+        self.idle_scale = idle_scale
+        self.idle = False
+        self.transitions = 0
+        self.cpu = {'active': 0.0, 'idle': 0.0}
+        self.wall = {'active': 0.0, 'idle': 0.0}
+        self.frames = {'active': 0, 'idle': 0}
+
+        self._last_hand = None
+        self._next_due = 0.0
+        self._cpu_mark = time.process_time()
+        self._wall_mark = time.perf_counter()
+
+    def due(self, now):
+        """returns True if the frame captured at 'now' should be processed."""
+        if not self.idle:
+            return True
+        if now < self._next_due:
+            return False
+        self._next_due = now + 1.0 / self.idle_fps
+        return True
+
+    def prepare(self, image):
+        """returns 'image' scaled down for inference while idle, else 'image'."""
+        if not self.idle or self.idle_scale >= 1.0:
+            return image
+        return cv2.resize(image, None, fx=self.idle_scale, fy=self.idle_scale,
+                          interpolation=cv2.INTER_AREA)
+
+    def update(self, hands_found, now):
+        """
+        records whether a processed frame captured at 'now' held a hand and
+        switches state, returns True if the governor is active afterwards.
+        """
+        self._account()
+        self.frames['idle' if self.idle else 'active'] += 1
+        if hands_found or self._last_hand is None:
+            self._last_hand = now
+        if hands_found and self.idle:
+            self.idle = False
+            self.transitions += 1
+        elif (not hands_found and not self.idle and self.enabled
+              and now - self._last_hand >= self.idle_after):
+            self.idle = True
+            self.transitions += 1
+            self._next_due = now + 1.0 / self.idle_fps
+        return not self.idle
+
+    def _account(self):
+        cpu, wall = time.process_time(), time.perf_counter()
+        state = 'idle' if self.idle else 'active'
+        self.cpu[state] += cpu - self._cpu_mark
+        self.wall[state] += wall - self._wall_mark
+        self._cpu_mark, self._wall_mark = cpu, wall
+
+    def stats(self):
+        """
+        returns time, CPU use and processed frames of the active and idle
+        states.
+
+        Returns
+        -------
+        dict
+        """
+        self._account()
+        out = {'idle': self.idle, 'transitions': self.transitions}
+        for state in ('active', 'idle'):
+            wall = self.wall[state]
+            out[state + '_seconds'] = wall
+            out[state + '_cpu_per_min'] = self.cpu[state] / wall * 60.0 if wall else 0.0
+            out[state + '_fps'] = self.frames[state] / wall if wall else 0.0
+        return out
+
+    def report(self):
+        """returns 'stats' as a single printable line."""
+        s = self.stats()
+        return ("active: {active_seconds:.0f} s, {active_fps:.1f} FPS, {active_cpu_per_min:.1f} CPU s/min | "
+                "idle: {idle_seconds:.0f} s, {idle_fps:.1f} FPS, {idle_cpu_per_min:.1f} CPU s/min | "
+                "transitions: {transitions}").format(**s)
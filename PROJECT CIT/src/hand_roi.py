@@ -0,0 +1,174 @@
+# Imports
+
+import cv2
+import mediapipe as mp
+
+mp_hands = mp.solutions.hands
+
+# Hand Region Cropping
+class HandROI:
+    """
+    Wraps mediapipe Hands and runs it on a padded, downscaled crop around the
+    hands found in the previous frame instead of on the whole frame.
+
+    'process' takes the full RGB frame and returns mediapipe results whose
+    landmarks are in full-frame normalized coordinates, so callers do not
+    need to know which mode was used. The whole frame is processed when no
+    hand is tracked, when the crop lost the hand (the same frame is then
+    processed again in full) and every 'redetect_interval' frames, so a hand
+    entering outside the crop is still found. The crop is also dropped when
+    the input size changes, e.g. when 'IdleGovernor' switches to downscaled
+    frames, since its pixel box belongs to the old size.
+
+    The crop box is taken anew after every frame from the hands just found,
+    so it follows the hands and changes position and size from frame to
+    frame. Crops are square so the hand is not distorted. They go to a
+    separate Hands instance, so the full-frame instance only ever sees
+    whole frames.
+
+    Attributes
+    ----------
+    enabled : bool
+        if False every frame is processed in full.
+    padding : float
+        margin added on every side of the hand box, as fraction of its size.
+    min_size : float
+        smallest crop side, as fraction of the shorter frame side.
+    input_size : int
+        side in pixels the crop is downscaled to, if larger.
+    redetect_interval : int
+        no. of frames after which the whole frame is processed again.
+    box : tuple(int, int, int) or None
+        (x, y, side) in pixels of the crop for the next frame, in an image
+        of the size of the frame it was found in.
+    frames_full : int
+        no. of frames processed in full.
+    frames_roi : int
+        no. of frames processed as crop only.
+    fallbacks : int
+        no. of crops that lost the hand and were redone in full.
+    """
+
+    def __init__(self, enabled=True, padding=0.3, min_size=0.25, input_size=256,
+                 redetect_interval=30, **hands_args):
+        """
+        Parameters
+        ----------
+        hands_args : dict
+            passed on to 'mediapipe.solutions.hands.Hands'.
+        """
+        self.enabled = enabled
+        self.padding = padding
+        self.min_size = min_size
+        self.input_size = input_size
+        self.redetect_interval = redetect_interval
+        self.box = None
+        self.frames_full = 0
+        self.frames_roi = 0
+        self.fallbacks = 0
+
+        self.full_hands = mp_hands.Hands(**hands_args)
+        self.roi_hands = mp_hands.Hands(**hands_args) if enabled else None
+        self._since_full = 0
+        self._box_size = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.full_hands.close()
+        if self.roi_hands is not None:
+            self.roi_hands.close()
+
+    def reset(self):
+        """Forgets the tracked region, the next frame is processed in full."""
+        self.box = None
+        self._box_size = None
+
+    def process(self, image):
+        """
+        returns mediapipe Hands results for RGB 'image', landmarks in
+        full-frame normalized coordinates.
+        """
+        height, width = image.shape[:2]
+        if self._box_size != (width, height):
+            self.reset()
+        results = None
+        if (self.enabled and self.box is not None
+                and self._since_full < self.redetect_interval):
+            results = self._process_roi(image, width)
+            if results.multi_hand_landmarks:
+                self.frames_roi += 1
+                self._since_full += 1
+            else:
+                self.fallbacks += 1
+                results = None
+
+        if results is None:
+            results = self.full_hands.process(image)
+            self.frames_full += 1
+            self._since_full = 0
+
+        self.box = self._next_box(results, width, height) if self.enabled else None
+        self._box_size = (width, height)
+        return results
+
+    def _process_roi(self, image, width):
+        """runs the crop instance on 'box' and maps landmarks back."""
+        x0, y0, side = self.box
+        crop = image[y0:y0 + side, x0:x0 + side]
+        if side > self.input_size:
+            crop = cv2.resize(crop, (self.input_size, self.input_size), interpolation=cv2.INTER_AREA)
+        results = self.roi_hands.process(crop)
+
+        height = image.shape[0]
+        sx, sy = side / width, side / height
+        ox, oy = x0 / width, y0 / height
+        for hand in results.multi_hand_landmarks or []:
+            for lm in hand.landmark:
+                lm.x = ox + lm.x*sx
+                lm.y = oy + lm.y*sy
+                # z shares the scale of x, which was the crop width.
+                lm.z = lm.z*sx
+        return results
+
+    def _next_box(self, results, width, height):
+        """returns padded square crop (x, y, side) around all hands, or None."""
+        if not results.multi_hand_landmarks:
+            return None
+        xs = [lm.x for hand in results.multi_hand_landmarks for lm in hand.landmark]
+        ys = [lm.y for hand in results.multi_hand_landmarks for lm in hand.landmark]
+        x_min, x_max = min(xs)*width, max(xs)*width
+        y_min, y_max = min(ys)*height, max(ys)*height
+
+        limit = min(width, height)
+        side = max(x_max - x_min, y_max - y_min) * (1 + 2*self.padding)
+        side = int(min(max(side, self.min_size*limit), limit))
+        cx, cy = (x_min + x_max) / 2, (y_min + y_max) / 2
+        x0 = int(min(max(cx - side/2, 0), width - side))
+        y0 = int(min(max(cy - side/2, 0), height - side))
+        return (x0, y0, side)
+
+    def stats(self):
+        """
+        returns frame counts per mode.
+
+        Returns
+        -------
+        dict
+        """
+        total = self.frames_full + self.frames_roi
+        return {
+            'frames_full': self.frames_full,
+            'frames_roi': self.frames_roi,
+            'fallbacks': self.fallbacks,
+            'roi_share': self.frames_roi / total if total else 0.0,
+        }
+
+    def report(self):
+        """returns 'stats' as a single printable line."""
+        return ("hand frames full: {frames_full}, cropped: {frames_roi} ({roi_share:.0%}), "
+                "crop fallbacks: {fallbacks}").format(**self.stats())
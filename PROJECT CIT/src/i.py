@@ -1,196 +1,51 @@
-import pyttsx3
-import speech_recognition as sr
 from datetime import date
 import time
 import webbrowser
 import datetime
-from pynput.keyboard import Key, Controller
-import pyautogui
 import sys
 import os
 from os import listdir
 from os.path import isfile, join
-import smtplib
-import wikipedia
-import Gesture_Controller
-# import Gesture_Controller_Gloved as Gesture_Controller
-import app
-from threading import Thread
-# Set Microphone parameters
-with sr.Microphone() as source:
-    r.energy_threshold = 500
-    r.dynamic_energy_threshold = False
-    r.adjust_for_ambient_noise(source)
+from threading import Lock, Thread
+from startup import Deferred, lazy_import, profile, warm_up
+# Speech, keyboard and gesture modules load on first use or in the warm-up
+# after the UI is up, so the assistant greets without waiting for them.
+pyttsx3 = lazy_import('pyttsx3')
+sr = lazy_import('speech_recognition')
+pynput_keyboard = lazy_import('pynput.keyboard')
+Gesture_Controller = lazy_import('Gesture_Controller')
+# Gesture_Controller = lazy_import('Gesture_Controller_Gloved')
+app = profile.timed_import('app')
 
-# Audio to String
-def record_audio():
-    with sr.Microphone() as source:
-        r.pause_threshold = 0.8
-        voice_data = ''
-        audio = r.listen(source, phrase_time_limit=5)
-
-        try:
-            voice_data = r.recognize_google(audio, language='en-US')
-        except sr.RequestError:
-            reply('Sorry my Service is down. Plz check your Internet connection')
-        except sr.UnknownValueError:
-            print('cant recognize')
-            pass
-        return voice_data.lower()
-
-# Executes Commands (input: string)
-def respond(voice_data):
-    global file_exp_status, files, is_awake, path
-    print(voice_data)
-    voice_data = voice_data.replace('a', '').strip()
-    app.eel.addUserMsg(voice_data)
-
-    if is_awake == False:
-        if 'wake up' in voice_data:
-            is_awake = True
-            wish()
-
-    # STATIC CONTROLS
-    elif 'hello' in voice_data:
-        wish()
-
-    elif 'what is your name' in voice_data:
-        reply('My name is i! and I am developed by TIPGS,KOLAGHAT')
-
-    elif 'date' in voice_data:
-        reply(today.strftime("%B %d, %Y"))
-
-    elif 'time' in voice_data:
-        reply(str(datetime.datetime.now()).split(" ")[1].split('.')[0])
-
-    elif 'search' in voice_data:
-        reply('Searching for ' + voice_data.split('search')[1])
-        url = 'https://google.com/search?q=' + voice_data.split('search')[1]
-        try:
-            webbrowser.get().open(url)
-            reply('This is what I found Sir')
-        except:
-            reply('Please check your Internet')
-
-    elif 'location' in voice_data:
-        reply('Which place are you looking for ?')
-        temp_audio = record_audio()
-        app.eel.addUserMsg(temp_audio)
-        reply('Locating...')
-        url = 'https://google.nl/maps/place/' + temp_audio + '/&amp;'
-        try:
-            webbrowser.get().open(url)
-            reply('This is what I found Sir')
-        except:
-            reply('Please check your Internet')
-
-    elif ('bye' in voice_data) or ('by' in voice_data):
-        reply("Good bye Sir! Have a nice day.")
-        is_awake = False
-
-    elif ('exit' in voice_data) or ('terminate' in voice_data):
-        if Gesture_Controller.GestureController.gc_mode:
-            Gesture_Controller.GestureController.gc_mode = 0
-        app.ChatBot.close()
-        # sys.exit() always raises SystemExit, Handle it in main loop
-        sys.exit()
-
-    # DYNAMIC CONTROLS
-    elif 'launch gesture recognition' in voice_data:
-        if Gesture_Controller.GestureController.gc_mode:
-            reply('Gesture recognition is already active')
-        else:
-            gc = Gesture_Controller.GestureController()
-            t = Thread(target=gc.start)
-            t.start()
-            reply('Launched Successfully')
+# -------------Object Initialization---------------
+today = date.today()
 
-    elif ('stop gesture recognition' in voice_data) or ('top gesture recognition' in voice_data):
-        if Gesture_Controller.GestureController.gc_mode:
-            Gesture_Controller.GestureController.gc_mode = 0
-            reply('Gesture recognition stopped')
-        else:
-            reply('Gesture recognition is already inactive')
 
-    elif 'copy' in voice_data:
-        with keyboard.pressed(Key.ctrl):
-            keyboard.press('c')
-            keyboard.release('c')
-        reply('Copied')
+def make_recognizer():
+    recognizer = sr.Recognizer()
+    recognizer.energy_threshold = 500
+    recognizer.dynamic_energy_threshold = False
+    return recognizer
 
-    elif 'page' in voice_data or 'pest' in voice_data or 'paste' in voice_data:
-        with keyboard.pressed(Key.ctrl):
-            keyboard.press('v')
-            keyboard.release('v')
-        reply('Pasted')
 
-    # File Navigation (Default Folder set to C://)
-    elif 'list' in voice_data:
-        counter = 0
-        path = 'C://'
-        files = listdir(path)
-        filestr = ""
-        for f in files:
-            counter += 1
-            print(str(counter) + ':  ' + f)
-            filestr += str(counter) + ':  ' + f + '<br>'
-        file_exp_status = True
-        reply('These are the files in your root directory')
-        app.ChatBot.addAppMsg(filestr)
+def make_engine():
+    engine = pyttsx3.init()
+    voices = engine.getProperty('voices')
+    engine.setProperty('voice', voices[0].id)
+    return engine
 
-    elif file_exp_status == True:
-        counter = 0
-        if 'open' in voice_data:
-            if isfile(join(path, files[int(voice_data.split(' ')[-1]) - 1])):
-                os.startfile(path + files[int(voice_data.split(' ')[-1]) - 1])
-                file_exp_status = False
-            else:
-                try:
-                    path = path + files[int(voice_data.split(' ')[-1]) - 1] + '//'
-                    files = listdir(path)
-                    filestr = ""
-                    for f in files:
-                        counter += 1
-                        filestr += str(counter) + ':  ' + f + '<br>'
-                        print(str(counter) + ':  ' + f)
-                    reply('Opened Successfully')
-                    app.ChatBot.addAppMsg(filestr)
-
-                except:
-                    reply('You do not have permission to access this folder')
-
-        if 'back' in voice_data:
-            filestr = ""
-            if path == 'C://':
-                reply('Sorry, this is the root directory')
-            else:
-                a = path.split('//')[:-2]
-                path = '//'.join(a)
-                path += '//'
-                files = listdir(path)
-                for f in files:
-                    counter += 1
-                    filestr += str(counter) + ':  ' + f + '<br>'
-                    print(str(counter) + ':  ' + f)
-                reply('ok')
-                app.ChatBot.addAppMsg(filestr)
 
-    else:
-        reply('I am not functioned to do this !')
-# -------------Object Initialization---------------
-today = date.today()
-r = sr.Recognizer()
-keyboard = Controller()
-engine = pyttsx3.init('sapi5')
-engine = pyttsx3.init()
-voices = engine.getProperty('voices')
-engine.setProperty('voice', voices[0].id)
+r = Deferred('recognizer', make_recognizer)
+keyboard = Deferred('keyboard', lambda: pynput_keyboard.Controller())
+engine = Deferred('speech engine', make_engine)
 
 # ----------------Variables------------------------
 file_exp_status = False
 files = []
 path = ''
 is_awake = True  # Bot status
+gesture_session = None  # running GestureController
+gesture_lock = Lock()  # guards gesture_session
 
 
 # ------------------Functions----------------------
@@ -215,10 +70,28 @@ def wish():
     reply("I am i, how may I help you?")
 
 
-# Set Microphone parameters
-with sr.Microphone() as source:
-    r.energy_threshold = 500
-    r.dynamic_energy_threshold = False
+# Gesture recognition runs on its own thread with its own GestureController,
+# the voice loop only starts and stops it through these helpers.
+def launch_gesture_recognition():
+    """starts a gesture session, returns False if one is already running."""
+    global gesture_session
+    with gesture_lock:
+        if gesture_session is not None and gesture_session.gc_mode:
+            return False
+        gesture_session = Gesture_Controller.GestureController()
+        Thread(target=gesture_session.start).start()
+        return True
+
+
+def stop_gesture_recognition():
+    """stops the running gesture session, returns False if none was running."""
+    global gesture_session
+    with gesture_lock:
+        if gesture_session is None or not gesture_session.gc_mode:
+            return False
+        gesture_session.stop()
+        gesture_session = None
+        return True
 
 
 # Audio to String
@@ -289,8 +162,7 @@ def respond(voice_data):
         is_awake = False
 
     elif ('exit' in voice_data) or ('terminate' in voice_data):
-        if Gesture_Controller.GestureController.gc_mode:
-            Gesture_Controller.GestureController.gc_mode = 0
+        stop_gesture_recognition()
         app.ChatBot.close()
         # sys.exit() always raises SystemExit, Handle it in main loop
         sys.exit()
@@ -298,29 +170,25 @@ def respond(voice_data):
 
     # DYNAMIC CONTROLS
     elif 'launch gesture recognition' in voice_data:
-        if Gesture_Controller.GestureController.gc_mode:
-            reply('Gesture recognition is already active')
-        else:
-            gc = Gesture_Controller.GestureController()
-            t = Thread(target=gc.start)
-            t.start()
+        if launch_gesture_recognition():
             reply('Launched Successfully')
+        else:
+            reply('Gesture recognition is already active')
 
     elif ('stop gesture recognition' in voice_data) or ('top gesture recognition' in voice_data):
-        if Gesture_Controller.GestureController.gc_mode:
-            Gesture_Controller.GestureController.gc_mode = 0
+        if stop_gesture_recognition():
             reply('Gesture recognition stopped')
         else:
             reply('Gesture recognition is already inactive')
 
     elif 'copy' in voice_data:
-        with keyboard.pressed(Key.ctrl):
+        with keyboard.pressed(pynput_keyboard.Key.ctrl):
             keyboard.press('c')
             keyboard.release('c')
         reply('Copied')
 
     elif 'page' in voice_data or 'pest' in voice_data or 'paste' in voice_data:
-        with keyboard.pressed(Key.ctrl):
+        with keyboard.pressed(pynput_keyboard.Key.ctrl):
             keyboard.press('v')
             keyboard.release('v')
         reply('Pasted')
@@ -388,8 +256,13 @@ t1.start()
 # Lock main thread until Chatbot has started
 while not app.ChatBot.started:
     time.sleep(0.5)
+profile.mark('ui started')
 
+# the speech engine is built by the first reply on this thread, pyttsx3 drivers
+# expect to be run from the thread that created them
+warm_up(sr, r, pynput_keyboard, Gesture_Controller, done=lambda: print(profile.report()))
 wish()
+profile.mark('greeted')
 voice_data = None
 while True:
     if app.ChatBot.isUserInput():
@@ -0,0 +1,300 @@
+# Imports
+
+import collections
+import multiprocessing
+import queue
+import time
+from collections import namedtuple
+from multiprocessing import shared_memory
+from types import SimpleNamespace
+import numpy as np
+
+# Compact Landmark Results
+Point = namedtuple('Point', 'x y z')
+Category = namedtuple('Category', 'label score')
+
+class LandmarkArray:
+    """
+    (N,3) float32 landmarks that read like a mediapipe NormalizedLandmarkList,
+    'landmark[i].x' builds only the points that are actually accessed.
+    """
+    __slots__ = ('array',)
+
+    def __init__(self, array):
+        self.array = array
+
+    @property
+    def landmark(self):
+        return _Points(self.array)
+
+    def to_proto(self):
+        """returns the landmarks as mediapipe NormalizedLandmarkList, e.g. for drawing."""
+        from mediapipe.framework.formats import landmark_pb2
+        lms = landmark_pb2.NormalizedLandmarkList()
+        for x, y, z in self.array.tolist():
+            lms.landmark.add(x=x, y=y, z=z)
+        return lms
+
+
+class _Points:
+    __slots__ = ('array',)
+
+    def __init__(self, array):
+        self.array = array
+
+    def __len__(self):
+        return len(self.array)
+
+    def __getitem__(self, index):
+        return Point(*self.array[index].tolist())
+
+    def __iter__(self):
+        return (Point(*row) for row in self.array.tolist())
+
+
+def pack_results(kind, results):
+    """returns mediapipe 'results' as plain arrays, in the worker process."""
+    if kind == 'hands':
+        hands = results.multi_hand_landmarks or []
+        points = np.array([[(lm.x, lm.y, lm.z) for lm in hand.landmark] for hand in hands],
+                          dtype=np.float32).reshape(len(hands), 21, 3)
+        labels = [(c.classification[0].label, c.classification[0].score)
+                  for c in (results.multi_handedness or [])]
+        return points, labels
+    faces = results.multi_face_landmarks or []
+    points = np.array([[(lm.x, lm.y, lm.z) for lm in face.landmark] for face in faces],
+                      dtype=np.float32)
+    return points, None
+
+
+def unpack_results(kind, packed):
+    """returns arrays of 'pack_results' in the shape of mediapipe results."""
+    points, labels = packed
+    items = [LandmarkArray(p) for p in points] or None
+    if kind == 'hands':
+        handedness = None
+        if labels:
+            handedness = [SimpleNamespace(classification=[Category(label, score)]) for label, score in labels]
+        return SimpleNamespace(multi_hand_landmarks=items, multi_handedness=handedness)
+    return SimpleNamespace(multi_face_landmarks=items)
+
+
+def make_model(kind, model_args):
+    import mediapipe as mp
+    if kind == 'hands':
+        return mp.solutions.hands.Hands(**model_args)
+    return mp.solutions.face_mesh.FaceMesh(**model_args)
+
+# Worker Process
+def inference_worker(kind, model_args, ring_name, slots, slot_bytes, tasks, results):
+    """
+    runs the mediapipe model of 'kind' on frames of the shared ring until it
+    receives None, see 'InferencePool'.
+    """
+    ring = shared_memory.SharedMemory(name=ring_name)
+    frames = np.ndarray((slots, slot_bytes), dtype=np.uint8, buffer=ring.buf)
+    model = make_model(kind, model_args)
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                return
+            seq, slot, shape = task
+            image = frames[slot, :shape[0]*shape[1]*shape[2]].reshape(shape)
+            image.flags.writeable = False
+            packed = pack_results(kind, model.process(image))
+            del image
+            results.put((seq, slot, packed))
+    finally:
+        model.close()
+        del frames
+        ring.close()
+
+# Pipelined Inference
+class SyncInference:
+    """
+    Same interface as 'InferencePool' around a model running in the caller's
+    thread, e.g. 'HandROI' or a FaceMesh. 'push' returns its frame at once.
+    """
+
+    def __init__(self, model):
+        self.model = model
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def push(self, image, tag=None):
+        return [(tag, self.model.process(image))]
+
+    def drain(self):
+        return []
+
+    def close(self):
+        self.model.close()
+
+    def report(self):
+        report = getattr(self.model, 'report', None)
+        return report() if report is not None else "inference: in-process"
+
+
+class InferencePool:
+    """
+    Runs mediapipe Hands or FaceMesh in worker processes, so inference does
+    not share the GIL with capture, filtering and input dispatch.
+
+    Frames are copied once into a ring of 'multiprocessing.shared_memory'
+    slots, only (seq, slot, shape) goes through the task queue. Workers send
+    landmarks back as float32 arrays, rebuilt into 'LandmarkArray' results
+    that read like mediapipe ones.
+
+    'push' hands a frame in and returns the frames finished so far, in
+    submission order, as (tag, results) pairs. Up to 'depth' frames are in
+    flight, so capture and pre-processing of the next frames overlap
+    inference of the earlier ones. Results lag 'depth' frames behind.
+
+    Every worker keeps its own model, with several workers each one tracks
+    every n-th frame only.
+
+    Attributes
+    ----------
+    kind : str
+        'hands' or 'face'.
+    workers : int
+        no. of worker processes.
+    depth : int
+        maximum no. of frames in flight, 'workers' by default.
+    max_shape : tuple(int, int, int)
+        largest frame (height, width, channels) a slot holds.
+    frames : int
+        no. of frames returned.
+    """
+
+    def __init__(self, kind='hands', workers=2, depth=None, max_shape=(1080, 1920, 3), timeout=10.0, **model_args):
+        """
+        Parameters
+        ----------
+        model_args : dict
+            passed on to 'Hands' or 'FaceMesh'.
+        """
+        self.kind = kind
+        self.workers = workers
+        self.depth = depth or workers
+        self.max_shape = max_shape
+        self.timeout = timeout
+        self.frames = 0
+        self.latency_total = 0.0
+
+        slots = self.depth + 1
+        slot_bytes = int(np.prod(max_shape))
+        self._ring = shared_memory.SharedMemory(create=True, size=slots*slot_bytes)
+        self._slots = np.ndarray((slots, slot_bytes), dtype=np.uint8, buffer=self._ring.buf)
+        self._free = collections.deque(range(slots))
+        self._tags = {}
+        self._done = {}
+        self._sent_at = {}
+        self._seq = 0
+        self._next = 0
+
+        context = multiprocessing.get_context('spawn')
+        self._tasks = context.Queue()
+        self._results = context.Queue()
+        self._processes = [context.Process(target=inference_worker, name='Inference-%d' % i, daemon=True,
+                                           args=(kind, model_args, self._ring.name, slots, slot_bytes,
+                                                 self._tasks, self._results))
+                           for i in range(workers)]
+        for process in self._processes:
+            process.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def push(self, image, tag=None):
+        """
+        queues RGB 'image' for inference, returns list of (tag, results) of
+        the frames finished so far, oldest first.
+        """
+        shape = image.shape
+        if image.size > self._slots.shape[1]:
+            raise ValueError("frame %s larger than max_shape %s" % (shape, self.max_shape))
+        while not self._free:
+            self._receive()
+        slot = self._free.popleft()
+        self._slots[slot, :image.size].reshape(shape)[...] = image
+        self._tags[self._seq] = tag
+        self._sent_at[self._seq] = time.perf_counter()
+        self._tasks.put((self._seq, slot, shape))
+        self._seq += 1
+
+        finished = []
+        while True:
+            self._poll()
+            finished.extend(self._ready())
+            if self._seq - self._next <= self.depth:
+                return finished
+            self._receive()
+
+    def drain(self):
+        """waits for every frame in flight, returns their (tag, results)."""
+        finished = []
+        while self._next < self._seq:
+            if self._next not in self._done:
+                self._receive()
+            finished.extend(self._ready())
+        return finished
+
+    def _poll(self):
+        while True:
+            try:
+                self._store(self._results.get_nowait())
+            except queue.Empty:
+                return
+
+    def _receive(self):
+        deadline = time.perf_counter() + self.timeout
+        while True:
+            try:
+                self._store(self._results.get(timeout=0.5))
+                return
+            except queue.Empty:
+                if not any(p.is_alive() for p in self._processes):
+                    raise RuntimeError("inference workers exited")
+                if time.perf_counter() > deadline:
+                    raise RuntimeError("no inference result within %.1f s" % self.timeout)
+
+    def _store(self, item):
+        seq, slot, packed = item
+        self._free.append(slot)
+        self._done[seq] = packed
+
+    def _ready(self):
+        finished = []
+        while self._next in self._done:
+            packed = self._done.pop(self._next)
+            self.latency_total += time.perf_counter() - self._sent_at.pop(self._next)
+            finished.append((self._tags.pop(self._next), unpack_results(self.kind, packed)))
+            self._next += 1
+            self.frames += 1
+        return finished
+
+    def close(self):
+        """Stops the workers and frees the shared ring."""
+        for _ in self._processes:
+            self._tasks.put(None)
+        for process in self._processes:
+            process.join(2.0)
+            if process.is_alive():
+                process.terminate()
+        self._slots = None
+        self._ring.close()
+        self._ring.unlink()
+
+    def report(self):
+        mean = self.latency_total / self.frames * 1000.0 if self.frames else 0.0
+        return "inference: %d worker processes, %d frames, submit-to-result mean %.1f ms" % (
+            self.workers, self.frames, mean)
@@ -0,0 +1,387 @@
+# Imports
+
+import collections
+import threading
+import time
+import pyautogui
+
+# Null Input Backend
+class NullBackend:
+    """
+    Input backend with pyautogui's method names that records calls instead
+    of driving the mouse and keyboard.
+
+    Attributes
+    ----------
+    events : list
+        (name, args, kwargs) of every call, in order. Several backends can
+        share one list to get a single ordered log.
+    prefix : str
+        prepended to the names logged, e.g. 'volume.'.
+    simulate_duration : bool
+        if True, 'moveTo' sleeps for 'duration' like pyautogui does.
+    """
+
+    def __init__(self, simulate_duration=False, record=True, events=None, prefix=''):
+        self.events = [] if events is None else events
+        self.prefix = prefix
+        self.simulate_duration = simulate_duration
+        self.record = record
+        self._pos = (0, 0)
+
+    def _log(self, name, args, kwargs):
+        if self.record:
+            kwargs.pop('_pause', None)
+            self.events.append((self.prefix + name, args, kwargs))
+
+    def moveTo(self, x, y, duration=0.0, **kwargs):
+        if self.simulate_duration and duration:
+            time.sleep(duration)
+        self._pos = (x, y)
+        self._log('moveTo', (x, y), kwargs)
+
+    def position(self):
+        return self._pos
+
+    def size(self):
+        return (1920, 1080)
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return lambda *args, **kwargs: self._log(name, args, kwargs)
+
+# Non-blocking Input Dispatch
+class InputDispatcher:
+    """
+    Sends mouse and keyboard events from a dedicated thread so the vision loop
+    never waits on them.
+
+    Exposes the pyautogui methods used by the controllers. Events are queued
+    in a bounded queue and run in order. Consecutive pending moves are merged
+    into the newest target, and the motion towards a target is interpolated
+    on the worker instead of through pyautogui's blocking 'duration'. A move
+    followed by any other event is completed before that event runs, so
+    clicks and scrolls land where the cursor was sent.
+
+    Attributes
+    ----------
+    backend : Object
+        receives the calls, 'pyautogui' by default.
+    maxsize : int
+        maximum no. of pending events.
+    step_interval : float
+        seconds between two interpolated cursor positions.
+    moves_coalesced : int
+        no. of moves replaced by a newer target before being run.
+    moves_dropped : int
+        no. of moves dropped because the queue was full.
+    """
+
+    def __init__(self, backend=pyautogui, maxsize=64, step_interval=1/120):
+        self.backend = backend
+        self.maxsize = maxsize
+        self.step_interval = step_interval
+        self.moves_coalesced = 0
+        self.moves_dropped = 0
+
+        self._queue = collections.deque()
+        self._cond = threading.Condition()
+        self._busy = False
+        self._pos = None
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        """Starts the worker thread, returns self."""
+        if not self._running:
+            self._running = True
+            self._thread = threading.Thread(target=self._work, name='InputDispatcher', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, flush=True):
+        """Stops the worker, after running pending events if 'flush'."""
+        if flush:
+            self.flush()
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def idle(self):
+        """returns True if no event is queued or running, e.g. no move in flight."""
+        with self._cond:
+            return not self._queue and not self._busy
+
+    def flush(self, timeout=2.0):
+        """Waits until every queued event has run."""
+        with self._cond:
+            self._cond.wait_for(lambda: not self._queue and not self._busy, timeout)
+
+    # Queueing
+    def moveTo(self, x, y, duration=0.0):
+        """queues a move, merged with a pending move if there is one."""
+        with self._cond:
+            if self._queue and self._queue[-1][0] == 'moveTo':
+                self._queue[-1] = ('moveTo', (x, y, duration), {})
+                self.moves_coalesced += 1
+            elif len(self._queue) < self.maxsize:
+                self._queue.append(('moveTo', (x, y, duration), {}))
+            else:
+                self.moves_dropped += 1
+                return
+            self._cond.notify_all()
+
+    def _post(self, name, args, kwargs):
+        """
+        queues any other event, waits for room rather than dropping it.
+        Raises RuntimeError if the queue is full and no worker runs to
+        empty it.
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: len(self._queue) < self.maxsize or not self._running)
+            if len(self._queue) >= self.maxsize:
+                raise RuntimeError("input dispatcher is not running, %d events pending, '%s' not queued"
+                                   % (len(self._queue), name))
+            self._queue.append((name, args, kwargs))
+            self._cond.notify_all()
+
+    def mouseDown(self, *args, **kwargs):
+        self._post('mouseDown', args, kwargs)
+
+    def mouseUp(self, *args, **kwargs):
+        self._post('mouseUp', args, kwargs)
+
+    def click(self, *args, **kwargs):
+        self._post('click', args, kwargs)
+
+    def doubleClick(self, *args, **kwargs):
+        self._post('doubleClick', args, kwargs)
+
+    def scroll(self, *args, **kwargs):
+        self._post('scroll', args, kwargs)
+
+    def hscroll(self, *args, **kwargs):
+        self._post('hscroll', args, kwargs)
+
+    def keyDown(self, *args, **kwargs):
+        self._post('keyDown', args, kwargs)
+
+    def keyUp(self, *args, **kwargs):
+        self._post('keyUp', args, kwargs)
+
+    def press(self, *args, **kwargs):
+        self._post('press', args, kwargs)
+
+    def write(self, *args, **kwargs):
+        self._post('write', args, kwargs)
+
+    # Worker
+    def _work(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._queue or not self._running)
+                if not self._queue:
+                    return
+                name, args, kwargs = self._queue.popleft()
+                self._busy = True
+                self._cond.notify_all()
+            try:
+                if name == 'moveTo':
+                    self._move(*args)
+                else:
+                    getattr(self.backend, name)(*args, **kwargs)
+            except Exception as e:
+                print("input dispatch failed:", name, e)
+            with self._cond:
+                self._busy = False
+                self._cond.notify_all()
+
+    def _move(self, x, y, duration):
+        """moves the cursor to (x, y) in steps, following newer targets."""
+        if self._pos is None:
+            try:
+                self._pos = tuple(self.backend.position())
+            except Exception:
+                self._pos = (x, y)
+        start_x, start_y = self._pos
+        start_t = time.perf_counter()
+
+        while True:
+            elapsed = time.perf_counter() - start_t
+            done = duration <= 0 or elapsed >= duration
+            if done:
+                px, py = x, y
+            else:
+                frac = elapsed / duration
+                px, py = start_x + (x - start_x)*frac, start_y + (y - start_y)*frac
+            self.backend.moveTo(px, py, _pause=False)
+            self._pos = (px, py)
+            if done:
+                return
+
+            with self._cond:
+                self._cond.wait_for(lambda: self._queue or not self._running, self.step_interval)
+                if self._queue and self._queue[0][0] == 'moveTo':
+                    # Newer target, carry on from where the cursor is now.
+                    _, (x, y, duration), _ = self._queue.popleft()
+                    self.moves_coalesced += 1
+                    start_x, start_y = self._pos
+                    start_t = time.perf_counter()
+                    self._cond.notify_all()
+                elif self._queue or not self._running:
+                    # Ordered event waiting, finish the move right away.
+                    duration = 0
+
+# Continuous Scrolling
+class ScrollWorker:
+    """
+    Turns a scroll velocity into scroll events sent in batches at a fixed
+    rate, e.g. for pinch scrolling.
+
+    'set_velocity' gives the speed in lines per second, positive scrolls up
+    or right. The distance covered since the last batch is accumulated in
+    wheel units and every 1/'rate' seconds the whole units are sent as one
+    'scroll' call, the fraction carries over to the next batch. Horizontal
+    scrolling holds 'modifiers' down from its first batch until 'end' or
+    the next vertical batch instead of pressing them for every event.
+
+    The thread stops scrolling by itself, as 'end' does, once no
+    'set_velocity' came for 'timeout' seconds, so a caller that stops
+    updating cannot leave it scrolling.
+
+    Without 'start' no thread runs and 'set_velocity' sends a batch itself
+    whenever one is due at the given time, so replays driven by capture
+    timestamps stay repeatable.
+
+    Attributes
+    ----------
+    dispatcher : Object
+        receives 'scroll', 'keyDown' and 'keyUp', e.g. 'InputDispatcher'.
+    rate : float
+        batches per second.
+    units_per_line : float
+        wheel units per scrolled line, 120 units are one notch of 3 lines.
+    modifiers : tuple of str
+        keys held while scrolling horizontally.
+    timeout : float
+        seconds without 'set_velocity' after which the thread stops
+        scrolling.
+    velocity : tuple(float, float)
+        current (horizontal, vertical) speed in lines per second.
+    units : int
+        wheel units sent so far.
+    batches : int
+        no. of 'scroll' calls made.
+    """
+
+    def __init__(self, dispatcher, rate=30.0, units_per_line=40, modifiers=('shift', 'ctrl'), timeout=0.5):
+        self.dispatcher = dispatcher
+        self.rate = rate
+        self.timeout = timeout
+        self.units_per_line = units_per_line
+        self.modifiers = modifiers
+        self.velocity = (0.0, 0.0)
+        self.units = 0
+        self.batches = 0
+
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._acc = [0.0, 0.0]
+        self._last = None
+        self._sent_at = None
+        self._updated = None
+        self._held = False
+        self._thread = None
+
+    def start(self):
+        """Starts the batching thread, returns self."""
+        if self._thread is None:
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._work, name='ScrollWorker', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self.end()
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def set_velocity(self, lines_x, lines_y, now=None):
+        """
+        sets the scroll speed in lines per second from time 'now' on, 'now'
+        is only used without 'start' and defaults to 'time.perf_counter'.
+        """
+        with self._lock:
+            if self._thread is not None or now is None:
+                now = time.perf_counter()
+            self._integrate(now)
+            self.velocity = (lines_x, lines_y)
+            self._updated = now
+            if self._thread is None and (self._sent_at is None or now - self._sent_at >= 0.999 / self.rate):
+                self._send()
+                self._sent_at = now
+
+    def end(self):
+        """Stops scrolling, drops the remaining fraction and releases held modifiers."""
+        with self._lock:
+            self._end()
+
+    def _end(self):
+        self.velocity = (0.0, 0.0)
+        self._acc = [0.0, 0.0]
+        self._last = None
+        self._sent_at = None
+        self._updated = None
+        self._release()
+
+    def _integrate(self, now):
+        if self._last is not None:
+            dt = now - self._last
+            self._acc[0] += self.velocity[0] * dt * self.units_per_line
+            self._acc[1] += self.velocity[1] * dt * self.units_per_line
+        self._last = now
+
+    def _send(self):
+        """sends the whole units accumulated, as at most one batch."""
+        ux, uy = int(self._acc[0]), int(self._acc[1])
+        if uy:
+            self._release()
+            self.dispatcher.scroll(uy)
+            self._acc[1] -= uy
+            self.units += abs(uy)
+            self.batches += 1
+        elif ux:
+            if not self._held:
+                for key in self.modifiers:
+                    self.dispatcher.keyDown(key)
+                self._held = True
+            # with the modifiers held a wheel-down scrolls right
+            self.dispatcher.scroll(-ux)
+            self._acc[0] -= ux
+            self.units += abs(ux)
+            self.batches += 1
+
+    def _release(self):
+        if self._held:
+            for key in reversed(self.modifiers):
+                self.dispatcher.keyUp(key)
+            self._held = False
+
+    def _work(self):
+        interval = 1.0 / self.rate
+        while not self._stopped.wait(interval):
+            with self._lock:
+                if self._last is not None:
+                    now = time.perf_counter()
+                    if now - self._updated >= self.timeout:
+                        # no updates any more, the caller stopped without 'end'
+                        self._end()
+                        continue
+                    self._integrate(now)
+                    self._send()
@@ -0,0 +1,249 @@
+# Imports
+
+import time
+import cv2
+import numpy as np
+from tracing import tracer
+
+# Marker Trackers
+def box_of(corners):
+    """returns integer [x, y, w, h] bounding box of (4, 2) 'corners'."""
+    x0, y0 = np.floor(corners.min(axis=0))
+    x1, y1 = np.ceil(corners.max(axis=0))
+    return [int(x0), int(y0), max(int(x1 - x0), 1), max(int(y1 - y0), 1)]
+
+
+class BoxTracker:
+    """
+    Follows the marker with an OpenCV box tracker (CSRT, KCF, MOSSE).
+
+    The tracker only follows the bounding box, the corners of the last
+    detection are moved and scaled with it so the marker keeps its
+    orientation between detections. Box trackers give no usable score, the
+    confidence is 1.0 while the tracker reports success and 0.0 after.
+    """
+
+    def __init__(self, create):
+        self.create = create
+        self.tracker = None
+        self.corners = None
+        self.box = None
+
+    def init(self, frame, corners):
+        self.tracker = self.create()
+        self.box = box_of(corners)
+        self.corners = corners
+        self.tracker.init(frame, self.box)
+
+    def update(self, frame):
+        """returns (confidence, corners) of the marker in 'frame'."""
+        ok, box = self.tracker.update(frame)
+        if not ok or box[2] <= 0 or box[3] <= 0:
+            return 0.0, None
+        x, y, w, h = box
+        px, py, pw, ph = self.box
+        scale = np.array([w / pw, h / ph], dtype=np.float32)
+        centre = np.array([px + pw/2, py + ph/2], dtype=np.float32)
+        new_centre = np.array([x + w/2, y + h/2], dtype=np.float32)
+        self.corners = (self.corners - centre) * scale + new_centre
+        self.box = list(box)
+        return 1.0, self.corners
+
+
+class FlowTracker:
+    """
+    Follows the four marker corners with pyramidal Lucas-Kanade optical flow.
+
+    Every corner is tracked forward and back again, the confidence is the
+    fraction of corners that return within 'max_error' pixels of where they
+    started. The corners themselves are tracked, so rotation and
+    perspective of the marker are kept. If some corners fail, all four are
+    moved by the similarity transform of the ones that held.
+    """
+
+    def __init__(self, win_size=21, max_level=3, max_error=1.0):
+        self.params = dict(winSize=(win_size, win_size), maxLevel=max_level,
+                           criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 20, 0.03))
+        self.max_error = max_error
+        self.gray = None
+        self.corners = None
+
+    def init(self, frame, corners):
+        self.gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        self.corners = corners
+
+    def update(self, frame):
+        """returns (confidence, corners) of the marker in 'frame'."""
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        prev = self.corners.reshape(-1, 1, 2)
+        nxt, st, _ = cv2.calcOpticalFlowPyrLK(self.gray, gray, prev, None, **self.params)
+        back, st_back, _ = cv2.calcOpticalFlowPyrLK(gray, self.gray, nxt, None, **self.params)
+        error = np.linalg.norm((back - prev).reshape(-1, 2), axis=1)
+        good = (st.ravel() == 1) & (st_back.ravel() == 1) & (error < self.max_error)
+        self.gray = gray
+        confidence = float(good.mean())
+        if good.all():
+            self.corners = nxt.reshape(-1, 2)
+        elif good.sum() >= 2:
+            m, _ = cv2.estimateAffinePartial2D(prev[good], nxt[good])
+            if m is None:
+                return 0.0, None
+            self.corners = cv2.transform(prev, m).reshape(-1, 2)
+        else:
+            return confidence, None
+        return confidence, self.corners
+
+
+def _opencv_tracker(*names):
+    """returns a factory of the first OpenCV tracker of 'names' this build has."""
+    for name in names:
+        owner = cv2
+        for part in name.split('.'):
+            owner = getattr(owner, part, None)
+        if owner is not None:
+            return lambda: BoxTracker(owner)
+    return None
+
+
+MARKER_TRACKERS = {
+    'flow': FlowTracker,
+    'kcf': _opencv_tracker('TrackerKCF_create', 'legacy.TrackerKCF_create'),
+    'mosse': _opencv_tracker('legacy.TrackerMOSSE_create', 'TrackerMOSSE_create'),
+    'csrt': _opencv_tracker('TrackerCSRT_create', 'legacy.TrackerCSRT_create'),
+}
+
+def make_marker_tracker(name):
+    """returns a new tracker registered as 'name' in 'MARKER_TRACKERS'."""
+    try:
+        factory = MARKER_TRACKERS[name]
+    except KeyError:
+        raise ValueError("unknown marker tracker '%s', choose from %s" % (name, ', '.join(MARKER_TRACKERS)))
+    if factory is None:
+        raise ValueError("marker tracker '%s' needs opencv-contrib-python" % name)
+    return factory()
+
+# Detect-then-track Scheduling
+class DetectTracker:
+    """
+    Runs ArUco detection only every 'detect_every' frames and follows the
+    marker with a cheap tracker in between.
+
+    A tracker update below 'min_confidence' counts as a track loss, the
+    same frame is then detected again. When a detection misses the marker
+    the tracker carries on, as the CSRT tracker of the gloved controller
+    did, until 'timeout' seconds have passed since the last detection.
+    Detection then runs on every frame until the marker is found again.
+
+    Attributes
+    ----------
+    detect_every : int
+        frames between scheduled detections, 1 detects on every frame.
+    min_confidence : float
+        tracker confidence below which the track counts as lost.
+    timeout : float
+        seconds a track is kept without a detection.
+    tracking : bool
+        True while a track is kept.
+    timed_out : bool
+        True after a track was dropped for 'timeout', until the next
+        detection.
+    frames : int
+        no. of 'update' calls.
+    detections : int
+        no. of detection passes.
+    tracked : int
+        no. of tracker updates.
+    losses : int
+        no. of tracker updates below 'min_confidence'.
+    """
+
+    def __init__(self, tracker='flow', detect_every=5, min_confidence=0.75, timeout=2.0):
+        self.tracker_name = tracker
+        self.tracker = make_marker_tracker(tracker)
+        self.detect_every = max(1, detect_every)
+        self.min_confidence = min_confidence
+        self.timeout = timeout
+        self.tracking = False
+        self.timed_out = False
+        self.frames = 0
+        self.detections = 0
+        self.tracked = 0
+        self.losses = 0
+
+        self._since_detect = 0
+        self._last_detect = 0.0
+
+    def update(self, frame, detect, now=None):
+        """
+        returns the marker corners in 'frame' as 'aruco.detectMarkers' gives
+        them, or None if there is no marker.
+
+        Parameters
+        ----------
+        frame : numpy.ndarray
+            BGR frame.
+        detect : callable
+            called as detect(frame) on detection frames, returns corners in
+            'aruco.detectMarkers' layout or None.
+        now : float
+            frame time, 'time.time()' if not given.
+        """
+        if now is None:
+            now = time.time()
+        self.frames += 1
+        self._since_detect += 1
+
+        due = not self.tracking or self._since_detect >= self.detect_every
+        if due:
+            corners = self._detect(frame, detect, now)
+            if corners:
+                return corners
+            if not self.tracking:
+                return None
+
+        if now - self._last_detect >= self.timeout:
+            self.tracking = False
+            self.timed_out = True
+            return None
+        with tracer.span('marker.track'):
+            confidence, points = self.tracker.update(frame)
+        self.tracked += 1
+        if confidence < self.min_confidence or points is None:
+            self.losses += 1
+            self.tracking = False
+            return None if due else self._detect(frame, detect, now)
+        return [points.reshape(1, 4, 2).astype(np.float32)]
+
+    def _detect(self, frame, detect, now):
+        self._since_detect = 0
+        self.detections += 1
+        corners = detect(frame)
+        if corners:
+            self._last_detect = now
+            self.timed_out = False
+            with tracer.span('marker.track_init'):
+                self.tracker.init(frame, np.array(corners[0][0], dtype=np.float32).reshape(4, 2))
+            self.tracking = True
+        return corners
+
+    def stats(self):
+        """
+        returns detection and tracking counters.
+
+        Returns
+        -------
+        dict
+        """
+        return {
+            'tracker': self.tracker_name,
+            'frames': self.frames,
+            'detections': self.detections,
+            'tracked': self.tracked,
+            'losses': self.losses,
+            'loss_pct': 100.0 * self.losses / self.tracked if self.tracked else 0.0,
+        }
+
+    def report(self):
+        """returns 'stats' as a single printable line."""
+        return ("marker tracker {tracker}: {frames} frames, {detections} detections, "
+                "{tracked} tracked, {losses} losses ({loss_pct:.1f}%)").format(**self.stats())
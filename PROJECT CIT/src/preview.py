@@ -0,0 +1,106 @@
+# Imports
+
+import threading
+import time
+import cv2
+from tracing import tracer
+
+# Rate-limited Preview Window
+class Preview:
+    """
+    Shows the camera image in a window from its own thread, at most
+    'max_fps' times per second.
+
+    The frame loop hands over its latest RGB image and overlay data with
+    'submit', which only swaps a reference. Colour conversion, drawing,
+    'cv2.imshow' and 'cv2.waitKey' all happen on the preview thread, so the
+    frame loop never waits on GUI work. Frames submitted between two
+    renders are skipped.
+
+    Attributes
+    ----------
+    title : str
+        window title.
+    draw : callable or None
+        called as draw(bgr_image, overlay) before showing the image.
+    max_fps : float
+        upper bound on renders per second.
+    close_key : int
+        key code that closes the preview, Enter by default.
+    closed : bool
+        True once the window was closed with 'close_key'.
+    frames_shown : int
+        no. of frames rendered.
+    """
+
+    def __init__(self, title, draw=None, max_fps=10.0, close_key=13):
+        self.title = title
+        self.draw = draw
+        self.max_fps = max_fps
+        self.close_key = close_key
+        self.closed = False
+        self.frames_shown = 0
+
+        self._cond = threading.Condition()
+        self._snapshot = None
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        """Starts the preview thread, returns self."""
+        if not self._running:
+            self._running = True
+            self._thread = threading.Thread(target=self._render, name='Preview', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Stops the preview thread and closes the window."""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def submit(self, image, overlay=None):
+        """
+        hands over RGB 'image' and its 'overlay' data for the next render.
+        The image must not be modified by the caller afterwards.
+        """
+        with self._cond:
+            self._snapshot = (image, overlay)
+            self._cond.notify_all()
+
+    def _render(self):
+        interval = 1.0 / self.max_fps
+        try:
+            while True:
+                with self._cond:
+                    self._cond.wait_for(lambda: self._snapshot is not None or not self._running)
+                    if not self._running:
+                        return
+                    (image, overlay), self._snapshot = self._snapshot, None
+                started = time.perf_counter()
+
+                image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+                if self.draw is not None and overlay is not None:
+                    self.draw(image, overlay)
+                with tracer.span('cv2.imshow'):
+                    cv2.imshow(self.title, image)
+                    key = cv2.waitKey(1) & 0xFF
+                self.frames_shown += 1
+                tracer.handle_key(key)
+                if key == self.close_key:
+                    self.closed = True
+                    return
+
+                remaining = interval - (time.perf_counter() - started)
+                if remaining > 0:
+                    with self._cond:
+                        self._cond.wait_for(lambda: not self._running, remaining)
+        except cv2.error as e:
+            print("preview unavailable:", e)
+        finally:
+            if self.frames_shown:
+                cv2.destroyWindow(self.title)
@@ -0,0 +1,304 @@
+"""
+Replays a recorded session through a controller without a webcam and with
+every output going to a recording null backend, so the run is repeatable.
+
+Landmarks cached in the session are fed straight to the gesture logic by
+default. With '--frames' the recorded video is decoded and inferred again
+(mediapipe, or ArUco detection for the gloved controller), which also
+exercises the vision pipeline. Time comes from the recorded timestamps only.
+
+Every run yields the gesture of each frame and the ordered list of input,
+volume, brightness and speech events. '--runs' replays several times and
+fails if any run differs from the first. '--fps' replays at lower frame
+rates by dropping frames and reports how far the gesture onsets moved
+against the first rate, gesture dwell times should keep them within a frame.
+
+    python replay.py session_dir
+    python replay.py session_dir --frames --runs 3
+    python replay.py session_dir --fps 30 15 10
+
+pyautogui needs a display to import, use xvfb-run on a machine without one.
+"""
+
+# Imports
+
+import argparse
+import hashlib
+import os
+import sys
+import time
+import cv2
+import numpy as np
+
+from display import DisplayGeometry
+from input_dispatch import NullBackend, ScrollWorker
+from session import Session
+
+EYE_TOOLS = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir, 'PROJECT CIT II')
+
+# Replay Result
+class ReplayResult:
+    """
+    Outcome of one replay.
+
+    Attributes
+    ----------
+    gestures : list
+        per frame gesture or mode, None where nothing was handled.
+    times : list
+        capture time of every entry of 'gestures'.
+    events : list
+        (name, args, kwargs) of every output event, in order.
+    seconds : float
+        wall time spent in the replay loop.
+    """
+
+    def __init__(self):
+        self.gestures = []
+        self.times = []
+        self.events = []
+        self.seconds = 0.0
+
+    def digest(self):
+        """returns a short hash of gestures and events."""
+        h = hashlib.sha1()
+        h.update(repr(self.gestures).encode())
+        h.update(repr(self.events).encode())
+        return h.hexdigest()[:16]
+
+    def onsets(self):
+        """returns (time, gesture) of every frame where the handled gesture changes."""
+        onsets = []
+        last = None
+        for t, gesture in zip(self.times, self.gestures):
+            if gesture is not None and gesture != last:
+                onsets.append((t, gesture))
+                last = gesture
+        return onsets
+
+
+def frame_indices(session, fps=None):
+    """returns indices of the frames to replay, all of them or at most 'fps' per second."""
+    timestamps = session.timestamps
+    if fps is None:
+        return list(range(len(timestamps)))
+    keep = []
+    due = None
+    for i, t in enumerate(timestamps):
+        if due is None or t >= due - 1e-6:
+            keep.append(i)
+            due = t + 1.0 / fps if due is None or due + 1.0 / fps <= t else due + 1.0 / fps
+    return keep
+
+
+def onset_shifts(reference, result, window=0.5):
+    """
+    returns (matched, shifts) pairing every onset of 'reference' with the
+    nearest onset of the same gesture in 'result' within 'window' seconds.
+    """
+    shifts = []
+    candidates = result.onsets()
+    for t, gesture in reference.onsets():
+        near = [u - t for u, g in candidates if g == gesture and abs(u - t) <= window]
+        if near:
+            shifts.append(min(near, key=abs))
+    return len(shifts), shifts
+
+
+def null_outputs(result):
+    """returns input, volume, brightness, speech backends logging to 'result'."""
+    return (NullBackend(events=result.events),
+            NullBackend(events=result.events, prefix='volume.'),
+            NullBackend(events=result.events, prefix='brightness.'),
+            NullBackend(events=result.events, prefix='speech.'))
+
+
+def flipped_rgb(frame):
+    return cv2.cvtColor(cv2.flip(frame, 1), cv2.COLOR_BGR2RGB)
+
+
+def _frames(session, fps=None):
+    """yields (index, frame, timestamp) of the decoded frames kept at 'fps'."""
+    keep = set(frame_indices(session, fps))
+    for i, (frame, timestamp) in enumerate(zip(session.frames(), session.timestamps)):
+        if i in keep:
+            yield i, frame, timestamp
+
+# Controller Drivers
+def replay_hands(session, from_frames=False, fps=None):
+    """replays through 'Gesture_Controller'."""
+    import Gesture_Controller as gc
+    from hand_roi import HandROI
+
+    result = ReplayResult()
+    dispatcher, volume, brightness, _ = null_outputs(result)
+    controller = gc.Controller(dispatcher, volume, brightness, DisplayGeometry(NullBackend(record=False)),
+                               scroller=ScrollWorker(dispatcher))
+    ctrl = gc.GestureController(camera=None, controller=controller)
+    handmajor = gc.HandRecog(gc.HLabel.MAJOR)
+    handminor = gc.HandRecog(gc.HLabel.MINOR)
+
+    start = time.perf_counter()
+    if from_frames:
+        with HandROI(enabled=ctrl.use_roi, max_num_hands=2,
+                     min_detection_confidence=0.5, min_tracking_confidence=0.5) as hands:
+            for i, frame, timestamp in _frames(session, fps):
+                image = flipped_rgb(frame)
+                image.flags.writeable = False
+                results = hands.process(image)
+                result.gestures.append(ctrl.handle_results(handmajor, handminor, results, timestamp))
+                result.times.append(float(timestamp))
+    else:
+        for i in frame_indices(session, fps):
+            timestamp = session.timestamps[i]
+            results = session.hand_results(i)
+            result.gestures.append(ctrl.handle_results(handmajor, handminor, results, timestamp))
+            result.times.append(float(timestamp))
+    result.seconds = time.perf_counter() - start
+    result.gestures = [None if g is None else int(g) for g in result.gestures]
+    return result
+
+
+def replay_gloved(session, from_frames=False, fps=None):
+    """replays through 'Gesture_Controller_Gloved', always needs frames."""
+    import Gesture_Controller_Gloved as gcg
+
+    result = ReplayResult()
+    dispatcher, _, _, _ = null_outputs(result)
+    ctrl = gcg.GestureController(camera=None, display=DisplayGeometry(NullBackend(record=False)),
+                                 dispatcher=dispatcher)
+
+    start = time.perf_counter()
+    for i, frame, timestamp in _frames(session, fps):
+        frame = cv2.flip(frame, 1)
+        if not from_frames:
+            points = session.landmarks[i, 0]
+            ctrl.aru_marker.corners = None
+            if not np.isnan(points[0, 0]):
+                ctrl.aru_marker.corners = (np.array(points[:, :2], dtype=np.float32).reshape(1, 4, 2),)
+        mask = ctrl.process_frame(frame, timestamp, detect=from_frames)
+        result.gestures.append(None if mask is None else ctrl.glove.gesture)
+        result.times.append(float(timestamp))
+    result.seconds = time.perf_counter() - start
+    return result
+
+
+def eye_module(name):
+    if EYE_TOOLS not in sys.path:
+        sys.path.append(EYE_TOOLS)
+    return __import__(name)
+
+
+def _face_landmarks(session, from_frames, module, fps=None):
+    """yields (landmarks or None, timestamp) of every frame kept at 'fps'."""
+    if from_frames:
+        face_mesh = module.make_face_mesh()
+        try:
+            for i, frame, timestamp in _frames(session, fps):
+                results = face_mesh.process(flipped_rgb(frame))
+                faces = results.multi_face_landmarks
+                yield (faces[0].landmark if faces else None), timestamp
+        finally:
+            face_mesh.close()
+    else:
+        for i in frame_indices(session, fps):
+            faces = session.face_results(i).multi_face_landmarks
+            yield (faces[0].landmark if faces else None), session.timestamps[i]
+
+
+def replay_eye(session, from_frames=False, fps=None):
+    """replays through 'eye_gesture_control'."""
+    module = eye_module('eye_gesture_control')
+    result = ReplayResult()
+    dispatcher, _, _, _ = null_outputs(result)
+    control = module.EyeGestureControl(dispatcher, DisplayGeometry(NullBackend(record=False)))
+
+    start = time.perf_counter()
+    for landmarks, timestamp in _face_landmarks(session, from_frames, module, fps):
+        if landmarks is not None:
+            control.step(landmarks, float(timestamp))
+            result.gestures.append(control.current_mode)
+        else:
+            result.gestures.append(None)
+        result.times.append(float(timestamp))
+    result.seconds = time.perf_counter() - start
+    return result
+
+
+def replay_morse(session, from_frames=False, fps=None):
+    """replays through 'eye_morse_code', speech is logged, not spoken."""
+    module = eye_module('eye_morse_code')
+    result = ReplayResult()
+    dispatcher, _, _, speaker = null_outputs(result)
+    morse = module.EyeMorse(dispatcher, DisplayGeometry(NullBackend(record=False)), speaker, type_delay=0)
+
+    start = time.perf_counter()
+    for landmarks, timestamp in _face_landmarks(session, from_frames, module, fps):
+        morse.step(landmarks, float(timestamp))
+        result.gestures.append((morse.current_mode, morse.morse_buffer))
+        result.times.append(float(timestamp))
+    result.seconds = time.perf_counter() - start
+    return result
+
+
+REPLAYERS = {
+    'Gesture_Controller': replay_hands,
+    'Gesture_Controller_Gloved': replay_gloved,
+    'eye_gesture_control': replay_eye,
+    'eye_morse_code': replay_morse,
+}
+
+def replay(session, controller=None, from_frames=False, fps=None):
+    """
+    returns 'ReplayResult' of replaying 'session' through 'controller', the
+    controller that recorded it by default, at most 'fps' frames per second
+    if given.
+    """
+    controller = controller or session.meta['source']
+    return REPLAYERS[controller](session, from_frames, fps)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('session', help="session directory")
+    parser.add_argument('--controller', choices=sorted(REPLAYERS), help="default: the recording controller")
+    parser.add_argument('--frames', action='store_true', help="infer landmarks from the recorded frames")
+    parser.add_argument('--runs', type=int, default=1, help="replays to compare")
+    parser.add_argument('--fps', type=float, nargs='+', help="replay once at each of these frame rates")
+    args = parser.parse_args()
+
+    session = Session(args.session)
+    if args.fps:
+        reference = None
+        for fps in args.fps:
+            result = replay(session, args.controller, args.frames, fps)
+            onsets = result.onsets()
+            line = "%5.1f FPS: %d frames, %d events, %d gesture onsets" % (
+                fps, len(result.gestures), len(result.events), len(onsets))
+            if reference is None:
+                reference = result
+            else:
+                matched, shifts = onset_shifts(reference, result)
+                if shifts:
+                    line += ", %d/%d matched, shift mean %+.0f ms, max %.0f ms" % (
+                        matched, len(reference.onsets()), np.mean(shifts) * 1000.0,
+                        np.max(np.abs(shifts)) * 1000.0)
+            print(line)
+        return
+
+    first = None
+    for run in range(args.runs):
+        result = replay(session, args.controller, args.frames)
+        handled = sum(g is not None for g in result.gestures)
+        print("run %d: %d frames (%d handled), %d events, %.1f FPS, digest %s" % (
+            run + 1, len(result.gestures), handled, len(result.events),
+            len(result.gestures) / max(result.seconds, 1e-9), result.digest()))
+        if first is None:
+            first = result
+        elif (result.gestures, result.events) != (first.gestures, first.events):
+            print("replay is not deterministic, run %d differs from run 1" % (run + 1))
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
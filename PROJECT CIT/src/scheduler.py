@@ -0,0 +1,139 @@
+# Imports
+
+import time
+from tracing import tracer
+
+# Deadline Frame Scheduler
+class FrameScheduler:
+    """
+    Paces a frame loop to a target rate by sleeping until the next frame's
+    deadline, instead of spinning on the clock.
+
+    The loop calls 'wait' once before every frame. The time between 'wait'
+    returning and the next call is the stage cost of that frame, its moving
+    average sets the current period: 1/'fps' while the stages keep up,
+    longer while they do not, down to 'min_fps'. So a slow machine settles
+    at the rate it can sustain instead of missing every deadline, and
+    returns to 'fps' once the stages get faster again.
+
+    A frame starting more than 'slack' of a period after its deadline is
+    counted as a missed deadline. The schedule then restarts from the late
+    frame rather than running the skipped frames back to back.
+
+    Attributes
+    ----------
+    fps : float
+        target frames per second.
+    min_fps : float
+        lowest rate the adaptation may fall to.
+    adaptive : bool
+        if False the period stays 1/'fps'.
+    slack : float
+        fraction of a period a frame may start late without being missed.
+    period : float
+        current seconds between frame deadlines.
+    frames : int
+        no. of 'wait' calls.
+    missed : int
+        no. of frames that started after their deadline.
+    late_max : float
+        worst lateness of a missed frame in seconds.
+    cost : float
+        moving average of the stage cost in seconds.
+    slept : float
+        total seconds spent sleeping in 'wait'.
+    """
+
+    def __init__(self, fps=30.0, min_fps=10.0, adaptive=True, slack=0.1, smoothing=0.1,
+                 clock=time.perf_counter, sleep=time.sleep):
+        """
+        Parameters
+        ----------
+        smoothing : float
+            weight of the newest stage cost in the moving average.
+        clock, sleep : callable
+            time source and sleep function, for replaying a loop offline.
+        """
+        self.fps = fps
+        self.min_fps = min(min_fps, fps)
+        self.adaptive = adaptive
+        self.slack = slack
+        self.smoothing = smoothing
+        self.clock = clock
+        self.sleep = sleep
+        self.period = 1.0 / fps
+        self.frames = 0
+        self.missed = 0
+        self.late_max = 0.0
+        self.cost = 0.0
+        self.slept = 0.0
+
+        self._deadline = None
+        self._started = None
+        self._first = None
+
+    def wait(self):
+        """
+        sleeps until the next frame is due, returns the time it starts at.
+
+        Returns
+        -------
+        float
+            'clock' time of the frame start.
+        """
+        now = self.clock()
+        if self._started is not None:
+            cost = now - self._started
+            self.cost = cost if self.frames == 1 else self.cost + self.smoothing * (cost - self.cost)
+            if self.adaptive:
+                self.period = min(max(self.cost, 1.0 / self.fps), 1.0 / self.min_fps)
+
+        deadline = now if self._deadline is None else self._deadline
+        late = now - deadline
+        if late > self.slack * self.period:
+            self.missed += 1
+            self.late_max = max(self.late_max, late)
+            deadline = now
+        elif late < 0:
+            with tracer.span('scheduler.sleep'):
+                self.sleep(-late)
+            self.slept += -late
+
+        self._deadline = deadline + self.period
+        self._started = self.clock()
+        if self._first is None:
+            self._first = self._started
+        self.frames += 1
+        return self._started
+
+    def reset(self):
+        """Forgets the schedule, e.g. after the loop paused, counters are kept."""
+        self._deadline = None
+        self._started = None
+
+    def stats(self):
+        """
+        returns achieved rate, current target and missed deadlines.
+
+        Returns
+        -------
+        dict
+        """
+        elapsed = self.clock() - self._first if self._first is not None else 0.0
+        return {
+            'frames': self.frames,
+            'fps': (self.frames - 1) / elapsed if elapsed > 0 else 0.0,
+            'target_fps': 1.0 / self.period,
+            'cost_ms': self.cost * 1000.0,
+            'missed': self.missed,
+            'missed_pct': 100.0 * self.missed / self.frames if self.frames else 0.0,
+            'late_max_ms': self.late_max * 1000.0,
+            'sleep_pct': 100.0 * self.slept / elapsed if elapsed > 0 else 0.0,
+        }
+
+    def report(self):
+        """returns 'stats' as a single printable line."""
+        s = self.stats()
+        return ("frames: {frames}, {fps:.1f} FPS (target {target_fps:.1f}), stage cost {cost_ms:.1f} ms, "
+                "missed deadlines: {missed} ({missed_pct:.1f}%, worst {late_max_ms:.1f} ms late), "
+                "asleep {sleep_pct:.0f}%").format(**s)
@@ -0,0 +1,271 @@
+# Imports
+
+import collections
+import json
+import os
+import threading
+from types import SimpleNamespace
+import cv2
+import numpy as np
+
+# Session Layout
+# A session is a directory holding
+#   meta.json       : kind, source, counts and array shapes
+#   frames.mp4      : raw camera frames, before flipping (optional)
+#   timestamps.npy  : (N,) float64 capture time of every frame
+#   landmarks.f32   : (N, items, points, 3) float32, NaN where nothing was found
+#   labels.i8       : (N, items) int8 handedness, -1 none, 0 left, 1 right
+#   scores.f32      : (N, items) float32 handedness score
+# The raw arrays are opened with 'numpy.memmap', so long sessions are not
+# read into memory.
+HAND_LABELS = {'Left': 0, 'Right': 1}
+LABEL_NAMES = {v: k for k, v in HAND_LABELS.items()}
+
+# Session Recording
+class SessionRecorder:
+    """
+    Records camera frames, capture timestamps and landmarks of a controller
+    session to disk for later replay.
+
+    'write' only queues references, conversion and encoding happen on the
+    recorder thread. Frames and landmark results must not be modified by the
+    caller after being written. The queue waits for room instead of dropping
+    entries, a session is always complete.
+
+    Attributes
+    ----------
+    path : str
+        session directory, created if missing.
+    kind : str
+        'hands', 'face' or 'marker', decides how landmarks are rebuilt.
+    source : str
+        controller that recorded the session, default replay target.
+    items : int
+        maximum no. of hands/faces/markers per frame.
+    points : int
+        no. of landmarks per item.
+    fps : float
+        nominal frame rate written to the video header.
+    save_frames : bool
+        False to record timestamps and landmarks only.
+    count : int
+        no. of frames written so far.
+    """
+
+    def __init__(self, path, kind, source, items, points, fps=30.0, save_frames=True, maxsize=64):
+        self.path = path
+        self.kind = kind
+        self.source = source
+        self.items = items
+        self.points = points
+        self.fps = fps
+        self.save_frames = save_frames
+        self.maxsize = maxsize
+        self.count = 0
+
+        self._queue = collections.deque()
+        self._cond = threading.Condition()
+        self._timestamps = []
+        self._files = {}
+        self._video = None
+        self._frame_size = None
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        """Opens the session files and starts the recorder thread, returns self."""
+        if self._running:
+            return self
+        os.makedirs(self.path, exist_ok=True)
+        self._files = {name: open(os.path.join(self.path, name), 'wb')
+                       for name in ('landmarks.f32', 'labels.i8', 'scores.f32')}
+        self._running = True
+        self._thread = threading.Thread(target=self._work, name='SessionRecorder', daemon=True)
+        self._thread.start()
+        return self
+
+    def write(self, frame, timestamp, landmarks=None, handedness=None):
+        """
+        queues one frame.
+
+        Parameters
+        ----------
+        frame : numpy.ndarray
+            BGR frame as read from the camera.
+        timestamp : float
+            capture time the controller uses for this frame.
+        landmarks : list or numpy.ndarray
+            mediapipe landmark lists or 'LandmarkArray's, or
+            (items, points, 3) array.
+        handedness : list
+            mediapipe classification lists matching 'landmarks'.
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: len(self._queue) < self.maxsize or not self._running)
+            self._queue.append((frame, timestamp, landmarks, handedness))
+            self._cond.notify_all()
+
+    def close(self):
+        """Writes pending frames and closes the session files."""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        for f in self._files.values():
+            f.close()
+        if self._video is not None:
+            self._video.release()
+        np.save(os.path.join(self.path, 'timestamps.npy'), np.array(self._timestamps, dtype=np.float64))
+        meta = {
+            'kind': self.kind,
+            'source': self.source,
+            'count': self.count,
+            'items': self.items,
+            'points': self.points,
+            'fps': self.fps,
+            'frames': self._video is not None,
+            'frame_size': self._frame_size,
+        }
+        with open(os.path.join(self.path, 'meta.json'), 'w') as f:
+            json.dump(meta, f, indent=2)
+
+    def _work(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._queue or not self._running)
+                if not self._queue:
+                    return
+                entry = self._queue.popleft()
+                self._cond.notify_all()
+            self._store(*entry)
+
+    def _store(self, frame, timestamp, landmarks, handedness):
+        if self.save_frames and frame is not None:
+            if self._video is None:
+                h, w = frame.shape[:2]
+                self._frame_size = [w, h]
+                self._video = cv2.VideoWriter(os.path.join(self.path, 'frames.mp4'),
+                                              cv2.VideoWriter_fourcc(*'mp4v'), self.fps, (w, h))
+            self._video.write(frame)
+
+        points = np.full((self.items, self.points, 3), np.nan, dtype=np.float32)
+        labels = np.full(self.items, -1, dtype=np.int8)
+        scores = np.zeros(self.items, dtype=np.float32)
+        if landmarks is not None:
+            for i, item in enumerate(landmarks[:self.items]):
+                if hasattr(item, 'array'):
+                    points[i] = item.array
+                elif hasattr(item, 'landmark'):
+                    points[i] = [(lm.x, lm.y, lm.z) for lm in item.landmark]
+                else:
+                    points[i] = np.asarray(item, dtype=np.float32).reshape(self.points, 3)
+        for i, hand in enumerate((handedness or [])[:self.items]):
+            labels[i] = HAND_LABELS.get(hand.classification[0].label, -1)
+            scores[i] = hand.classification[0].score
+
+        self._files['landmarks.f32'].write(points.tobytes())
+        self._files['labels.i8'].write(labels.tobytes())
+        self._files['scores.f32'].write(scores.tobytes())
+        self._timestamps.append(timestamp)
+        self.count += 1
+
+# Session Loading
+class Session:
+    """
+    Read access to a recorded session, see 'SessionRecorder'.
+
+    Attributes
+    ----------
+    path : str
+        session directory.
+    meta : dict
+        contents of meta.json.
+    timestamps : numpy.ndarray
+        (N,) capture times.
+    landmarks : numpy.memmap
+        (N, items, points, 3) landmarks, NaN where nothing was found.
+    labels : numpy.memmap
+        (N, items) handedness labels.
+    scores : numpy.memmap
+        (N, items) handedness scores.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'meta.json')) as f:
+            self.meta = json.load(f)
+        n, items, points = self.meta['count'], self.meta['items'], self.meta['points']
+        self.timestamps = np.load(os.path.join(path, 'timestamps.npy'), mmap_mode='r')
+        self.landmarks = self._map('landmarks.f32', np.float32, (n, items, points, 3))
+        self.labels = self._map('labels.i8', np.int8, (n, items))
+        self.scores = self._map('scores.f32', np.float32, (n, items))
+
+    def _map(self, name, dtype, shape):
+        if shape[0] == 0:
+            return np.zeros(shape, dtype=dtype)
+        return np.memmap(os.path.join(self.path, name), dtype=dtype, mode='r', shape=shape)
+
+    def __len__(self):
+        return self.meta['count']
+
+    @property
+    def has_frames(self):
+        return bool(self.meta.get('frames'))
+
+    def frames(self):
+        """yields the recorded BGR frames in order."""
+        if not self.has_frames:
+            raise ValueError("session %s was recorded without frames" % self.path)
+        cap = cv2.VideoCapture(os.path.join(self.path, 'frames.mp4'))
+        try:
+            for _ in range(len(self)):
+                success, frame = cap.read()
+                if not success:
+                    return
+                yield frame
+        finally:
+            cap.release()
+
+    def landmark_lists(self, index):
+        """
+        returns frame 'index' landmarks as mediapipe NormalizedLandmarkList
+        objects, one per item found.
+        """
+        from mediapipe.framework.formats import landmark_pb2
+        out = []
+        for points in self.landmarks[index]:
+            if np.isnan(points[0, 0]):
+                continue
+            lms = landmark_pb2.NormalizedLandmarkList()
+            for x, y, z in points.tolist():
+                lms.landmark.add(x=x, y=y, z=z)
+            out.append(lms)
+        return out
+
+    def hand_results(self, index):
+        """
+        returns frame 'index' in the shape of mediapipe Hands results, with
+        'multi_hand_landmarks' and 'multi_handedness' (None if no hand).
+        """
+        from mediapipe.framework.formats import classification_pb2
+        hands = self.landmark_lists(index)
+        if not hands:
+            return SimpleNamespace(multi_hand_landmarks=None, multi_handedness=None)
+        handedness = []
+        for i in range(len(hands)):
+            c = classification_pb2.ClassificationList()
+            label = int(self.labels[index, i])
+            c.classification.add(index=max(label, 0), score=float(self.scores[index, i]),
+                                 label=LABEL_NAMES.get(label, ''))
+            handedness.append(c)
+        return SimpleNamespace(multi_hand_landmarks=hands, multi_handedness=handedness)
+
+    def face_results(self, index):
+        """
+        returns frame 'index' in the shape of mediapipe FaceMesh results,
+        with 'multi_face_landmarks' (None if no face).
+        """
+        faces = self.landmark_lists(index)
+        return SimpleNamespace(multi_face_landmarks=faces or None)
@@ -0,0 +1,161 @@
+# Imports
+
+import importlib
+import sys
+import threading
+import time
+
+# Startup Profile
+class ImportProfile:
+    """
+    Records how long every deferred import and object construction took and
+    when startup milestones were reached, so slow subsystems show up in one
+    report. Times include the dependencies a module imports first, see
+    'python -X importtime' for the full tree.
+
+    Attributes
+    ----------
+    started : float
+        'time.perf_counter' when the profile was created, i.e. process start.
+    loads : list of tuple(str, float, str)
+        (name, seconds, thread name) of every timed load.
+    marks : list of tuple(str, float)
+        (label, seconds since 'started') of every milestone.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.loads = []
+        self.marks = []
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds):
+        with self._lock:
+            self.loads.append((name, seconds, threading.current_thread().name))
+
+    def mark(self, label):
+        """Records that startup milestone 'label' was reached now."""
+        with self._lock:
+            self.marks.append((label, time.perf_counter() - self.started))
+
+    def timed_import(self, name):
+        """returns module 'name', importing it and recording the time if not loaded yet."""
+        module = sys.modules.get(name)
+        if module is not None:
+            return module
+        start = time.perf_counter()
+        module = importlib.import_module(name)
+        self.record(name, time.perf_counter() - start)
+        return module
+
+    def report(self):
+        """returns loads, slowest first, and milestones as printable lines."""
+        with self._lock:
+            loads = sorted(self.loads, key=lambda load: -load[1])
+            marks = list(self.marks)
+        lines = ["%-24s %8.1f ms  %s" % (name, seconds * 1000.0, thread) for name, seconds, thread in loads]
+        lines += ["%-24s %8.1f ms  since start" % (label, seconds * 1000.0) for label, seconds in marks]
+        return '\n'.join(lines)
+
+profile = ImportProfile()
+
+# Deferred Loading
+class LazyModule:
+    """
+    Stands in for module 'name' and imports it on first attribute access,
+    e.g. 'sr = LazyModule('speech_recognition')' then 'sr.Microphone()'.
+    """
+
+    def __init__(self, name, profile=profile):
+        object.__setattr__(self, '_name', name)
+        object.__setattr__(self, '_profile', profile)
+        object.__setattr__(self, '_module', None)
+        object.__setattr__(self, '_lock', threading.Lock())
+
+    @property
+    def loaded(self):
+        return self._module is not None
+
+    def load(self):
+        """returns the module, importing it on the first call."""
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    object.__setattr__(self, '_module', self._profile.timed_import(self._name))
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self.load(), attr)
+
+    def __repr__(self):
+        return "<lazy module %r%s>" % (self._name, '' if self.loaded else ' (not loaded)')
+
+
+class Deferred:
+    """
+    Stands in for the object 'factory()' builds and builds it on first
+    attribute access. Attributes are read from and written to that object,
+    so 'engine.say(text)' or 'r.pause_threshold = 0.8' work unchanged.
+
+    A failed build raises to the caller and is tried again on the next use.
+    """
+
+    def __init__(self, name, factory, profile=profile):
+        object.__setattr__(self, '_name', name)
+        object.__setattr__(self, '_factory', factory)
+        object.__setattr__(self, '_profile', profile)
+        object.__setattr__(self, '_object', None)
+        object.__setattr__(self, '_lock', threading.Lock())
+
+    @property
+    def loaded(self):
+        return self._object is not None
+
+    def load(self):
+        """returns the object, building it on the first call."""
+        if self._object is None:
+            with self._lock:
+                if self._object is None:
+                    start = time.perf_counter()
+                    built = self._factory()
+                    self._profile.record(self._name, time.perf_counter() - start)
+                    object.__setattr__(self, '_object', built)
+        return self._object
+
+    def __getattr__(self, attr):
+        return getattr(self.load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self.load(), attr, value)
+
+    def __repr__(self):
+        return "<deferred %r%s>" % (self._name, '' if self.loaded else ' (not built)')
+
+
+def lazy_import(name):
+    """returns a 'LazyModule' standing in for module 'name'."""
+    return LazyModule(name)
+
+
+def warm_up(*items, done=None):
+    """
+    loads 'LazyModule' and 'Deferred' items one after another on a daemon
+    thread, so they are ready before first use, then calls 'done'. A failed
+    item is reported and skipped, its first use raises the error again.
+
+    Returns
+    -------
+    threading.Thread
+    """
+    def run():
+        for item in items:
+            try:
+                item.load()
+            except Exception as e:
+                print("warm-up of %s failed: %s" % (item._name, e))
+        if done is not None:
+            done()
+
+    thread = threading.Thread(target=run, name='WarmUp', daemon=True)
+    thread.start()
+    return thread
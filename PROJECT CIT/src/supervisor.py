@@ -0,0 +1,191 @@
+"""
+Runs several independent gesture controller sessions, one worker process per
+camera or user, and reports their combined throughput.
+
+Every seat gets its own 'GestureController' with its own camera, gesture
+state and input workers, so seats never share state and a slow or crashed
+seat does not stall the others.
+
+    python supervisor.py --camera 0 --camera 1 --headless
+    python supervisor.py --camera clip_a.mp4 --camera clip_b.mp4 --headless --seconds 30
+"""
+
+# Imports
+
+import argparse
+import multiprocessing
+import queue
+import threading
+import time
+
+# Seat Worker
+def run_seat(index, config, stop_event, metrics, interval):
+    """
+    worker process of one seat, runs 'GestureController(**config)' until it
+    ends or 'stop_event' is set, posting (index, frames, time, alive) to
+    'metrics' every 'interval' seconds.
+    """
+    from Gesture_Controller import GestureController
+
+    ctrl = GestureController(**config)
+
+    def report():
+        while not stop_event.wait(interval) and ctrl.gc_mode:
+            metrics.put((index, ctrl.frames, time.time(), True))
+        ctrl.stop()
+
+    reporter = threading.Thread(target=report, name='SeatReporter', daemon=True)
+    reporter.start()
+    try:
+        ctrl.start()
+    finally:
+        metrics.put((index, ctrl.frames, time.time(), False))
+
+# Session Supervisor
+class Supervisor:
+    """
+    Starts one worker process per seat and aggregates their frame rates.
+
+    Attributes
+    ----------
+    seats : list of dict
+        'GestureController' keyword arguments of every seat, e.g.
+        {'camera': 1, 'dom_hand': False, 'headless': True}.
+    interval : float
+        seconds between metric reports of the workers.
+    processes : list
+        one 'multiprocessing.Process' per seat.
+    """
+
+    def __init__(self, seats, interval=1.0):
+        self.seats = seats
+        self.interval = interval
+        self.processes = []
+
+        context = multiprocessing.get_context('spawn')
+        self._context = context
+        self._stop = context.Event()
+        self._metrics = context.Queue()
+        self._lock = threading.Lock()
+        self._state = [{'frames': 0, 'fps': 0.0, 'alive': False, 'since': None, 'last': None}
+                       for _ in seats]
+        self._collector = None
+        self._started_at = None
+
+    def start(self):
+        """Starts the seat processes and the metrics collector, returns self."""
+        self._started_at = time.time()
+        for index, config in enumerate(self.seats):
+            process = self._context.Process(target=run_seat, name='Seat-%d' % index,
+                                            args=(index, config, self._stop, self._metrics, self.interval),
+                                            daemon=True)
+            process.start()
+            self.processes.append(process)
+            self._state[index]['alive'] = True
+        self._collector = threading.Thread(target=self._collect, name='SupervisorMetrics', daemon=True)
+        self._collector.start()
+        return self
+
+    def _collect(self):
+        while any(p.is_alive() for p in self.processes) or not self._metrics.empty():
+            try:
+                index, frames, at, alive = self._metrics.get(timeout=self.interval)
+            except queue.Empty:
+                continue
+            with self._lock:
+                seat = self._state[index]
+                if seat['last'] is not None and at > seat['last'][1]:
+                    seat['fps'] = (frames - seat['last'][0]) / (at - seat['last'][1])
+                if seat['since'] is None:
+                    seat['since'] = (frames, at)
+                seat['last'] = (frames, at)
+                seat['frames'] = frames
+                seat['alive'] = alive
+                if not alive:
+                    seat['fps'] = 0.0
+
+    def running(self):
+        """returns True while any seat is running."""
+        return any(p.is_alive() for p in self.processes)
+
+    def stop(self, timeout=5.0):
+        """Asks every seat to stop and waits for the processes to exit."""
+        self._stop.set()
+        for process in self.processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        if self._collector is not None:
+            self._collector.join(timeout)
+            self._collector = None
+
+    def metrics(self):
+        """
+        returns per seat and combined throughput.
+
+        Returns
+        -------
+        dict
+            'seats': list of {'frames', 'fps', 'mean_fps', 'alive'},
+            'frames': total frames, 'fps': sum of current seat rates,
+            'mean_fps': total frames per second since 'start'.
+        """
+        with self._lock:
+            seats = []
+            for seat in self._state:
+                mean = 0.0
+                if seat['since'] is not None and seat['last'][1] > seat['since'][1]:
+                    mean = (seat['last'][0] - seat['since'][0]) / (seat['last'][1] - seat['since'][1])
+                seats.append({'frames': seat['frames'], 'fps': seat['fps'],
+                              'mean_fps': mean, 'alive': seat['alive']})
+        elapsed = time.time() - self._started_at if self._started_at else 0.0
+        frames = sum(s['frames'] for s in seats)
+        return {
+            'seats': seats,
+            'frames': frames,
+            'fps': sum(s['fps'] for s in seats),
+            'mean_fps': frames / elapsed if elapsed > 0 else 0.0,
+        }
+
+    def report(self):
+        """returns 'metrics' as printable lines."""
+        m = self.metrics()
+        lines = ["seat %d: %s, %d frames, %.1f FPS (mean %.1f)" % (
+                     i, 'running' if s['alive'] else 'stopped', s['frames'], s['fps'], s['mean_fps'])
+                 for i, s in enumerate(m['seats'])]
+        lines.append("total : %d frames, %.1f FPS (mean %.1f)" % (m['frames'], m['fps'], m['mean_fps']))
+        return '\n'.join(lines)
+
+
+def camera_source(value):
+    """returns 'value' as camera index if numeric, else as video file path."""
+    return int(value) if value.isdigit() else value
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--camera', action='append', type=camera_source, required=True,
+                        help="camera index or video file, once per seat")
+    parser.add_argument('--left-handed', action='append', type=int, default=[], metavar='SEAT',
+                        help="seat whose dominant hand is the left one")
+    parser.add_argument('--headless', action='store_true', help="run seats without preview windows")
+    parser.add_argument('--seconds', type=float, default=None, help="stop after this long")
+    parser.add_argument('--interval', type=float, default=2.0, help="seconds between reports")
+    args = parser.parse_args()
+
+    seats = [{'camera': camera, 'dom_hand': i not in args.left_handed, 'headless': args.headless}
+             for i, camera in enumerate(args.camera)]
+    supervisor = Supervisor(seats).start()
+    deadline = None if args.seconds is None else time.time() + args.seconds
+    try:
+        while supervisor.running() and (deadline is None or time.time() < deadline):
+            time.sleep(args.interval)
+            print(supervisor.report())
+    except KeyboardInterrupt:
+        pass
+    supervisor.stop()
+    print(supervisor.report())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,229 @@
+# Imports
+
+import re
+import shutil
+import subprocess
+import sys
+import threading
+
+# Asynchronous Level Changes
+class LevelWorker:
+    """
+    Applies level changes (0.0 - 1.0) through a backend on its own thread, so
+    a slow system call never stalls the frame loop.
+
+    The backend is opened once, on the worker thread, and reused. Its level
+    is read when opened and on 'refresh', otherwise it is tracked from the
+    changes applied. Changes requested while the worker is busy (e.g. during
+    a brightness fade) are merged, only the newest resulting level is
+    applied once the worker is free.
+
+    Attributes
+    ----------
+    open_backend : callable
+        returns the backend, must provide 'get_level' and 'set_level'.
+    name : str
+        used for the thread name and error messages.
+    level : float
+        last level read from or applied to the backend, None until known.
+    applied : int
+        no. of 'set_level' calls made.
+    """
+
+    def __init__(self, open_backend, name='level'):
+        self.open_backend = open_backend
+        self.name = name
+        self.level = None
+        self.applied = 0
+        self.backend = None
+
+        self._cond = threading.Condition()
+        self._delta = 0.0
+        self._pending = False
+        self._refresh = True
+        self._busy = False
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        """Starts the worker thread, returns self."""
+        if not self._running:
+            self._running = True
+            self._thread = threading.Thread(target=self._work, name=self.name.capitalize() + 'Worker', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+
+    def change(self, delta):
+        """requests a change of the level by 'delta', returns immediately."""
+        with self._cond:
+            self._delta += delta
+            self._pending = True
+            self._cond.notify_all()
+
+    def refresh(self):
+        """requests a fresh read of the level before the next change."""
+        with self._cond:
+            self._refresh = True
+            self._cond.notify_all()
+
+    def wait_idle(self, timeout=2.0):
+        """Waits until every requested change has been applied."""
+        with self._cond:
+            return self._cond.wait_for(lambda: not (self._pending or self._busy), timeout)
+
+    def _work(self):
+        try:
+            self.backend = self.open_backend()
+        except Exception as e:
+            print("%s backend unavailable:" % self.name, e)
+            self._running = False
+            return
+
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending or self._refresh or not self._running)
+                if not self._running:
+                    return
+                refresh, self._refresh = self._refresh, False
+                pending, self._pending = self._pending, False
+                delta, self._delta = self._delta, 0.0
+                self._busy = True
+            try:
+                if refresh or self.level is None:
+                    self.level = self.backend.get_level()
+                if pending:
+                    target = min(max(self.level + delta, 0.0), 1.0)
+                    self.apply(target)
+            except Exception as e:
+                print("%s change failed:" % self.name, e)
+            with self._cond:
+                self._busy = False
+                self._cond.notify_all()
+
+    def apply(self, target):
+        """sets 'target' level through the backend."""
+        self.backend.set_level(target)
+        self.level = target
+        self.applied += 1
+
+# Volume Backends
+class VolumeBackend:
+    """
+    Interface of a system volume backend, levels are floats in 0.0 - 1.0.
+    """
+
+    def get_level(self):
+        raise NotImplementedError
+
+    def set_level(self, level):
+        raise NotImplementedError
+
+
+class PycawVolume(VolumeBackend):
+    """Windows master volume through pycaw, endpoint is activated once."""
+
+    def __init__(self):
+        import comtypes
+        from ctypes import cast, POINTER
+        from pycaw.pycaw import AudioUtilities, IAudioEndpointVolume
+        # COM must be initialised on the thread that uses the endpoint.
+        comtypes.CoInitialize()
+        devices = AudioUtilities.GetSpeakers()
+        interface = devices.Activate(IAudioEndpointVolume._iid_, comtypes.CLSCTX_ALL, None)
+        self.volume = cast(interface, POINTER(IAudioEndpointVolume))
+
+    def get_level(self):
+        return self.volume.GetMasterVolumeLevelScalar()
+
+    def set_level(self, level):
+        self.volume.SetMasterVolumeLevelScalar(level, None)
+
+
+class PulseVolume(VolumeBackend):
+    """
+    Linux default sink volume on PulseAudio or PipeWire (pipewire-pulse).
+
+    Keeps one 'pulsectl' connection open when the library is installed,
+    otherwise falls back to the 'pactl' command line tool.
+    """
+
+    def __init__(self):
+        self.pulse = None
+        self.sink = None
+        try:
+            import pulsectl
+        except ImportError:
+            pulsectl = None
+        if pulsectl is not None:
+            self.pulse = pulsectl.Pulse('project-i-volume')
+            self.sink = self.pulse.get_sink_by_name(self.pulse.server_info().default_sink_name)
+        elif shutil.which('pactl') is None:
+            raise RuntimeError("neither pulsectl nor pactl is available")
+
+    def get_level(self):
+        if self.pulse is not None:
+            return self.pulse.volume_get_all_chans(self.sink)
+        out = subprocess.run(['pactl', 'get-sink-volume', '@DEFAULT_SINK@'],
+                             capture_output=True, text=True, check=True).stdout
+        return int(re.search(r'(\d+)%', out).group(1)) / 100.0
+
+    def set_level(self, level):
+        if self.pulse is not None:
+            self.pulse.volume_set_all_chans(self.sink, level)
+        else:
+            subprocess.run(['pactl', 'set-sink-volume', '@DEFAULT_SINK@', '%d%%' % round(level*100)], check=True)
+
+
+class FakeVolume(VolumeBackend):
+    """In-memory volume, records every level set."""
+
+    def __init__(self, level=0.5):
+        self.level = level
+        self.history = []
+
+    def get_level(self):
+        return self.level
+
+    def set_level(self, level):
+        self.level = level
+        self.history.append(level)
+
+
+# Brightness Backends
+class ScreenBrightness:
+    """
+    Brightness of one display through screen_brightness_control, levels are
+    floats in 0.0 - 1.0. Changes fade from the last known level.
+    """
+
+    def __init__(self, display=0, interval=0.01):
+        import screen_brightness_control as sbcontrol
+        self.sbcontrol = sbcontrol
+        self.display = display
+        self.interval = interval
+        self.current = None
+
+    def get_level(self):
+        level = self.sbcontrol.get_brightness(display=self.display)
+        if isinstance(level, list):
+            level = level[0]
+        self.current = level / 100.0
+        return self.current
+
+    def set_level(self, level):
+        start = self.current if self.current is not None else self.get_level()
+        self.sbcontrol.fade_brightness(int(100*level), start=int(100*start),
+                                       interval=self.interval, display=self.display)
+        self.current = level
+
+
+def default_volume_backend():
+    """returns the volume backend for this platform."""
+    if sys.platform == 'win32':
+        return PycawVolume()
+    return PulseVolume()
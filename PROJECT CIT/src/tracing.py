@@ -0,0 +1,137 @@
+# Imports
+
+import collections
+import json
+import os
+import threading
+import time
+
+# Frame Loop Tracing
+class _NullSpan:
+    """Shared do-nothing span handed out while tracing is off."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ('events', 'name', 'start')
+
+    def __init__(self, events, name):
+        self.events = events
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter_ns()
+        self.events.append((self.name, self.start, end, threading.get_native_id()))
+        return False
+
+
+class Tracer:
+    """
+    Records named spans into a fixed-size ring buffer and writes them as
+    Chrome trace-event JSON (chrome://tracing, ui.perfetto.dev).
+
+    While disabled 'span' returns a shared no-op context manager, so the
+    instrumentation left in the frame loops costs one attribute check per
+    span. Tracing can be switched on and off at any time, from any thread.
+    Once the buffer is full the oldest spans are overwritten. The preview
+    windows pass their key presses to 'handle_key', so 'key' switches
+    tracing on and off while the controller runs.
+
+    Attributes
+    ----------
+    enabled : bool
+        True while spans are recorded.
+    path : str
+        default output file of 'dump'.
+    capacity : int
+        maximum no. of spans kept.
+    key : int
+        key code that toggles tracing in the preview windows, 'p' by default.
+    """
+
+    def __init__(self, capacity=65536, enabled=False, path='trace.json', key=ord('p')):
+        self.capacity = capacity
+        self.key = key
+        self.enabled = enabled
+        self.path = path
+        self.events = collections.deque(maxlen=capacity)
+        self.origin = time.perf_counter_ns()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def toggle(self):
+        """switches tracing on or off, returns the new state."""
+        self.enabled = not self.enabled
+        return self.enabled
+
+    def handle_key(self, key):
+        """
+        toggles tracing if 'key' is the trace key. Switching it off writes
+        the recorded spans with 'dump' and starts a new buffer.
+        """
+        if key != self.key:
+            return
+        if self.toggle():
+            print("tracing on")
+        else:
+            print("trace written to", self.dump())
+            self.clear()
+
+    def clear(self):
+        self.events.clear()
+
+    def span(self, name):
+        """
+        returns a context manager recording the time spent inside it as
+        span 'name'.
+
+            with tracer.span('hands.process'):
+                results = hands.process(image)
+        """
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self.events, name)
+
+    def trace_events(self):
+        """returns recorded spans as list of Chrome trace-event dicts."""
+        pid = os.getpid()
+        names = {t.native_id: t.name for t in threading.enumerate()}
+        # one snapshot, 'dump' may run while other threads keep recording
+        events = list(self.events)
+        out = []
+        for tid in sorted({e[3] for e in events}):
+            out.append({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid,
+                        'args': {'name': names.get(tid, str(tid))}})
+        for name, start, end, tid in events:
+            out.append({'name': name, 'ph': 'X', 'pid': pid, 'tid': tid,
+                        'ts': (start - self.origin) / 1000.0, 'dur': (end - start) / 1000.0})
+        return out
+
+    def dump(self, path=None):
+        """writes the ring buffer as Chrome trace JSON, returns the file path."""
+        path = path or self.path
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': self.trace_events(), 'displayTimeUnit': 'ms'}, f)
+        return path
+
+
+# Shared tracer of the controllers. Setting GESTURE_TRACE to a file path
+# turns it on from the start and makes that file the dump target.
+tracer = Tracer(enabled=bool(os.environ.get('GESTURE_TRACE')),
+                path=os.environ.get('GESTURE_TRACE') or 'trace.json')
+span = tracer.span